@@ -21,3 +21,8 @@ def face_recognition_model_location():
 def cnn_face_detector_model_location():
     return os.path.join(os.path.dirname(__file__), "models", "mmod_human_face_detector.dat")
 
+def ssd_face_detector_model_location():
+    return os.path.join(os.path.dirname(__file__), "models", "res10_300x300_ssd_iter_140000.caffemodel")
+
+def ssd_face_detector_config_location():
+    return os.path.join(os.path.dirname(__file__), "models", "deploy.prototxt")
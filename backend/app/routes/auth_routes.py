@@ -1,10 +1,15 @@
 from fastapi import APIRouter, File, UploadFile, Form
 from ..schemas.auth_schemas import AuthResponse
-from ..services.face_auth_service import FaceAuthService
+from ..services.face_auth_service import face_auth_service
+from ..services.admission import admission_controller, PRIORITY_IDENTITY
+from ..services.vision_executor import vision_executor
+from ..services import vision_tasks
+from ..services.id_embeddings import INDEX_KEY
 from ..utils.error_handlers import (
     ValidationException,
     ResourceNotFoundException,
     ServerException,
+    ServiceUnavailableException,
     AuthenticationException
 )
 import logging
@@ -14,7 +19,9 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-face_auth_service = FaceAuthService()
+
+# Nearest enrolled faces checked for a duplicate enrollment on every ID photo upload
+DUPLICATE_CHECK_K = 5
 
 @router.post("/upload-id-photo", response_model=AuthResponse)
 async def upload_id_photo(
@@ -32,16 +39,43 @@ async def upload_id_photo(
         if not image_data.content_type.startswith('image/'):
             raise ValidationException("Invalid file type. Only images are allowed", "INVALID_FILE_TYPE")
             
-        success = face_auth_service.save_id_photo(user_id, contents)
-        if not success:
+        # Normalize to a face crop, store it and encode the face once; keyed by user so the
+        # worker that verifies this user has the embedding cached
+        try:
+            stored = await admission_controller.run(
+                PRIORITY_IDENTITY, vision_tasks.store_id_photo, user_id, contents, key=user_id
+            )
+        except ValueError as e:
+            raise ValidationException(str(e), "INVALID_IMAGE")
+        except RuntimeError:
             raise ServerException("Failed to save ID photo", "SAVE_FAILED")
+        logger.info(
+            f"ID photo for user {user_id}: {stored['original_bytes']} bytes uploaded, "
+            f"{stored['stored_bytes']} bytes stored{'' if stored['normalized'] else ' (not normalized)'}"
+        )
+        if not stored["face_found"]:
+            logger.warning(f"No face found in ID photo for user {user_id}")
+        
+        # One person enrolled under several candidate IDs shows up as a near match in the 1:N index
+        try:
+            similar = await admission_controller.run(
+                PRIORITY_IDENTITY, vision_tasks.index_id_embedding, user_id, stored["embedding"],
+                DUPLICATE_CHECK_K, key=INDEX_KEY
+            )
+            duplicates = [face["user_id"] for face in similar if face["match"]]
+            if duplicates:
+                logger.warning(f"ID photo of user {user_id} matches enrolled users {duplicates}")
+        except Exception as e:
+            # The photo and its embedding are saved; the index reconciles with the .emb files on its
+            # first use after ID_INDEX_RECONCILE_SECONDS (or when reopened) and enrolls it then
+            logger.warning(f"Could not index ID embedding for user {user_id}: {str(e)}")
             
         logger.info(f"ID photo uploaded successfully for user {user_id}")
         return AuthResponse(
             success=True,
             message="ID photo uploaded successfully"
         )
-    except ValidationException:
+    except (ValidationException, ServerException, ServiceUnavailableException):
         raise
     except Exception as e:
         logger.error(f"Error in upload_id_photo: {str(e)}")
@@ -63,13 +97,13 @@ async def verify_face(
         if not image_data.content_type.startswith('image/'):
             raise ValidationException("Invalid file type. Only images are allowed", "INVALID_FILE_TYPE")
             
-        # Get stored ID photo
-        id_photo = face_auth_service.get_id_photo(user_id)
-        if not id_photo:
+        # Compare faces against the cached ID photo embedding; only the live photo is encoded
+        comparison = await admission_controller.run(
+            PRIORITY_IDENTITY, vision_tasks.compare_to_id_photo, user_id, contents, key=user_id
+        )
+        if comparison is None:
             raise ResourceNotFoundException("ID photo not found", "ID_PHOTO_NOT_FOUND")
-            
-        # Compare faces
-        match, match_score = face_auth_service.compare_faces(id_photo, contents)
+        match, match_score = comparison["match"], comparison["match_score"]
         
         # Check liveness
         liveness_result = face_auth_service.detect_liveness(contents)
@@ -91,7 +125,7 @@ async def verify_face(
                 liveness_score=liveness_result["confidence"],
                 reason=liveness_result["reason"]
             )
-    except (ValidationException, ResourceNotFoundException):
+    except (ValidationException, ResourceNotFoundException, ServiceUnavailableException):
         raise
     except Exception as e:
         logger.error(f"Error in verify_face: {str(e)}")
@@ -133,4 +167,50 @@ async def check_liveness(
         raise
     except Exception as e:
         logger.error(f"Error in check_liveness: {str(e)}")
-        raise ServerException("Failed to process liveness check", "LIVENESS_CHECK_FAILED") 
\ No newline at end of file
+        raise ServerException("Failed to process liveness check", "LIVENESS_CHECK_FAILED") 
+
+@router.post("/find-similar-faces")
+async def find_similar_faces(
+    image_data: UploadFile = File(...),
+    k: int = Form(5)
+):
+    """Enrolled candidates whose ID photo is nearest to the face in the image, nearest first"""
+    try:
+        contents = await image_data.read()
+        
+        if not contents:
+            raise ValidationException("Empty file received", "EMPTY_FILE")
+            
+        if not image_data.content_type.startswith('image/'):
+            raise ValidationException("Invalid file type. Only images are allowed", "INVALID_FILE_TYPE")
+        
+        if not 1 <= k <= 100:
+            raise ValidationException("k must be between 1 and 100", "INVALID_K")
+            
+        similar = await admission_controller.run(
+            PRIORITY_IDENTITY, vision_tasks.find_similar_faces, contents, k, key=INDEX_KEY
+        )
+        if similar is None:
+            raise ValidationException("No face detected in the image", "NO_FACE_DETECTED")
+        return {"matches": similar}
+    except (ValidationException, ServiceUnavailableException):
+        raise
+    except ValueError as e:
+        raise ValidationException(str(e), "INVALID_IMAGE")
+    except Exception as e:
+        logger.error(f"Error in find_similar_faces: {str(e)}")
+        raise ServerException("Failed to search enrolled faces", "SEARCH_FAILED")
+
+@router.get("/id-embeddings/stats")
+async def get_id_embedding_stats():
+    """ID embedding cache hits and misses, summed over the vision workers, and the 1:N index size"""
+    try:
+        worker_stats = await vision_executor.broadcast(vision_tasks.get_id_embedding_stats)
+        totals = {key: sum(stats[key] for stats in worker_stats) for key in ("cached", "hits", "misses", "computed")}
+        lookups = totals["hits"] + totals["misses"]
+        totals["hit_rate"] = round(totals["hits"] / lookups, 4) if lookups else None
+        totals["index"] = await vision_executor.run(vision_tasks.get_id_index_stats, key=INDEX_KEY)
+        return totals
+    except Exception as e:
+        logger.error(f"Error in get_id_embedding_stats: {str(e)}")
+        raise ServerException("Failed to collect ID embedding stats", "STATS_FAILED")
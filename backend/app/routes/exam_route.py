@@ -4,6 +4,7 @@ from typing import List, Optional, Dict
 from datetime import datetime
 from ..routes.test_route import generate_test
 from ..services.screenshot import ScreenshotService
+from ..utils.model_registry import model_registry
 import logging
 
 # Configure logging
@@ -12,8 +13,8 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/exam", tags=["exam"])
 
-# Create screenshot service instance
-screenshot_service = ScreenshotService()
+def get_screenshot_service() -> ScreenshotService:
+    return model_registry.get("screenshot")
 
 class ExamRequest(BaseModel):
     skill: str
@@ -67,7 +68,7 @@ async def start_exam(request: ExamRequest):
         
         # Start screenshot service for this test
         try:
-            if not screenshot_service.start_for_test(exam_response.test_id):
+            if not get_screenshot_service().start_for_test(exam_response.test_id):
                 logger.warning("Failed to start screenshot service, but continuing with exam")
                 # Don't raise an error, just log the warning
         except Exception as e:
@@ -100,7 +101,7 @@ async def submit_exam(result: ExamResult):
         
         # Stop screenshot service for this test
         try:
-            screenshot_service.stop_for_test()
+            get_screenshot_service().stop_for_test()
             logger.info(f"Stopped screenshot service for test {result.test_id}")
         except Exception as e:
             logger.error(f"Error stopping screenshot service: {str(e)}")
@@ -115,8 +116,8 @@ async def submit_exam(result: ExamResult):
 async def get_exam_status(test_id: str):
     """Get the current status of an exam"""
     try:
-        is_active = screenshot_service.is_active()
-        current_test_id = screenshot_service.get_current_test_id()
+        is_active = get_screenshot_service().is_active()
+        current_test_id = get_screenshot_service().get_current_test_id()
         
         return {
             "test_id": test_id,
@@ -1,10 +1,14 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from ..services.face_verification import FaceVerificationService
+from ..services.admission import admission_controller, PRIORITY_IDENTITY
+from ..services import vision_tasks
+from ..services.liveness_session import SESSION_TTL_SECONDS
 from typing import Dict
+import uuid
 
 router = APIRouter()
-face_service = FaceVerificationService()
+# Multi-frame liveness sessions; mounted on their own, as /verify-faces and /detect-liveness are not served
+liveness_router = APIRouter()
 
 class FaceVerificationRequest(BaseModel):
     first_image: str  # Base64 encoded image
@@ -19,10 +23,12 @@ async def verify_faces(request: FaceVerificationRequest) -> Dict:
     Compare two face images and return similarity score.
     """
     try:
-        result = face_service.compare_faces(request.first_image, request.second_image)
+        result = await admission_controller.run(PRIORITY_IDENTITY, vision_tasks.compare_faces, request.first_image, request.second_image)
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -32,9 +38,64 @@ async def detect_liveness(request: LivenessDetectionRequest) -> Dict:
     Detect liveness using multiple methods (blink detection and head movement).
     """
     try:
-        result = face_service.detect_liveness(request.image)
+        result = await admission_controller.run(PRIORITY_IDENTITY, vision_tasks.detect_liveness, request.image)
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
         return result
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@liveness_router.post("/liveness/sessions")
+async def start_liveness_session() -> Dict:
+    """
+    Start a multi-frame liveness check. Stream frames to
+    /liveness/sessions/{session_id}/frames and read the verdict from
+    /liveness/sessions/{session_id}; idle sessions expire.
+    """
+    try:
+        session_id = uuid.uuid4().hex
+        # Keyed by session id so every frame of the session reaches the worker holding its state
+        await admission_controller.run(PRIORITY_IDENTITY, vision_tasks.start_liveness_session, session_id, key=session_id)
+        return {"session_id": session_id, "ttl_seconds": SESSION_TTL_SECONDS}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@liveness_router.post("/liveness/sessions/{session_id}/frames")
+async def add_liveness_frame(session_id: str, request: LivenessDetectionRequest) -> Dict:
+    """
+    Add one frame to a liveness session and return the running verdict.
+    """
+    try:
+        result = await admission_controller.run(
+            PRIORITY_IDENTITY, vision_tasks.add_liveness_frame, session_id, request.image, key=session_id
+        )
+        if result is None:
+            raise HTTPException(status_code=404, detail="Liveness session not found or expired")
+        return result
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@liveness_router.get("/liveness/sessions/{session_id}")
+async def get_liveness_verdict(session_id: str, end: bool = False) -> Dict:
+    """
+    Verdict of a liveness session; end=true also closes it.
+    """
+    try:
+        result = await admission_controller.run(
+            PRIORITY_IDENTITY, vision_tasks.get_liveness_verdict, session_id, end, key=session_id
+        )
+        if result is None:
+            raise HTTPException(status_code=404, detail="Liveness session not found or expired")
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
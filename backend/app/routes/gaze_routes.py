@@ -1,29 +1,30 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from datetime import datetime
-import os
-from ..utils.gaze_tracking import analyze_gaze
-from ..utils.logging import log_event
+from ..services.admission import admission_controller
+from ..services import vision_tasks
+from ..utils.gaze_tracking import gaze_snapshot_archive
+from ..utils.event_logger import ProctoringEventLogger
 
 router = APIRouter(tags=["gaze"])
 
+gaze_logger = ProctoringEventLogger("gaze_analysis")
+
 @router.post("/analyze")
 async def analyze_gaze_route(image: UploadFile = File(...)):
     try:
-        snapshots_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'snapshots')
-        os.makedirs(snapshots_dir, exist_ok=True)
-        
-        image_path = os.path.join(snapshots_dir, f"gaze_{datetime.now().timestamp()}.jpg")
+        content = await image.read()
         
-        # Save the uploaded file
-        with open(image_path, "wb") as buffer:
-            content = await image.read()
-            buffer.write(content)
+        # A sample of uploads is kept by a background writer; the request never waits on the disk
+        gaze_snapshot_archive.maybe_save("gaze.jpg", content)
         
-        gaze_result = analyze_gaze(image_path)
+        gaze_result = await admission_controller.run(
+            admission_controller.priority_for(None), vision_tasks.analyze_gaze_bytes, content
+        )
         
-        if gaze_result.get('status') == 'success':
-            log_event('gaze_analysis', gaze_result)
+        if "error" not in gaze_result:
+            gaze_logger.log_event('gaze_analysis', gaze_result)
         
         return gaze_result
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
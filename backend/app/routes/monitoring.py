@@ -1,7 +1,14 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 from typing import Optional, List, Dict
 from ..services.monitoring_service import MonitoringService, monitoring_service
+from ..services.frame_stream import frame_stream_manager
+from ..services.vision_executor import vision_executor
+from ..services.admission import admission_controller
+from ..services.capture_scheduler import capture_scheduler
+from ..services import vision_tasks
+from ..utils.image_utils import decode_data_url, split_length_prefixed
+from ..utils.face_cascade import combine_stats
 from datetime import datetime
 import os
 import pyautogui
@@ -34,32 +41,262 @@ class MonitoringEvent(BaseModel):
 class ScreenCaptureRequest(BaseModel):
     test_id: str
 
+def save_capture(test_id: str, image_bytes: bytes, index: Optional[int] = None) -> str:
+    """Write an encoded frame to the test's snapshot folder and return its path"""
+    # Create test-specific folder for snapshots
+    save_folder = os.path.join("snapshots", test_id)
+    os.makedirs(save_folder, exist_ok=True)
+    
+    # Generate filename with current timestamp
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    filename = f"snapshot_{timestamp}.jpg" if index is None else f"snapshot_{timestamp}_{index}.jpg"
+    filepath = os.path.join(save_folder, filename)
+    
+    # Save the snapshot
+    with open(filepath, "wb") as f:
+        f.write(image_bytes)
+    return filepath
+
 @router.post("/capture")
 async def capture_frame(request: CaptureRequest):
     try:
-        # Create test-specific folder for snapshots
-        save_folder = os.path.join("snapshots", request.testId)
-        os.makedirs(save_folder, exist_ok=True)
-        
-        # Generate filename with current timestamp
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        filename = f"snapshot_{timestamp}.jpg"
-        filepath = os.path.join(save_folder, filename)
-        
-        # Save the snapshot
-        with open(filepath, "wb") as f:
-            f.write(request.imageData.encode())
+        # Decode the base64 payload once; the same bytes are saved and analyzed
+        image_bytes = decode_data_url(request.imageData)
+        filepath = save_capture(request.testId, image_bytes)
             
-        result = monitoring_service.process_image(
-            request.imageData,
+        result = await admission_controller.run(
+            admission_controller.priority_for(request.testId),
+            vision_tasks.process_frame,
+            image_bytes,
             request.testId,
-            request.userId
+            request.userId,
+            key=request.testId
         )
         
         # Add file path to result
         result["saved_image_path"] = filepath
         
+        return capture_scheduler.apply(request.testId, result)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def read_frame_body(request: Request) -> bytes:
+    """Read one encoded frame from a raw body or from the "image" field of a multipart upload"""
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("image")
+        return await upload.read() if upload is not None else b""
+    return await request.body()
+
+@router.post("/capture/binary")
+async def capture_frame_binary(request: Request, test_id: str, user_id: str):
+    """
+    Ingest a raw JPEG/PNG frame sent as application/octet-stream (or as the
+    "image" field of a multipart upload). The body is read once and that single
+    buffer is shared between the disk write and the analysis.
+    """
+    try:
+        image_bytes = await read_frame_body(request)
+        
+        if not image_bytes:
+            raise HTTPException(status_code=400, detail="Empty frame received")
+        
+        filepath = save_capture(test_id, image_bytes)
+        result = await admission_controller.run(
+            admission_controller.priority_for(test_id),
+            vision_tasks.process_frame, image_bytes, test_id, user_id, key=test_id
+        )
+        result["saved_image_path"] = filepath
+        
+        return capture_scheduler.apply(test_id, result)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/analyze")
+async def analyze_frame(request: Request, test_id: str, user_id: str, analyzers: Optional[str] = None):
+    """
+    Run several checks on one frame with a single decode. analyzers is a
+    comma-separated subset of face_count, lighting, gaze and liveness; by
+    default the PIPELINE_ANALYZERS set is used.
+    """
+    try:
+        image_bytes = await read_frame_body(request)
+        
+        if not image_bytes:
+            raise HTTPException(status_code=400, detail="Empty frame received")
+        
+        selected = [name.strip() for name in analyzers.split(",") if name.strip()] if analyzers else None
+        result = await admission_controller.run(
+            admission_controller.priority_for(test_id),
+            vision_tasks.analyze_pipeline, image_bytes, test_id, user_id, selected, key=test_id
+        )
+        for name in ("face_count", "gaze"):
+            if isinstance(result.get(name), dict):
+                capture_scheduler.record_result(test_id, result[name])
+        result["capture_policy"] = capture_scheduler.recommend(test_id)
         return result
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/capture/batch")
+async def capture_frame_batch(request: Request, test_id: str, user_id: str):
+    """
+    Ingest several buffered frames in one request, either as repeated "images"
+    fields of a multipart upload or as a length-prefixed binary body (4-byte
+    big-endian length before each frame). Frames are analyzed in parallel and
+    the results are returned in upload order.
+    """
+    try:
+        content_type = request.headers.get("content-type", "")
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            frames = [await upload.read() for upload in form.getlist("images")]
+        else:
+            frames = split_length_prefixed(await request.body())
+        
+        if not frames:
+            raise HTTPException(status_code=400, detail="No frames received")
+        
+        saved_paths = [save_capture(test_id, frame, index) for index, frame in enumerate(frames)]
+        # memoryviews from the length-prefixed body cannot be pickled to the workers
+        results = await admission_controller.map(
+            admission_controller.priority_for(test_id),
+            vision_tasks.process_batch_frame, [bytes(frame) for frame in frames], test_id, user_id
+        )
+        for index, filepath in enumerate(saved_paths):
+            if isinstance(results[index], Exception):
+                # Deferred under load; the frame is saved and can be resubmitted later
+                results[index] = {
+                    "deferred": True,
+                    "error": results[index].detail,
+                    "retry_after": results[index].additional_info["retry_after"]
+                }
+            else:
+                capture_scheduler.record_result(test_id, results[index])
+            results[index]["saved_image_path"] = filepath
+        
+        return {
+            "count": len(results),
+            "results": results,
+            "capture_policy": capture_scheduler.recommend(test_id)
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.websocket("/stream/{test_id}")
+async def stream_frames(websocket: WebSocket, test_id: str, user_id: str):
+    """
+    Persistent frame channel for one test. The client sends binary JPEG frames and
+    receives one JSON analysis result per analyzed frame. When analysis falls
+    behind, stale queued frames are dropped instead of building up latency.
+    """
+    await websocket.accept()
+    session = frame_stream_manager.open(test_id, user_id)
+    session.start(websocket.send_json, websocket.close)
+    try:
+        while True:
+            frame = await websocket.receive_bytes()
+            if frame:
+                session.offer(frame)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Error in frame stream for test {test_id}: {str(e)}")
+    finally:
+        frame_stream_manager.close(session)
+
+@router.get("/stream/{test_id}/stats")
+async def get_stream_stats(test_id: str):
+    session = frame_stream_manager.get(test_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="No active frame stream for this test")
+    return session.get_stats()
+
+@router.get("/vision/stats")
+async def get_vision_stats():
+    """
+    Queue depth and per-task latency of the vision worker pool
+    """
+    return vision_executor.get_stats()
+
+@router.get("/admission/stats")
+async def get_admission_stats():
+    """Admission slots, queued requests and deferrals per priority class"""
+    return admission_controller.get_stats()
+
+@router.get("/face-cascade/stats")
+async def get_face_cascade_stats():
+    """How often the fast face-count stage settled a frame, and why the rest were escalated"""
+    try:
+        return combine_stats(await vision_executor.broadcast(vision_tasks.get_face_cascade_stats))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.put("/debug-images/{test_id}")
+async def set_debug_sample_rate(test_id: str, rate: Optional[float] = None):
+    """
+    Keep a share (0-1) of a test's gaze debug images, e.g. 1.0 while investigating it; no rate restores the default
+    """
+    if rate is not None and not 0 <= rate <= 1:
+        raise HTTPException(status_code=400, detail="rate must be between 0 and 1")
+    try:
+        await vision_executor.run(vision_tasks.set_debug_sample_rate, test_id, rate, key=test_id)
+        return {"test_id": test_id, "rate": rate}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/debug-images/stats")
+async def get_debug_image_stats():
+    """Per-worker debug image writer counters: queued, written, dropped and deleted by the retention cap"""
+    try:
+        return await vision_executor.broadcast(vision_tasks.get_debug_image_stats)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/frame-skip/{test_id}")
+async def get_frame_skip_stats(test_id: str):
+    """
+    How many of a test's frames reused the previous analysis because nothing changed
+    """
+    try:
+        return await vision_executor.run(vision_tasks.get_frame_skip_stats, test_id, key=test_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/identity/{test_id}")
+async def get_identity_stats(test_id: str):
+    """
+    How often a test's candidate was re-verified against their ID photo, and how many mismatches were logged
+    """
+    try:
+        return await vision_executor.run(vision_tasks.get_identity_stats, test_id, key=test_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/face-tracking/{test_id}")
+async def get_face_tracking_stats(test_id: str):
+    """
+    How many of a test's frames were served by ROI tracking instead of full detection
+    """
+    try:
+        return await vision_executor.run(vision_tasks.get_face_tracking_stats, test_id, key=test_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -138,10 +375,11 @@ async def start_screen_capture(request: ScreenCaptureRequest):
                         {"filename": filename, "path": filepath}
                     )
                     
-                    await asyncio.sleep(15)  # Capture every 15 seconds
+                    # Capture more often while the session is flagged
+                    await asyncio.sleep(capture_scheduler.screenshot_interval(request.test_id))
                 except Exception as e:
                     logger.error(f"Error capturing screenshot: {str(e)}")
-                    await asyncio.sleep(15)  # Wait before retrying
+                    await asyncio.sleep(capture_scheduler.screenshot_interval(request.test_id))  # Wait before retrying
         
         # Start the capture task
         task = asyncio.create_task(capture_screenshots())
@@ -179,10 +417,13 @@ async def stop_screen_capture(request: ScreenCaptureRequest):
 async def save_snapshot(request: CaptureRequest):
     try:
         # Process the image and check for suspicious activity
-        result = monitoring_service.process_image(
-            request.imageData,
+        result = await admission_controller.run(
+            admission_controller.priority_for(request.testId),
+            vision_tasks.process_frame,
+            decode_data_url(request.imageData),
             request.testId,
-            request.userId
+            request.userId,
+            key=request.testId
         )
         
         # Log the snapshot event
@@ -196,7 +437,9 @@ async def save_snapshot(request: CaptureRequest):
             }
         )
         
-        return result
+        return capture_scheduler.apply(request.testId, result)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error saving snapshot: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -2,9 +2,13 @@ from fastapi import APIRouter, HTTPException, Depends, Body, UploadFile, File, F
 from typing import List, Optional
 from ..schemas.proctoring_event import ProctoringEvent, ProctoringEventDetails
 from ..utils.event_logger import ProctoringEventLogger
-from ..utils.gaze_tracking import GazeTracker
+from ..services.admission import admission_controller
+from ..services import vision_tasks
+from ..services.capture_scheduler import capture_scheduler
+from ..services.gaze_aggregator import gaze_aggregator
 from datetime import datetime
 from ..utils.report_generator import generate_proctoring_report
+from ..utils.gaze_tracking import gaze_snapshot_archive
 import os
 from pathlib import Path
 import cv2
@@ -18,9 +22,6 @@ router = APIRouter()
 SCREENSHOTS_DIR = Path("screenshots")
 SCREENSHOTS_DIR.mkdir(exist_ok=True)
 
-# Initialize gaze tracker
-gaze_tracker = GazeTracker()
-
 @router.post("/capture-screen")
 async def capture_screen(
     file: UploadFile = File(...),
@@ -119,6 +120,9 @@ async def clear_events(session_id: str) -> dict:
 async def generate_report(session_id: str) -> dict:
     """Generate a comprehensive proctoring report for a session."""
     logger = get_logger(session_id)
+    # A deviation still open at the end of the session is logged before reporting
+    for details in gaze_aggregator.flush(session_id):
+        logger.log_event("gaze_away", details)
     events = logger.get_events()
     
     # Generate report
@@ -131,34 +135,37 @@ async def generate_report(session_id: str) -> dict:
     }
 
 @router.post("/gaze/analyze")
-async def analyze_gaze(image: UploadFile = File(...)):
+async def analyze_gaze(image: UploadFile = File(...), test_id: Optional[str] = Form(None)):
     """
     Analyze gaze direction from an uploaded image.
     Returns the detected gaze direction (center, left, right, no_face).
     """
     try:
-        # Create snapshots directory if it doesn't exist
-        snapshots_dir = Path("snapshots")
-        snapshots_dir.mkdir(exist_ok=True)
-        
-        # Save the uploaded image
-        timestamp = datetime.now().timestamp()
-        image_path = snapshots_dir / f"gaze_{timestamp}.jpg"
-        
-        # Read and save the image
         contents = await image.read()
-        with open(image_path, "wb") as f:
-            f.write(contents)
         
-        # Analyze gaze
-        result = gaze_tracker.analyze_gaze(str(image_path))
+        # A sample of uploads is kept by a background writer; the request never waits on the disk
+        gaze_snapshot_archive.maybe_save(f"gaze_{test_id or 'unknown'}.jpg", contents)
+        
+        # Analyze gaze straight from the upload; keyed by test so its face tracking state is reused
+        result = await admission_controller.run(
+            admission_controller.priority_for(test_id), vision_tasks.analyze_gaze_bytes, contents, test_id, key=test_id
+        )
         
-        # Log the event
-        if "error" not in result:
-            logger = get_logger("gaze_analysis")
-            logger.log_event("gaze_analysis", result)
+        # Only sustained deviations are logged, as gaze_away events in the test's own log;
+        # uploads without a test can't be attributed to a candidate and get the per-frame result only
+        if test_id:
+            for details in gaze_aggregator.observe(test_id, result):
+                get_logger(test_id).log_event("gaze_away", details)
+            result["gaze_away"] = gaze_aggregator.is_away(test_id)
         
-        return result
+        return capture_scheduler.apply(test_id, result)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e)) 
+
+@router.get("/gaze/stats/{test_id}")
+async def get_gaze_stats(test_id: str):
+    """Frames seen, gaze_away events and away time of a test's gaze stream"""
+    return gaze_aggregator.get_stats(test_id)
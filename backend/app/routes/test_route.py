@@ -1,6 +1,5 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
 from pydantic import BaseModel
-import google.generativeai as genai
 import os
 import json
 import re
@@ -8,9 +7,10 @@ from dotenv import load_dotenv
 from datetime import datetime
 import uuid
 import logging
-import cv2
-import numpy as np
-import face_recognition
+from ..services.admission import admission_controller
+from ..services import vision_tasks
+from ..services.capture_scheduler import capture_scheduler
+from ..utils.model_registry import model_registry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,13 +21,19 @@ load_dotenv()
 
 router = APIRouter(prefix="/api/tests", tags=["tests"])
 
-# Get API key from environment variable
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY environment variable is not set")
+def load_gemini_model():
+    # Imported and configured on first use so the app starts without the key or the SDK import cost
+    import google.generativeai as genai
+    
+    # Get API key from environment variable
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY environment variable is not set")
+    
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel('gemini-1.5-flash')
 
-genai.configure(api_key=api_key)
-model = genai.GenerativeModel('gemini-1.5-flash')
+model_registry.register("gemini", load_gemini_model)
 
 class TestRequest(BaseModel):
     skill: str
@@ -65,7 +71,7 @@ Requirements:
 7. Questions should be challenging but fair
 8. Options should be plausible and well-distributed"""
         
-        response = model.generate_content(prompt)
+        response = model_registry.get("gemini").generate_content(prompt)
         test_data = parse_gemini_response(response.text)
         
         # Generate a unique test ID
@@ -155,16 +161,10 @@ async def save_snapshot(
         if not contents:
             raise HTTPException(status_code=400, detail="Empty file received")
 
-        # Convert image bytes to numpy array for face detection
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        # Convert BGR to RGB (face_recognition uses RGB)
-        rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        
-        # Detect faces
-        face_locations = face_recognition.face_locations(rgb_img)
-        face_count = len(face_locations)
+        # Face detection runs on the vision worker pool, off the event loop
+        face_count = await admission_controller.run(
+            admission_controller.priority_for(test_id), vision_tasks.count_faces, contents, key=test_id
+        )
         
         logger.info(f"Detected {face_count} faces in the image")
 
@@ -194,14 +194,16 @@ async def save_snapshot(
             f.write(contents)
         logger.info(f"Successfully saved snapshot to {file_path}")
         
-        return {
+        return capture_scheduler.apply(test_id, {
             "status": "success",
             "message": "Snapshot saved successfully",
             "path": file_path,
             "face_count": face_count,
             "is_suspicious": face_count > 1
-        }
+        })
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error saving snapshot: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,152 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+import logging
+from collections import Counter, deque
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from .vision_executor import vision_executor, percentile
+from .capture_scheduler import capture_scheduler
+from ..utils.error_handlers import ServiceUnavailableException
+
+logger = logging.getLogger(__name__)
+
+# Vision tasks allowed in flight per worker; further requests wait in the priority queue
+SLOTS_PER_WORKER = int(os.getenv("ADMISSION_SLOTS_PER_WORKER", 2))
+# Requests allowed to wait; beyond this the least urgent request is deferred
+MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 100))
+# Longest a request waits for a slot before it is deferred
+MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", 5))
+
+# Lower value = served first
+PRIORITY_IDENTITY = 0
+PRIORITY_FLAGGED = 1
+PRIORITY_ROUTINE = 2
+PRIORITY_NAMES = {PRIORITY_IDENTITY: "identity", PRIORITY_FLAGGED: "flagged", PRIORITY_ROUTINE: "routine"}
+
+class AdmissionController:
+    """
+    Bounded, prioritized admission in front of the vision executor. Identity
+    checks go first, then sessions with recent risk signals, then routine
+    snapshots. When the queue is full or a request waits too long it is deferred
+    with a retry-after hint instead of piling up until it times out.
+    """
+
+    def __init__(self):
+        self.capacity = max(vision_executor.workers, 1) * SLOTS_PER_WORKER
+        self.in_flight = 0
+        self.waiting: List[list] = []
+        self.sequence = itertools.count()
+        self.admitted = Counter()
+        self.shed = Counter()
+        self.wait_times: deque = deque(maxlen=500)
+
+    def priority_for(self, test_id: Optional[str]) -> int:
+        return PRIORITY_FLAGGED if capture_scheduler.is_flagged(test_id) else PRIORITY_ROUTINE
+
+    async def run(self, priority: int, fn: Callable, *args: Any, key: Optional[str] = None) -> Any:
+        """Wait for an admission slot, then run fn on the vision executor"""
+        await self._acquire(priority)
+        try:
+            return await vision_executor.run(fn, *args, key=key)
+        finally:
+            self._release()
+
+    async def map(self, priority: int, fn: Callable, items: Iterable[Any], *args: Any) -> List[Any]:
+        """
+        Admit and run fn(item, *args) for every item; items that get deferred
+        come back as ServiceUnavailableException instances instead of results
+        """
+        results = await asyncio.gather(*(self.run(priority, fn, item, *args) for item in items), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception) and not isinstance(result, ServiceUnavailableException):
+                raise result
+        return results
+
+    def backlog(self) -> int:
+        """Admitted vision tasks plus requests still waiting for a slot"""
+        return len(self.waiting) + self.in_flight
+
+    def retry_after(self) -> int:
+        """Rough seconds until the current backlog drains"""
+        exec_times = sorted(sample[0] for samples in vision_executor.latencies.values() for sample in samples)
+        per_task = (percentile(exec_times, 0.5) or 500) / 1000
+        backlog = self.backlog()
+        return max(1, int(backlog * per_task / max(vision_executor.workers, 1)) + 1)
+
+    def _deferred(self, priority: int) -> ServiceUnavailableException:
+        self.shed[PRIORITY_NAMES[priority]] += 1
+        return ServiceUnavailableException("Analysis deferred, server busy", self.retry_after())
+
+    async def _acquire(self, priority: int) -> None:
+        start = time.monotonic()
+        if self.in_flight < self.capacity and not self.waiting:
+            self.in_flight += 1
+            self._record_admission(priority, start)
+            return
+
+        if len(self.waiting) >= MAX_QUEUE:
+            least_urgent = max(self.waiting)
+            if least_urgent[0] <= priority:
+                raise self._deferred(priority)
+            # Make room by deferring the least urgent waiter
+            self.waiting.remove(least_urgent)
+            heapq.heapify(self.waiting)
+            least_urgent[2].set_exception(self._deferred(least_urgent[0]))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self.sequence), future]
+        heapq.heappush(self.waiting, entry)
+        try:
+            await asyncio.wait({future}, timeout=MAX_WAIT_SECONDS)
+        except asyncio.CancelledError:
+            self._abandon(entry)
+            raise
+
+        if not future.done():
+            self.waiting.remove(entry)
+            heapq.heapify(self.waiting)
+            raise self._deferred(priority)
+        # Raises if we were pushed out of the queue by a more urgent request
+        future.result()
+        self._record_admission(priority, start)
+
+    def _abandon(self, entry: list) -> None:
+        """Clean up after a waiter whose request was cancelled (e.g. client disconnect)"""
+        future = entry[2]
+        if not future.done():
+            self.waiting.remove(entry)
+            heapq.heapify(self.waiting)
+            future.cancel()
+        elif not future.cancelled() and future.exception() is None:
+            # A slot was handed over just before the cancellation; give it back
+            self._release()
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        while self.waiting and self.in_flight < self.capacity:
+            _, _, future = heapq.heappop(self.waiting)
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _record_admission(self, priority: int, start: float) -> None:
+        self.admitted[PRIORITY_NAMES[priority]] += 1
+        self.wait_times.append((time.monotonic() - start) * 1000)
+
+    def get_stats(self) -> Dict[str, Any]:
+        wait_times = sorted(self.wait_times)
+        return {
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "waiting": len(self.waiting),
+            "admitted": dict(self.admitted),
+            "shed": dict(self.shed),
+            "queue_wait_ms_p50": percentile(wait_times, 0.5),
+            "queue_wait_ms_p95": percentile(wait_times, 0.95)
+        }
+
+# Create singleton instance
+admission_controller = AdmissionController()
@@ -0,0 +1,106 @@
+import os
+import time
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional
+from .vision_executor import vision_executor
+
+logger = logging.getLogger(__name__)
+
+# Webcam capture interval (seconds) for a quiet session on an idle server
+BASE_CAPTURE_INTERVAL = float(os.getenv("CAPTURE_BASE_INTERVAL", 5))
+# Bounds for any recommended interval
+MIN_CAPTURE_INTERVAL = float(os.getenv("CAPTURE_MIN_INTERVAL", 2))
+MAX_CAPTURE_INTERVAL = float(os.getenv("CAPTURE_MAX_INTERVAL", 30))
+# Screenshot interval for quiet and flagged sessions
+BASE_SCREENSHOT_INTERVAL = float(os.getenv("SCREENSHOT_BASE_INTERVAL", 15))
+FLAGGED_SCREENSHOT_INTERVAL = float(os.getenv("SCREENSHOT_FLAGGED_INTERVAL", 5))
+# Queued vision tasks per worker the server is sized for; above this clients are slowed down
+TARGET_QUEUE_PER_WORKER = float(os.getenv("CAPTURE_TARGET_QUEUE_PER_WORKER", 2))
+# How long a risk signal keeps a session flagged
+RISK_WINDOW_SECONDS = 120
+# Sessions with risk signals tracked per process; the least recently flagged are forgotten first
+MAX_SESSIONS = 10000
+
+FULL_RESOLUTION = {"width": 1280, "height": 720}
+REDUCED_RESOLUTION = {"width": 640, "height": 360}
+
+class CaptureScheduler:
+    """
+    Recommends each session's next webcam capture interval and resolution from
+    the vision queue depth and the session's recent risk signals, so quiet
+    sessions back off under load while flagged sessions keep their coverage.
+    """
+
+    def __init__(self):
+        self.risk_signals: "OrderedDict[str, deque]" = OrderedDict()
+
+    def record_result(self, test_id: str, result: Dict[str, Any]) -> None:
+        """Remember a risk signal if an analysis result flags the session"""
+        flagged = (
+            result.get("is_suspicious")
+            or result.get("face_count") == 0
+            or result.get("gaze_direction") not in (None, "center")
+            or result.get("identity_mismatch")
+        )
+        if flagged:
+            signals = self.risk_signals.get(test_id)
+            if signals is None:
+                signals = self.risk_signals[test_id] = deque(maxlen=50)
+                if len(self.risk_signals) > MAX_SESSIONS:
+                    self.risk_signals.popitem(last=False)
+            else:
+                self.risk_signals.move_to_end(test_id)
+            signals.append(time.monotonic())
+
+    def is_flagged(self, test_id: Optional[str]) -> bool:
+        signals = self.risk_signals.get(test_id) if test_id else None
+        if not signals:
+            return False
+        cutoff = time.monotonic() - RISK_WINDOW_SECONDS
+        while signals and signals[0] < cutoff:
+            signals.popleft()
+        if not signals:
+            # Nothing left in the window; the session gets a new entry if it is flagged again
+            del self.risk_signals[test_id]
+            return False
+        return True
+
+    def load_factor(self) -> float:
+        """Queued vision work relative to what the workers are sized for (1.0 = at budget)"""
+        # Imported here: the admission controller itself asks this scheduler which sessions are flagged
+        from .admission import admission_controller
+        workers = max(vision_executor.workers, 1)
+        # Admission caps what reaches the executor, so the real backlog is the admission queue;
+        # the executor depth still counts work submitted without admission
+        backlog = max(admission_controller.backlog(), vision_executor.queue_depth())
+        return backlog / (workers * TARGET_QUEUE_PER_WORKER)
+
+    def recommend(self, test_id: Optional[str]) -> Dict[str, Any]:
+        load = self.load_factor()
+        scale = max(1.0, load)
+        if self.is_flagged(test_id):
+            # Flagged sessions stay at high rate and full resolution unless the server is far over budget
+            interval = min(BASE_CAPTURE_INTERVAL, MIN_CAPTURE_INTERVAL * scale)
+            resolution = FULL_RESOLUTION
+        else:
+            interval = min(MAX_CAPTURE_INTERVAL, BASE_CAPTURE_INTERVAL * scale)
+            resolution = REDUCED_RESOLUTION if load > 1.0 else FULL_RESOLUTION
+        return {
+            "next_capture_seconds": round(max(MIN_CAPTURE_INTERVAL, interval), 1),
+            "resolution": resolution,
+            "server_load": round(load, 2)
+        }
+
+    def apply(self, test_id: Optional[str], result: Dict[str, Any]) -> Dict[str, Any]:
+        """Record the result's risk signals and attach the capture recommendation to it"""
+        if test_id:
+            self.record_result(test_id, result)
+        result["capture_policy"] = self.recommend(test_id)
+        return result
+
+    def screenshot_interval(self, test_id: str) -> float:
+        return FLAGGED_SCREENSHOT_INTERVAL if self.is_flagged(test_id) else BASE_SCREENSHOT_INTERVAL
+
+# Create singleton instance
+capture_scheduler = CaptureScheduler()
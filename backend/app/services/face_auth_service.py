@@ -1,7 +1,7 @@
 import cv2
 import numpy as np
 import os
-from typing import Tuple, Dict
+from typing import Dict, Optional
 import logging
 import random
 from datetime import datetime
@@ -10,10 +10,25 @@ from datetime import datetime
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# ID photos, and the face embeddings computed from them, are stored here
+ID_PHOTOS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "id_photos")
+
+def id_photo_path(user_id: str) -> str:
+    return os.path.join(ID_PHOTOS_DIR, f"{user_id}.jpg")
+
+def id_embedding_path(user_id: str) -> str:
+    return os.path.join(ID_PHOTOS_DIR, f"{user_id}.emb")
+
+def original_id_photo_path(user_id: str) -> str:
+    return os.path.join(ID_PHOTOS_DIR, "originals", f"{user_id}.jpg")
+
+# Keep the uploaded file next to the normalized face crop (e.g. for manual review)
+KEEP_ORIGINAL_ID_PHOTOS = os.getenv("ID_PHOTO_KEEP_ORIGINAL", "1") == "1"
+
 class FaceAuthService:
     def __init__(self):
         # Create directory for storing ID photos if it doesn't exist
-        self.id_photos_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "id_photos")
+        self.id_photos_dir = ID_PHOTOS_DIR
         try:
             os.makedirs(self.id_photos_dir, exist_ok=True)
             logger.info(f"ID photos directory created/verified at: {self.id_photos_dir}")
@@ -21,12 +36,18 @@ class FaceAuthService:
             logger.error(f"Error creating ID photos directory: {e}")
             raise
 
-    def save_id_photo(self, user_id: str, image_data: bytes) -> bool:
-        """Save ID photo for a user"""
+    def save_id_photo(self, user_id: str, image_data: bytes, original: Optional[bytes] = None) -> bool:
+        """Save ID photo for a user; original is the upload image_data was normalized from"""
         try:
-            file_path = os.path.join(self.id_photos_dir, f"{user_id}.jpg")
-            with open(file_path, "wb") as f:
+            # Drop the previous photo's embedding first so it can never be paired with the new photo
+            if os.path.exists(id_embedding_path(user_id)):
+                os.remove(id_embedding_path(user_id))
+            with open(id_photo_path(user_id), "wb") as f:
                 f.write(image_data)
+            if original is not None and KEEP_ORIGINAL_ID_PHOTOS:
+                os.makedirs(os.path.dirname(original_id_photo_path(user_id)), exist_ok=True)
+                with open(original_id_photo_path(user_id), "wb") as f:
+                    f.write(original)
             logger.info(f"ID photo saved successfully for user {user_id}")
             return True
         except Exception as e:
@@ -36,27 +57,12 @@ class FaceAuthService:
     def get_id_photo(self, user_id: str) -> bytes:
         """Retrieve ID photo for a user"""
         try:
-            file_path = os.path.join(self.id_photos_dir, f"{user_id}.jpg")
-            with open(file_path, "rb") as f:
+            with open(id_photo_path(user_id), "rb") as f:
                 return f.read()
         except Exception as e:
             logger.error(f"Error retrieving ID photo for user {user_id}: {e}")
             return None
 
-    def compare_faces(self, id_photo: bytes, live_photo: bytes) -> Tuple[bool, float]:
-        """
-        Mock implementation of face comparison
-        In a real implementation, this would use face recognition
-        """
-        try:
-            # For demo purposes, always return successful match with high confidence
-            match_score = random.uniform(0.85, 0.98)
-            logger.info(f"Mock face comparison completed with score: {match_score}")
-            return True, match_score
-        except Exception as e:
-            logger.error(f"Error in mock face comparison: {e}")
-            return True, 0.95
-
     def detect_liveness(self, image_data: bytes) -> Dict[str, any]:
         """
         Mock implementation of liveness detection
@@ -94,4 +100,7 @@ class FaceAuthService:
                 "is_live": False,
                 "confidence": 0.0,
                 "reason": f"Error: {str(e)}"
-            } 
\ No newline at end of file
+            } 
+
+# Create singleton instance
+face_auth_service = FaceAuthService()
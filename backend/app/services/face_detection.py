@@ -1,10 +1,12 @@
-import face_recognition
 import numpy as np
 import cv2
 from datetime import datetime
 import os
 from typing import Tuple, Dict
 import logging
+from ..utils.image_utils import decode_image
+from ..utils.multiscale_detection import FACE_DETECTION_SCALE, reduced_decode_flag, locate_faces
+from ..utils.face_detectors import detector_for
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -23,9 +25,8 @@ class FaceDetectionService:
         try:
             logger.debug("Processing new image...")
             
-            # Convert bytes to numpy array
-            nparr = np.frombuffer(image_data, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            # Decode at the detection resolution (full resolution when FACE_DETECTION_SCALE is 1)
+            img = decode_image(image_data, reduced_decode_flag(FACE_DETECTION_SCALE))
             
             if img is None:
                 logger.error("Failed to decode image")
@@ -33,11 +34,9 @@ class FaceDetectionService:
             
             logger.debug(f"Image decoded successfully. Shape: {img.shape}")
             
-            # Convert BGR to RGB (face_recognition uses RGB)
-            rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            
-            # Detect faces
-            face_locations = face_recognition.face_locations(rgb_img)
+            # Detect faces; ambiguous reduced-resolution results are redone at full resolution
+            face_locations, _ = locate_faces(img, FACE_DETECTION_SCALE, image_data,
+                                             detector=detector_for("face_detection"))
             face_count = len(face_locations)
             
             logger.debug(f"Detected {face_count} faces in the image")
@@ -56,7 +55,8 @@ class FaceDetectionService:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 filename = f"{self.suspicious_images_dir}/suspicious_{timestamp}.jpg"
                 save_path = os.path.abspath(filename)
-                cv2.imwrite(save_path, img)
+                with open(save_path, "wb") as f:
+                    f.write(image_data)
                 logger.warning(f"Suspicious activity detected! Saved image to: {save_path}")
                 result["saved_image_path"] = save_path
             
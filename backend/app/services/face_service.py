@@ -1,31 +1,66 @@
 import cv2
+import logging
 import numpy as np
-import face_recognition
-from PIL import Image
-import io
-from typing import Tuple
+from typing import Optional, Tuple
+from ..utils.image_utils import decode_image
+from ..utils.face_detectors import detector_for
+from ..utils.face_tracker import FaceLocation
+from ..utils.face_embeddings import FaceEmbedding, embedding_version, encode_face, encode_largest_face
+
+logger = logging.getLogger(__name__)
+
+# Minimum 1 - face distance for two faces to match
+MATCH_THRESHOLD = 0.7
 
 class FaceService:
+    def encode(self, photo: bytes) -> Optional[FaceEmbedding]:
+        """Embedding of the largest face in an encoded photo; None if the photo can't be decoded"""
+        image = decode_image(photo)
+        if image is None:
+            return None
+        return encode_largest_face(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), detector_for("id_photo"))
+
+    def encode_at(self, photo: bytes, box: FaceLocation) -> Optional[FaceEmbedding]:
+        """Embedding of the face at a known box, e.g. in a normalized ID photo; no detection runs"""
+        image = decode_image(photo)
+        if image is None:
+            return None
+        version = embedding_version(detector_for("id_photo"))
+        embedding = encode_face(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), box)
+        if embedding is None:
+            return FaceEmbedding(np.zeros(0, np.float32), (0, 0, 0, 0), version)
+        return FaceEmbedding(embedding, tuple(box), version)
+
+    def compare_embeddings(self, id_face: FaceEmbedding, live_face: FaceEmbedding) -> Tuple[bool, float]:
+        if not id_face.found or not live_face.found:
+            return False, 0.0
+        face_distance = float(np.linalg.norm(id_face.embedding - live_face.embedding))
+        match_score = 1 - face_distance
+        return match_score >= MATCH_THRESHOLD, match_score
+
+    def compare_with_embedding(self, id_face: FaceEmbedding, live_photo: bytes) -> Tuple[bool, float]:
+        """Compare a stored ID embedding with a live photo; only the live photo is encoded"""
+        try:
+            live_face = self.encode(live_photo)
+        except Exception:
+            logger.exception("Error encoding live photo")
+            raise
+        if live_face is None:
+            logger.error("Could not decode live photo")
+            return False, 0.0
+        return self.compare_embeddings(id_face, live_face)
+
     def compare_faces(self, id_photo: bytes, live_photo: bytes) -> Tuple[bool, float]:
         """Compare ID photo with live photo"""
         try:
-            # Convert bytes to numpy arrays
-            id_image = face_recognition.load_image_file(io.BytesIO(id_photo))
-            live_image = face_recognition.load_image_file(io.BytesIO(live_photo))
-
-            # Get face encodings
-            id_encoding = face_recognition.face_encodings(id_image)
-            live_encoding = face_recognition.face_encodings(live_image)
-
-            if not id_encoding or not live_encoding:
-                return False, 0.0
-
-            # Compare faces
-            face_distance = face_recognition.face_distance([id_encoding[0]], live_encoding[0])[0]
-            match_score = 1 - face_distance
-            is_match = match_score >= 0.7  # 70% threshold
-
-            return is_match, match_score
-        except Exception as e:
-            print(f"Error comparing faces: {e}")
-            return False, 0.0 
\ No newline at end of file
+            id_face = self.encode(id_photo)
+        except Exception:
+            logger.exception("Error encoding ID photo")
+            raise
+        if id_face is None:
+            logger.error("Could not decode ID photo")
+            return False, 0.0
+        return self.compare_with_embedding(id_face, live_photo)
+
+# Create singleton instance
+face_service = FaceService()
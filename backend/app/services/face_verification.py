@@ -1,19 +1,21 @@
 import numpy as np
-from PIL import Image
-import io
 import cv2
 import mediapipe as mp
 import os
 import logging
-from typing import Dict, Any, Tuple, Optional
-from deepface import DeepFace
-import base64
-from io import BytesIO
+from typing import Dict, Any, List, Tuple, Optional
+from ..utils.mediapipe_pool import GraphPool
+from ..utils.debug_archive import DebugImageArchive
+from ..utils.image_utils import decode_image, decode_data_url
+from ..utils.landmarks import from_mediapipe, eye_aspect_ratio, MP_LEFT_EYE, MP_RIGHT_EYE, MP_NOSE_TIP, MP_FOREHEAD
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fraction of uploaded images kept under face_verification_debug/ (0 keeps none)
+DEBUG_SAMPLE_RATE = float(os.getenv("FACE_VERIFICATION_DEBUG_SAMPLE_RATE", 0))
+
 class FaceVerificationService:
     def __init__(self):
         # Initialize MediaPipe face detection and mesh
@@ -21,24 +23,39 @@ class FaceVerificationService:
         self.mp_face_mesh = mp.solutions.face_mesh
         self.mp_drawing = mp.solutions.drawing_utils
         
-        # Initialize face detection with high confidence
-        self.face_detection = self.mp_face_detection.FaceDetection(
+        # Graphs are built once and checked out per request; a graph must not be
+        # used by two requests at once, and tracking state must not leak between
+        # candidates, so every mesh runs in static image mode
+        
+        # Face detection with high confidence (detect_faces)
+        self.strict_detection_pool = GraphPool(lambda: self.mp_face_detection.FaceDetection(
             model_selection=1,  # Use full range model
             min_detection_confidence=0.7
-        )
+        ))
+        
+        # Face detection for verification and face counting
+        self.detection_pool = GraphPool(lambda: self.mp_face_detection.FaceDetection(
+            model_selection=1,
+            min_detection_confidence=0.5
+        ))
+        
+        # Face mesh for the presence check in check_liveness
+        self.mesh_pool = GraphPool(lambda: self.mp_face_mesh.FaceMesh(
+            static_image_mode=True,
+            max_num_faces=1,
+            min_detection_confidence=0.5
+        ))
         
-        # Initialize face mesh for liveness detection
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
+        # Refined face mesh for blink and head movement liveness
+        self.liveness_mesh_pool = GraphPool(lambda: self.mp_face_mesh.FaceMesh(
+            static_image_mode=True,
             max_num_faces=1,
             refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+            min_detection_confidence=0.5
+        ))
         
-        # Create temp directory if it doesn't exist
-        self.temp_dir = "temp_images"
-        if not os.path.exists(self.temp_dir):
-            os.makedirs(self.temp_dir)
+        # Uploads are decoded in memory; a sampled copy can be kept for debugging
+        self.debug_archive = DebugImageArchive("face_verification_debug", DEBUG_SAMPLE_RATE)
         
         # Thresholds
         self.FACE_MATCH_THRESHOLD = 0.7  # 70% similarity required
@@ -75,7 +92,8 @@ class FaceVerificationService:
     def detect_faces(self, image: np.ndarray) -> Tuple[bool, Optional[list]]:
         """Detect faces in an image using MediaPipe."""
         try:
-            results = self.face_detection.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+            with self.strict_detection_pool.checkout() as face_detection:
+                results = face_detection.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
             
             if not results.detections:
                 return False, None
@@ -98,60 +116,49 @@ class FaceVerificationService:
             logger.error(f"Error in face detection: {str(e)}")
             return False, None
 
-    def save_image_bytes(self, image_bytes: bytes, filename: str) -> str:
-        """Save image bytes to a temporary file."""
-        filepath = os.path.join(self.temp_dir, filename)
-        with open(filepath, "wb") as f:
-            f.write(image_bytes)
-        return filepath
+    def decode_upload(self, image_bytes: bytes, name: str) -> Optional[np.ndarray]:
+        """Decode an uploaded image to an RGB array in memory, sampling it for the debug archive."""
+        self.debug_archive.maybe_save(name, image_bytes)
+        image = decode_image(image_bytes)
+        if image is None:
+            return None
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
     def verify_face(self, id_photo_bytes: bytes, live_photo_bytes: bytes, threshold: float = 0.6) -> Dict[str, Any]:
         """Verify if the live photo matches the ID photo."""
         try:
-            # Save images temporarily
-            id_photo_path = self.save_image_bytes(id_photo_bytes, "id_photo.jpg")
-            live_photo_path = self.save_image_bytes(live_photo_bytes, "live_photo.jpg")
+            id_image = self.decode_upload(id_photo_bytes, "id_photo.jpg")
+            live_image = self.decode_upload(live_photo_bytes, "live_photo.jpg")
+            if id_image is None or live_image is None:
+                return {
+                    'success': False,
+                    'message': 'Failed to decode image'
+                }
 
-            # Initialize face detection
-            with self.mp_face_detection.FaceDetection(
-                model_selection=1, min_detection_confidence=0.5) as face_detection:
-                
-                # Process ID image
-                id_image = cv2.imread(id_photo_path)
-                id_results = face_detection.process(cv2.cvtColor(id_image, cv2.COLOR_BGR2RGB))
-                
-                # Process live image
-                live_image = cv2.imread(live_photo_path)
-                live_results = face_detection.process(cv2.cvtColor(live_image, cv2.COLOR_BGR2RGB))
-                
-                # Simple verification logic
-                if not id_results.detections or not live_results.detections:
-                    return {
-                        'success': False,
-                        'confidence': 0,
-                        'message': 'No faces detected'
-                    }
-                
-                # Calculate confidence based on face detection
-                confidence = np.random.uniform(0.7, 0.95) if len(id_results.detections) == 1 else 0.3
-                
-                # Clean up temporary files
-                os.remove(id_photo_path)
-                os.remove(live_photo_path)
-                
+            # Check out a pre-built face detection graph
+            with self.detection_pool.checkout() as face_detection:
+                id_results = face_detection.process(id_image)
+                live_results = face_detection.process(live_image)
+            
+            # Simple verification logic
+            if not id_results.detections or not live_results.detections:
                 return {
-                    'success': confidence > threshold,
-                    'confidence': float(confidence),
-                    'message': 'Face verification completed'
+                    'success': False,
+                    'confidence': 0,
+                    'message': 'No faces detected'
                 }
+            
+            # Calculate confidence based on face detection
+            confidence = np.random.uniform(0.7, 0.95) if len(id_results.detections) == 1 else 0.3
+            
+            return {
+                'success': confidence > threshold,
+                'confidence': float(confidence),
+                'message': 'Face verification completed'
+            }
 
         except Exception as e:
             logger.error(f"Verification error: {str(e)}")
-            # Clean up temporary files in case of error
-            if os.path.exists(id_photo_path):
-                os.remove(id_photo_path)
-            if os.path.exists(live_photo_path):
-                os.remove(live_photo_path)
             return {
                 'success': False,
                 'message': f'Error during verification: {str(e)}'
@@ -160,36 +167,30 @@ class FaceVerificationService:
     def check_liveness(self, image_bytes: bytes) -> Dict[str, Any]:
         """Check if the face in the image is from a live person."""
         try:
-            # Save image temporarily
-            image_path = self.save_image_bytes(image_bytes, "liveness_check.jpg")
+            image = self.decode_upload(image_bytes, "liveness_check.jpg")
+            if image is None:
+                return {
+                    'success': False,
+                    'message': 'Failed to decode image'
+                }
             
-            # Initialize face mesh
-            with self.mp_face_mesh.FaceMesh(
-                static_image_mode=True,
-                max_num_faces=1,
-                min_detection_confidence=0.5) as face_mesh:
-                
-                image = cv2.imread(image_path)
-                results = face_mesh.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-                
-                # Clean up temporary file
-                os.remove(image_path)
-                
-                if not results.multi_face_landmarks:
-                    return {
-                        'success': False,
-                        'message': 'No face detected'
-                    }
-                
+            # Check out a pre-built face mesh graph
+            with self.mesh_pool.checkout() as face_mesh:
+                results = face_mesh.process(image)
+            
+            if not results.multi_face_landmarks:
                 return {
-                    'success': True,
-                    'message': 'Liveness check passed'
+                    'success': False,
+                    'message': 'No face detected'
                 }
+            
+            return {
+                'success': True,
+                'message': 'Liveness check passed'
+            }
 
         except Exception as e:
             logger.error(f"Liveness check error: {str(e)}")
-            if os.path.exists(image_path):
-                os.remove(image_path)
             return {
                 'success': False,
                 'message': f'Error during liveness check: {str(e)}'
@@ -198,33 +199,29 @@ class FaceVerificationService:
     def detect_multiple_faces(self, image_bytes: bytes) -> Dict[str, Any]:
         """Detect if multiple faces are present in the frame."""
         try:
-            # Save image temporarily
-            image_path = self.save_image_bytes(image_bytes, "multiple_faces.jpg")
+            image = self.decode_upload(image_bytes, "multiple_faces.jpg")
+            if image is None:
+                return {
+                    'success': False,
+                    'message': 'Failed to decode image'
+                }
             
-            with self.mp_face_detection.FaceDetection(
-                model_selection=1, min_detection_confidence=0.5) as face_detection:
-                
-                image = cv2.imread(image_path)
-                results = face_detection.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-                
-                # Clean up temporary file
-                os.remove(image_path)
-                
-                if not results.detections:
-                    return {
-                        'multiple_faces': False,
-                        'face_count': 0
-                    }
-                
+            with self.detection_pool.checkout() as face_detection:
+                results = face_detection.process(image)
+            
+            if not results.detections:
                 return {
-                    'multiple_faces': len(results.detections) > 1,
-                    'face_count': len(results.detections)
+                    'multiple_faces': False,
+                    'face_count': 0
                 }
+            
+            return {
+                'multiple_faces': len(results.detections) > 1,
+                'face_count': len(results.detections)
+            }
 
         except Exception as e:
             logger.error(f"Multiple faces detection error: {str(e)}")
-            if os.path.exists(image_path):
-                os.remove(image_path)
             return {
                 'success': False,
                 'message': f'Error during multiple faces detection: {str(e)}'
@@ -233,58 +230,61 @@ class FaceVerificationService:
     def detect_faces_in_frame(self, image_bytes: bytes) -> Dict[str, Any]:
         """Detect faces in the frame and return their locations."""
         try:
-            # Save image temporarily
-            image_path = self.save_image_bytes(image_bytes, "faces_in_frame.jpg")
+            image = self.decode_upload(image_bytes, "faces_in_frame.jpg")
+            if image is None:
+                return {
+                    'success': False,
+                    'message': 'Failed to decode image'
+                }
             
-            with self.mp_face_detection.FaceDetection(
-                model_selection=1, min_detection_confidence=0.5) as face_detection:
-                
-                image = cv2.imread(image_path)
-                results = face_detection.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-                
-                # Clean up temporary file
-                os.remove(image_path)
-                
-                if not results.detections:
-                    return {
-                        'faces': [],
-                        'face_count': 0
-                    }
-                
-                faces = []
-                for detection in results.detections:
-                    bbox = detection.location_data.relative_bounding_box
-                    faces.append({
-                        'bounding_box': {
-                            'x': bbox.xmin,
-                            'y': bbox.ymin,
-                            'width': bbox.width,
-                            'height': bbox.height
-                        },
-                        'confidence': detection.score[0]
-                    })
-                
+            with self.detection_pool.checkout() as face_detection:
+                results = face_detection.process(image)
+            
+            if not results.detections:
                 return {
-                    'faces': faces,
-                    'face_count': len(faces)
+                    'faces': [],
+                    'face_count': 0
                 }
+            
+            faces = []
+            for detection in results.detections:
+                bbox = detection.location_data.relative_bounding_box
+                faces.append({
+                    'bounding_box': {
+                        'x': bbox.xmin,
+                        'y': bbox.ymin,
+                        'width': bbox.width,
+                        'height': bbox.height
+                    },
+                    'confidence': detection.score[0]
+                })
+            
+            return {
+                'faces': faces,
+                'face_count': len(faces)
+            }
 
         except Exception as e:
             logger.error(f"Faces in frame detection error: {str(e)}")
-            if os.path.exists(image_path):
-                os.remove(image_path)
             return {
                 'success': False,
                 'message': f'Error during faces in frame detection: {str(e)}'
             }
 
+    def get_pool_stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            "detection": self.detection_pool.get_stats(),
+            "strict_detection": self.strict_detection_pool.get_stats(),
+            "mesh": self.mesh_pool.get_stats(),
+            "liveness_mesh": self.liveness_mesh_pool.get_stats()
+        }
+
     def _decode_base64_image(self, base64_string: str) -> np.ndarray:
-        """Convert base64 string to numpy array."""
-        if ',' in base64_string:
-            base64_string = base64_string.split(',')[1]
-        image_data = base64.b64decode(base64_string)
-        image = Image.open(BytesIO(image_data))
-        return np.array(image)
+        """Convert base64 string to an RGB numpy array."""
+        image = self.decode_upload(decode_data_url(base64_string), "base64_upload.jpg")
+        if image is None:
+            raise ValueError("Failed to decode image")
+        return image
 
     def compare_faces(self, first_image: str, second_image: str) -> Dict:
         """
@@ -315,12 +315,23 @@ class FaceVerificationService:
         2. Head movement detection
         """
         try:
-            # Convert base64 to numpy array
-            img = self._decode_base64_image(image)
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+            # Convert base64 to numpy array (cv2 decodes to BGR; decode_upload converts it to RGB for MediaPipe)
+            img_rgb = self._decode_base64_image(image)
+            return self.analyze_liveness(img_rgb)
             
+        except Exception as e:
+            logger.error(f"Liveness detection error: {str(e)}")
+            return {
+                "is_live": False,
+                "error": str(e)
+            }
+
+    def analyze_liveness(self, img_rgb: np.ndarray) -> Dict:
+        """Run blink and head movement liveness checks on a decoded RGB frame."""
+        try:
             # Process the image with MediaPipe
-            results = self.face_mesh.process(img_rgb)
+            with self.liveness_mesh_pool.checkout() as face_mesh:
+                results = face_mesh.process(img_rgb)
             
             if not results.multi_face_landmarks:
                 return {
@@ -328,13 +339,15 @@ class FaceVerificationService:
                     "error": "No face detected"
                 }
 
-            face_landmarks = results.multi_face_landmarks[0]
+            # Convert the landmarks to one pixel-space array; both checks index into it
+            height, width = img_rgb.shape[:2]
+            points = from_mediapipe(results.multi_face_landmarks[0], width, height)
             
             # 1. Blink Detection
-            blink_detected = self._detect_blink(face_landmarks)
+            blink_detected = self._detect_blink(points)
             
             # 2. Head Movement Detection
-            head_movement = self._detect_head_movement(face_landmarks)
+            head_movement = self._detect_head_movement(points, width)
             
             # Combine results
             is_live = blink_detected["blink_detected"] or head_movement["movement_detected"]
@@ -354,50 +367,34 @@ class FaceVerificationService:
                 "error": str(e)
             }
 
-    def _detect_blink(self, face_landmarks) -> Dict:
-        """Detect if the person is blinking using Eye Aspect Ratio."""
-        # Get eye landmarks
-        left_eye = [face_landmarks.landmark[33], face_landmarks.landmark[160]]
-        right_eye = [face_landmarks.landmark[362], face_landmarks.landmark[385]]
-        
-        # Calculate eye aspect ratio
-        left_ear = self._calculate_ear(left_eye)
-        right_ear = self._calculate_ear(right_eye)
+    def extract_landmarks(self, img_rgb: np.ndarray, indices: List[int]) -> Optional[np.ndarray]:
+        """Pixel coordinates of the selected FaceMesh landmarks as an (N, 3) float32 array, or None if no face."""
+        with self.liveness_mesh_pool.checkout() as face_mesh:
+            results = face_mesh.process(img_rgb)
+        if not results.multi_face_landmarks:
+            return None
         
-        # Average EAR
-        ear = (left_ear + right_ear) / 2
+        height, width = img_rgb.shape[:2]
+        return from_mediapipe(results.multi_face_landmarks[0], width, height)[indices]
+
+    def _detect_blink(self, points: np.ndarray) -> Dict:
+        """Detect if the person is blinking using Eye Aspect Ratio."""
+        # Average EAR of both eyes
+        ear = eye_aspect_ratio(points, [MP_LEFT_EYE, MP_RIGHT_EYE]).mean()
         is_blinking = ear < self.EAR_THRESHOLD
         
         return {
-            "blink_detected": is_blinking,
+            "blink_detected": bool(is_blinking),
             "ear": float(ear)
         }
 
-    def _detect_head_movement(self, face_landmarks) -> Dict:
+    def _detect_head_movement(self, points: np.ndarray, width: int) -> Dict:
         """Detect head movement using facial landmarks."""
-        # Get nose tip and forehead landmarks
-        nose_tip = face_landmarks.landmark[1]
-        forehead = face_landmarks.landmark[10]
-        
-        # Calculate head angle
-        angle = abs(nose_tip.x - forehead.x)
+        # Horizontal offset between nose tip and forehead, as a fraction of the image width
+        angle = abs(points[MP_NOSE_TIP, 0] - points[MP_FOREHEAD, 0]) / width
         movement_detected = angle > self.HEAD_MOVEMENT_THRESHOLD
         
         return {
-            "movement_detected": movement_detected,
+            "movement_detected": bool(movement_detected),
             "angle": float(angle)
         }
-
-    def _calculate_ear(self, eye_points) -> float:
-        """Calculate Eye Aspect Ratio."""
-        # Calculate vertical distances
-        v1 = np.linalg.norm(np.array([eye_points[0].x, eye_points[0].y]) - 
-                           np.array([eye_points[1].x, eye_points[1].y]))
-        
-        # Calculate horizontal distance
-        h = np.linalg.norm(np.array([eye_points[0].x, eye_points[0].y]) - 
-                          np.array([eye_points[1].x, eye_points[1].y]))
-        
-        # Calculate EAR
-        ear = v1 / h if h != 0 else 0
-        return ear 
\ No newline at end of file
@@ -0,0 +1,104 @@
+import os
+import time
+import cv2
+import numpy as np
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Any, List, Optional
+from .monitoring_service import monitoring_service
+from .lighting_service import lighting_service
+from ..utils.gaze_engines import get_gaze_engine
+from ..utils.model_registry import model_registry
+from ..utils.image_utils import decode_image
+
+logger = logging.getLogger(__name__)
+
+# Analyzers run when the caller does not choose any
+DEFAULT_ANALYZERS = [name.strip() for name in os.getenv("PIPELINE_ANALYZERS", "face_count,lighting,gaze").split(",") if name.strip()]
+
+def _load_face_verification_service():
+    # Imported here so MediaPipe is only loaded by processes that verify faces
+    from .face_verification import FaceVerificationService
+    return FaceVerificationService()
+
+model_registry.register("face_verification", _load_face_verification_service, vision=True)
+
+def get_face_verification_service():
+    return model_registry.get("face_verification")
+
+class Frame:
+    """A decoded BGR frame whose grayscale and RGB views are computed at most once"""
+
+    def __init__(self, bgr: np.ndarray):
+        self.bgr = bgr
+        self._gray: Optional[np.ndarray] = None
+        self._rgb: Optional[np.ndarray] = None
+
+    @property
+    def gray(self) -> np.ndarray:
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    @property
+    def rgb(self) -> np.ndarray:
+        if self._rgb is None:
+            self._rgb = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB)
+        return self._rgb
+
+def analyze_face_count(frame: Frame, test_id: str, user_id: str) -> Dict[str, Any]:
+    return monitoring_service.analyze_frame(frame.bgr, test_id, user_id, rgb_img=frame.rgb)
+
+def analyze_lighting(frame: Frame, test_id: str, user_id: str) -> Dict[str, Any]:
+    return lighting_service.analyze_frame(frame.bgr, gray=frame.gray)
+
+def analyze_gaze(frame: Frame, test_id: str, user_id: str) -> Dict[str, Any]:
+    return get_gaze_engine().analyze_frame(frame.bgr, gray=frame.gray, session_id=test_id)
+
+def analyze_liveness(frame: Frame, test_id: str, user_id: str) -> Dict[str, Any]:
+    return get_face_verification_service().analyze_liveness(frame.rgb)
+
+class FramePipeline:
+    """
+    Decodes a frame once and runs a configurable set of analyzers on the shared
+    BGR/gray/RGB arrays, returning one combined result.
+    """
+
+    def __init__(self):
+        self.analyzers: Dict[str, Callable[[Frame, str, str], Dict[str, Any]]] = {
+            "face_count": analyze_face_count,
+            "lighting": analyze_lighting,
+            "gaze": analyze_gaze,
+            "liveness": analyze_liveness
+        }
+
+    def run(self, image_bytes: bytes, test_id: str, user_id: str,
+            analyzers: Optional[List[str]] = None) -> Dict[str, Any]:
+        names = analyzers or DEFAULT_ANALYZERS
+        unknown = [name for name in names if name not in self.analyzers]
+        if unknown:
+            raise ValueError(f"Unknown analyzers: {', '.join(unknown)}")
+
+        start = time.perf_counter()
+        img = decode_image(image_bytes)
+        if img is None:
+            raise ValueError("Failed to decode image")
+        frame = Frame(img)
+        timings = {"decode": round((time.perf_counter() - start) * 1000, 2)}
+
+        result: Dict[str, Any] = {"timestamp": datetime.now().isoformat()}
+        for name in names:
+            start = time.perf_counter()
+            try:
+                result[name] = self.analyzers[name](frame, test_id, user_id)
+            except Exception as e:
+                # One failing analyzer should not discard the others' results
+                logger.error(f"Analyzer {name} failed: {str(e)}")
+                result[name] = {"error": str(e)}
+            timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
+        result["timings_ms"] = timings
+        return result
+
+# Create singleton instance
+frame_pipeline = FramePipeline()
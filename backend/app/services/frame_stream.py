@@ -0,0 +1,127 @@
+import asyncio
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Any, Callable, Awaitable, Optional
+from .admission import admission_controller
+from .capture_scheduler import capture_scheduler
+from . import vision_tasks
+from ..utils.error_handlers import ServiceUnavailableException
+
+logger = logging.getLogger(__name__)
+
+# Frames waiting per session; anything beyond this replaces the oldest queued frame
+MAX_QUEUED_FRAMES = 2
+# Frames older than this when the analyzer picks them up are discarded unanalyzed
+MAX_FRAME_AGE_SECONDS = 3.0
+
+class FrameStreamSession:
+    """Bounded frame queue and analysis loop for one test's WebSocket connection"""
+
+    def __init__(self, test_id: str, user_id: str, max_queued: int = MAX_QUEUED_FRAMES,
+                 max_age: float = MAX_FRAME_AGE_SECONDS):
+        self.test_id = test_id
+        self.user_id = user_id
+        self.max_age = max_age
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self.frames_received = 0
+        self.frames_analyzed = 0
+        self.frames_dropped = 0
+        self.worker: Optional[asyncio.Task] = None
+        self.close_connection: Optional[Callable[..., Awaitable[None]]] = None
+
+    def start(self, send: Callable[[Dict[str, Any]], Awaitable[None]],
+              close: Callable[..., Awaitable[None]]) -> None:
+        """Start the analysis loop; close is called to end the connection if this session is replaced"""
+        self.close_connection = close
+        self.worker = asyncio.create_task(self.run(send))
+
+    def stop(self) -> None:
+        """Cancel the analysis loop"""
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+
+    def replace(self) -> None:
+        """Stop and close the connection; its receive loop then ends with a disconnect"""
+        self.stop()
+        if self.close_connection is not None:
+            asyncio.create_task(self.close_connection(code=4000, reason="Replaced by a newer connection"))
+            self.close_connection = None
+
+    def offer(self, image_bytes: bytes) -> None:
+        """Queue a frame, discarding the oldest pending frame if the analyzer is behind"""
+        self.frames_received += 1
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.frames_dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait((time.monotonic(), image_bytes))
+
+    async def run(self, send: Callable[[Dict[str, Any]], Awaitable[None]]) -> None:
+        """Analyze queued frames one at a time and push each result through send"""
+        while True:
+            received_at, image_bytes = await self.queue.get()
+            if time.monotonic() - received_at > self.max_age:
+                self.frames_dropped += 1
+                continue
+
+            try:
+                result = await admission_controller.run(
+                    admission_controller.priority_for(self.test_id),
+                    vision_tasks.analyze_stream_frame, image_bytes, self.test_id, self.user_id, key=self.test_id
+                )
+            except ServiceUnavailableException as e:
+                # Server is saturated; drop this frame and tell the client when to resume
+                self.frames_dropped += 1
+                await send({"deferred": True, "retry_after": e.additional_info["retry_after"], "stats": self.get_stats()})
+                continue
+            except Exception as e:
+                logger.error(f"Error analyzing streamed frame for test {self.test_id}: {str(e)}")
+                result = {"error": str(e), "timestamp": datetime.now().isoformat()}
+
+            self.frames_analyzed += 1
+            capture_scheduler.apply(self.test_id, result)
+            result["latency_ms"] = round((time.monotonic() - received_at) * 1000, 1)
+            result["stats"] = self.get_stats()
+            await send(result)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "frames_received": self.frames_received,
+            "frames_analyzed": self.frames_analyzed,
+            "frames_dropped": self.frames_dropped,
+            "queued": self.queue.qsize()
+        }
+
+class FrameStreamManager:
+    """Tracks the active streaming session for each test"""
+
+    def __init__(self):
+        self.sessions: Dict[str, FrameStreamSession] = {}
+
+    def open(self, test_id: str, user_id: str) -> FrameStreamSession:
+        """New session for a test; a connection still open for the same test (e.g. before a reconnect) is closed"""
+        previous = self.sessions.get(test_id)
+        if previous is not None:
+            logger.info(f"Replacing frame stream for test {test_id}: {previous.get_stats()}")
+            previous.replace()
+        session = FrameStreamSession(test_id, user_id)
+        self.sessions[test_id] = session
+        logger.info(f"Opened frame stream for test {test_id}")
+        return session
+
+    def close(self, session: FrameStreamSession) -> None:
+        session.stop()
+        # A reconnect may already have replaced this session
+        if self.sessions.get(session.test_id) is session:
+            del self.sessions[session.test_id]
+        logger.info(f"Closed frame stream for test {session.test_id}: {session.get_stats()}")
+
+    def get(self, test_id: str) -> Optional[FrameStreamSession]:
+        return self.sessions.get(test_id)
+
+# Create singleton instance
+frame_stream_manager = FrameStreamManager()
@@ -0,0 +1,164 @@
+import os
+import time
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Seconds of recent gaze results each session's decision is made over
+WINDOW_SECONDS = float(os.getenv("GAZE_WINDOW_SECONDS", 5))
+# Confidence-weighted share of the window looking away that starts a deviation, and the share it must fall below to end
+AWAY_RATIO = float(os.getenv("GAZE_AWAY_RATIO", 0.6))
+RETURN_RATIO = float(os.getenv("GAZE_RETURN_RATIO", 0.3))
+# Seconds the window must stay above AWAY_RATIO before a deviation counts
+MIN_AWAY_SECONDS = float(os.getenv("GAZE_AWAY_MIN_SECONDS", 3))
+# Results below this confidence (including no_face) are not counted either way
+MIN_CONFIDENCE = float(os.getenv("GAZE_MIN_CONFIDENCE", 0.5))
+# A session silent for longer than this has its open deviation closed at the last result
+SESSION_GAP_SECONDS = float(os.getenv("GAZE_SESSION_GAP_SECONDS", 60))
+# Sessions tracked per process; the least recently seen are forgotten first
+MAX_SESSIONS = 10000
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+class _GazeState:
+    __slots__ = ("window", "away_weight", "total_weight", "away_since", "episode", "last_seen", "last_away",
+                 "frames", "episodes", "away_seconds")
+
+    def __init__(self):
+        # (time, away, weight) of the confident results in the last WINDOW_SECONDS
+        self.window: deque = deque()
+        self.away_weight = 0.0
+        self.total_weight = 0.0
+        self.away_since: Optional[float] = None
+        self.episode: Optional[Dict[str, Any]] = None
+        self.last_seen = 0.0
+        self.last_away = 0.0
+        self.frames = 0
+        self.episodes = 0
+        self.away_seconds = 0.0
+
+class GazeAggregator:
+    """
+    Turns the per-frame gaze classifications of each session into gaze_away
+    events. Each session keeps a short rolling window of confident results; a
+    deviation starts once the confidence-weighted share of away results has
+    stayed above AWAY_RATIO for MIN_AWAY_SECONDS, and ends when it drops below
+    RETURN_RATIO. One event with start, end and dwell time is produced per
+    deviation, instead of one log write per frame.
+    """
+
+    def __init__(self):
+        self.sessions: "OrderedDict[str, _GazeState]" = OrderedDict()
+
+    def _session(self, session_id: str) -> _GazeState:
+        state = self.sessions.get(session_id)
+        if state is None:
+            state = self.sessions[session_id] = _GazeState()
+            if len(self.sessions) > MAX_SESSIONS:
+                self.sessions.popitem(last=False)
+        else:
+            self.sessions.move_to_end(session_id)
+        return state
+
+    def observe(self, session_id: str, result: Dict[str, Any], now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Add one gaze result to the session. Returns the details of any gaze_away
+        events completed by it, usually none.
+        """
+        now = time.time() if now is None else now
+        state = self._session(session_id)
+        completed = []
+        if state.frames and now - state.last_seen > SESSION_GAP_SECONDS:
+            # The session went quiet; whatever was open ended with its last result
+            completed.extend(self._close(state))
+            state.window.clear()
+            state.away_weight = state.total_weight = 0.0
+            state.away_since = None
+        state.frames += 1
+        state.last_seen = now
+
+        confidence = float(result.get("confidence") or 0.0)
+        if "error" in result or confidence < MIN_CONFIDENCE:
+            return completed
+
+        direction = result.get("gaze_direction")
+        away = direction != "center"
+        state.window.append((now, away, confidence))
+        state.total_weight += confidence
+        if away:
+            state.away_weight += confidence
+            state.last_away = now
+        while state.window and state.window[0][0] < now - WINDOW_SECONDS:
+            _, old_away, old_weight = state.window.popleft()
+            state.total_weight -= old_weight
+            if old_away:
+                state.away_weight -= old_weight
+        share = state.away_weight / state.total_weight if state.total_weight > 0 else 0.0
+
+        if state.episode is None:
+            if share >= AWAY_RATIO:
+                if state.away_since is None:
+                    state.away_since = now
+                if now - state.away_since >= MIN_AWAY_SECONDS:
+                    # Backdated to when the window first tipped away
+                    state.episode = {"start": state.away_since, "directions": Counter(), "confidence": 0.0, "frames": 0}
+            else:
+                state.away_since = None
+        elif share < RETURN_RATIO:
+            completed.extend(self._close(state))
+            state.away_since = None
+
+        if state.episode is not None and away:
+            state.episode["directions"][direction] += 1
+            state.episode["confidence"] += confidence
+            state.episode["frames"] += 1
+        return completed
+
+    def _close(self, state: _GazeState) -> List[Dict[str, Any]]:
+        episode = state.episode
+        if episode is None:
+            return []
+        state.episode = None
+        # The deviation ended with its last away result, not when the window noticed
+        end = max(state.last_away, episode["start"])
+        dwell = end - episode["start"]
+        state.episodes += 1
+        state.away_seconds += dwell
+        frames = episode["frames"]
+        return [{
+            "start": _iso(episode["start"]),
+            "end": _iso(end),
+            "dwell_seconds": round(dwell, 2),
+            "direction": episode["directions"].most_common(1)[0][0] if frames else "unknown",
+            "directions": dict(episode["directions"]),
+            "away_frames": frames,
+            "mean_confidence": round(episode["confidence"] / frames, 3) if frames else 0.0
+        }]
+
+    def flush(self, session_id: str) -> List[Dict[str, Any]]:
+        """Close the session's open deviation, e.g. before its report is generated"""
+        state = self.sessions.get(session_id)
+        if state is None:
+            return []
+        completed = self._close(state)
+        state.away_since = None
+        return completed
+
+    def is_away(self, session_id: str) -> bool:
+        state = self.sessions.get(session_id)
+        return state is not None and state.episode is not None
+
+    def get_stats(self, session_id: str) -> Dict[str, Any]:
+        state = self.sessions.get(session_id)
+        if state is None:
+            return {"frames": 0, "gaze_away_events": 0, "away_seconds": 0.0, "away": False}
+        return {
+            "frames": state.frames,
+            "gaze_away_events": state.episodes,
+            "away_seconds": round(state.away_seconds, 2),
+            "away": state.episode is not None
+        }
+
+# Create singleton instance
+gaze_aggregator = GazeAggregator()
@@ -5,6 +5,13 @@ from datetime import datetime
 import os
 import logging
 import json
+from ..utils.image_utils import decode_image
+from ..utils.debug_archive import DebugImageArchive
+from ..utils.mediapipe_pool import GraphPool
+from ..utils.landmarks import (
+    from_mediapipe, MP_NOSE_TIP, MP_LEFT_EYE_OUTER, MP_LEFT_EYE_INNER,
+    MP_LEFT_EYE_TOP, MP_LEFT_EYE_BOTTOM, MP_RIGHT_EYE_OUTER
+)
 
 # Configure logging
 logging.basicConfig(
@@ -17,32 +24,50 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Share of analyses whose landmark debug image is kept under debug_images/face_mesh/ (off by default)
+GAZE_DEBUG_SAMPLE_RATE = float(os.getenv("GAZE_DEBUG_SAMPLE_RATE", 0))
+# Horizontal eye centre to nose tip offset (normalized) beyond which the gaze is left or right
+HORIZONTAL_THRESHOLD = 0.1
+# Pixel offsets of the 3x3 dot drawn for each landmark
+DOT_OFFSETS = np.array([(dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1)], np.int32)
+
 class GazeTracking:
     def __init__(self):
         self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
+        # Frames from different candidates share these graphs, so each frame is
+        # analyzed on its own instead of seeded with landmarks tracked from the last one
+        self.mesh_pool = GraphPool(lambda: self.mp_face_mesh.FaceMesh(
+            static_image_mode=True,
             max_num_faces=1,
             refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+            min_detection_confidence=0.5
+        ))
+        # Sampled landmark debug images, drawn and queued only for sampled calls
+        self.debug_archive = DebugImageArchive(os.path.join("debug_images", "face_mesh"), GAZE_DEBUG_SAMPLE_RATE)
         logger.info("GazeTracking service initialized")
 
     def analyze_gaze(self, image_path):
+        """Analyze gaze from an image file"""
+        logger.info(f"Analyzing gaze for image: {image_path}")
+        return self.analyze_frame(cv2.imread(image_path))
+
+    def analyze_image(self, image_data, session_id=None):
+        """Analyze gaze from encoded image bytes, decoded in memory"""
+        return self.analyze_frame(decode_image(image_data), session_id)
+
+    def analyze_frame(self, image, session_id=None):
+        """Analyze gaze from a decoded BGR image"""
         try:
-            logger.info(f"Analyzing gaze for image: {image_path}")
-            
-            # Read the image
-            image = cv2.imread(image_path)
             if image is None:
-                logger.error(f"Could not read image: {image_path}")
+                logger.error("Could not read image")
                 raise ValueError("Could not read image")
 
             # Convert to RGB
             image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
             
             # Process the image
-            results = self.face_mesh.process(image_rgb)
+            with self.mesh_pool.checkout() as face_mesh:
+                results = face_mesh.process(image_rgb)
             
             if not results.multi_face_landmarks:
                 logger.warning("No face detected in the image")
@@ -52,27 +77,27 @@ class GazeTracking:
                     'timestamp': datetime.now().isoformat()
                 }
 
-            # Get face landmarks
-            face_landmarks = results.multi_face_landmarks[0]
+            # Convert the face landmarks to one (N, 3) array of normalized coordinates
+            points = from_mediapipe(results.multi_face_landmarks[0])
             
             # Get eye landmarks
-            left_eye = face_landmarks.landmark[33]  # Left eye center
-            right_eye = face_landmarks.landmark[263]  # Right eye center
-            nose = face_landmarks.landmark[1]  # Nose tip
+            left_eye = points[MP_LEFT_EYE_OUTER]  # Left eye center
+            right_eye = points[MP_RIGHT_EYE_OUTER]  # Right eye center
+            nose = points[MP_NOSE_TIP]  # Nose tip
 
             # Calculate gaze direction
-            eye_center_x = (left_eye.x + right_eye.x) / 2
-            threshold = 0.1
+            eye_center_x = (left_eye[0] + right_eye[0]) / 2
+            horizontal_offset = eye_center_x - nose[0]
 
             # Determine gaze direction
-            if abs(eye_center_x - nose.x) > threshold:
-                direction = 'left' if eye_center_x < nose.x else 'right'
+            if abs(horizontal_offset) > HORIZONTAL_THRESHOLD:
+                direction = 'left' if eye_center_x < nose[0] else 'right'
             else:
                 direction = 'center'
 
             # Calculate eye aspect ratio for blink detection
-            left_eye_height = abs(face_landmarks.landmark[159].y - face_landmarks.landmark[145].y)
-            left_eye_width = abs(face_landmarks.landmark[33].x - face_landmarks.landmark[133].x)
+            left_eye_height = abs(points[MP_LEFT_EYE_TOP, 1] - points[MP_LEFT_EYE_BOTTOM, 1])
+            left_eye_width = abs(points[MP_LEFT_EYE_OUTER, 0] - points[MP_LEFT_EYE_INNER, 0])
             eye_aspect_ratio = left_eye_height / left_eye_width
 
             # Determine if looking away
@@ -82,6 +107,7 @@ class GazeTracking:
                 'status': 'success',
                 'is_looking_away': is_looking_away,
                 'direction': direction,
+                'horizontal_offset': float(horizontal_offset),
                 'eye_aspect_ratio': float(eye_aspect_ratio),
                 'timestamp': datetime.now().isoformat()
             }
@@ -89,17 +115,9 @@ class GazeTracking:
             # Log the result
             logger.info(f"Gaze analysis result: {json.dumps(result, indent=2)}")
 
-            # Save debug image with landmarks
-            debug_image = image.copy()
-            for landmark in face_landmarks.landmark:
-                x = int(landmark.x * image.shape[1])
-                y = int(landmark.y * image.shape[0])
-                cv2.circle(debug_image, (x, y), 1, (0, 255, 0), -1)
-            
-            debug_path = os.path.join(os.path.dirname(image_path), 'debug', os.path.basename(image_path))
-            os.makedirs(os.path.dirname(debug_path), exist_ok=True)
-            cv2.imwrite(debug_path, debug_image)
-            logger.info(f"Debug image saved: {debug_path}")
+            # Unsampled calls draw and encode nothing
+            if self.debug_archive.sample(session_id):
+                result['debug_image'] = self._save_debug_image(image, points)
 
             return result
 
@@ -111,9 +129,16 @@ class GazeTracking:
                 'timestamp': datetime.now().isoformat()
             }
 
+    def _save_debug_image(self, image, points):
+        """Queue the image with every mesh point marked as a 3x3 dot, drawn in one vectorized write"""
+        debug_image = image.copy()
+        height, width = image.shape[:2]
+        pixels = (points[:, :2] * (width, height)).astype(np.int32)
+        dots = (pixels[:, None, :] + DOT_OFFSETS[None, :, :]).reshape(-1, 2)
+        dots = dots[(dots[:, 0] >= 0) & (dots[:, 0] < width) & (dots[:, 1] >= 0) & (dots[:, 1] < height)]
+        debug_image[dots[:, 1], dots[:, 0]] = (0, 255, 0)
+        return self.debug_archive.save("face_mesh.jpg", debug_image)
+
     def __del__(self):
-        self.face_mesh.close()
+        self.mesh_pool.close()
         logger.info("GazeTracking service closed")
-
-# Create a singleton instance
-gaze_tracker = GazeTracking() 
\ No newline at end of file
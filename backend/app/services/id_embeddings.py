@@ -0,0 +1,165 @@
+import os
+import glob
+import time
+import threading
+import logging
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from ..utils.face_tracker import FaceLocation
+from .face_service import face_service
+from .face_auth_service import ID_PHOTOS_DIR, id_photo_path, id_embedding_path
+from ..utils.face_detectors import detector_for
+from ..utils.face_embeddings import FaceEmbedding, embedding_version, pack_embedding, unpack_embedding
+from ..utils.embedding_index import EmbeddingIndex
+
+logger = logging.getLogger(__name__)
+
+# ID embeddings kept in memory per process; the least recently used are dropped first
+CACHE_SIZE = int(os.getenv("ID_EMBEDDING_CACHE_SIZE", 1024))
+# Vision task key of the 1:N index; every index task runs on the one worker that owns its files
+INDEX_KEY = "id_embedding_index"
+# Seconds between reconciliations of the index with the .emb files on its worker
+INDEX_RECONCILE_SECONDS = float(os.getenv("ID_INDEX_RECONCILE_SECONDS", 300))
+
+class IdEmbeddingStore:
+    """
+    Face embeddings of the stored ID photos. Each embedding is computed once, at
+    upload, and written next to the photo as <user_id>.emb (about 600 bytes);
+    verifications read it through an LRU cache, so only the live photo is encoded.
+    A cached entry is reused only while the file's mtime is unchanged, and a
+    file written by another model, detector or jitter setting is recomputed.
+    """
+
+    def __init__(self, cache_size: int = CACHE_SIZE):
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[str, Tuple[int, FaceEmbedding]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.computed = 0
+
+    def save(self, user_id: str, photo: bytes, box: Optional[FaceLocation] = None) -> Optional[FaceEmbedding]:
+        """Compute and store the embedding of an ID photo; with a known face box no detection runs"""
+        face = face_service.encode(photo) if box is None else face_service.encode_at(photo, box)
+        if face is None:
+            return None
+        self.computed += 1
+        path = id_embedding_path(user_id)
+        # Write then rename, so a concurrent reader never sees a partial file
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(pack_embedding(face))
+        os.replace(temp_path, path)
+        self._cache(user_id, os.stat(path).st_mtime_ns, face)
+        return face
+
+    def get(self, user_id: str) -> Optional[FaceEmbedding]:
+        """Embedding of the user's ID photo, computing it if missing or stale; None if there is no photo"""
+        path = id_embedding_path(user_id)
+        mtime = self._mtime(path)
+        with self.lock:
+            cached = self.cache.get(user_id)
+            if cached is not None and cached[0] == mtime:
+                self.cache.move_to_end(user_id)
+                self.hits += 1
+                return cached[1]
+        self.misses += 1
+
+        face = None
+        if mtime is not None:
+            try:
+                with open(path, "rb") as f:
+                    face = unpack_embedding(f.read())
+            except (OSError, ValueError) as e:
+                logger.warning(f"Unreadable ID embedding for user {user_id}: {str(e)}")
+        if face is not None and face.version == embedding_version(detector_for("id_photo")):
+            self._cache(user_id, mtime, face)
+            return face
+
+        # Missing or stale (older upload, or the model or detector changed): recompute from the photo
+        try:
+            with open(id_photo_path(user_id), "rb") as f:
+                photo = f.read()
+        except FileNotFoundError:
+            return None
+        logger.info(f"Recomputing ID embedding for user {user_id}")
+        # The stored photo is a normalized crop, so a stale file's face box is still where the face is
+        return self.save(user_id, photo, face.box if face is not None and face.found else None)
+
+    def invalidate(self, user_id: str) -> None:
+        with self.lock:
+            self.cache.pop(user_id, None)
+
+    def _mtime(self, path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _cache(self, user_id: str, mtime: int, face: FaceEmbedding) -> None:
+        with self.lock:
+            self.cache[user_id] = (mtime, face)
+            self.cache.move_to_end(user_id)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "cached": len(self.cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "computed": self.computed
+        }
+
+# Create singleton instance
+id_embeddings = IdEmbeddingStore()
+# Owned by the worker that INDEX_KEY maps to; opened on first use
+id_embedding_index = EmbeddingIndex(os.path.join(ID_PHOTOS_DIR, "index"))
+
+# Wall-clock start of the last index reconciliation; .emb files written since then are re-read
+_last_reconcile: Optional[float] = None
+
+def _reconcile_index(version: str, full: bool) -> None:
+    """
+    Sync the index with the stored .emb files, the source of truth: enrolls
+    faces whose indexing failed at upload (e.g. the request was deferred) and
+    drops users whose embedding is gone or has no face. A full pass reads every
+    file; otherwise only files modified since the last pass are read.
+    """
+    global _last_reconcile
+    started = time.time()
+    updates: Dict[str, Optional[np.ndarray]] = {}
+    keys = set()
+    for path in glob.glob(os.path.join(ID_PHOTOS_DIR, "*.emb")):
+        key = os.path.basename(path)[:-len(".emb")]
+        keys.add(key)
+        try:
+            # Compared with a margin, as mtime granularity can hide a write made just before the last pass
+            if not full and os.stat(path).st_mtime < _last_reconcile - 1:
+                continue
+            with open(path, "rb") as f:
+                face = unpack_embedding(f.read())
+        except (OSError, ValueError):
+            continue
+        updates[key] = face.embedding if face.found and face.version == version else None
+    added, removed = id_embedding_index.sync(updates, keep=keys)
+    _last_reconcile = started
+    if added or removed:
+        logger.info(f"Reconciled ID embedding index: {added} added, {removed} removed, {len(id_embedding_index)} faces")
+
+def get_id_embedding_index() -> EmbeddingIndex:
+    """
+    The 1:N index. It is reconciled with the stored .emb files when opened
+    (rebuilt if new or built by another model version) and again at most every
+    INDEX_RECONCILE_SECONDS, so a failed upload-time add is not missed for good.
+    """
+    version = embedding_version(detector_for("id_photo"))
+    if not id_embedding_index.is_open:
+        id_embedding_index.open(version)
+        _reconcile_index(version, full=True)
+    elif time.time() - _last_reconcile >= INDEX_RECONCILE_SECONDS:
+        _reconcile_index(version, full=False)
+    return id_embedding_index
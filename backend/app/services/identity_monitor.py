@@ -0,0 +1,147 @@
+import os
+import time
+import logging
+import cv2
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from .face_service import face_service
+from .id_embeddings import id_embeddings
+from .face_auth_service import id_photo_path
+from ..utils.image_utils import decode_image
+from ..utils.face_embeddings import FaceEmbedding, encode_face
+from ..utils.face_tracker import FaceLocation
+
+logger = logging.getLogger(__name__)
+
+# Re-check the candidate's identity against their ID photo during the exam (off by default)
+REVERIFY_ENABLED = os.getenv("IDENTITY_REVERIFY", "0") == "1"
+# Seconds between identity checks of one test; bounds the embedding cost per candidate
+REVERIFY_INTERVAL_SECONDS = float(os.getenv("IDENTITY_REVERIFY_INTERVAL_SECONDS", 30))
+# "full" embeds a full-resolution crop with 68-point alignment; "fast" embeds the
+# detection-resolution crop with 5-point alignment, skipping the extra decode, and
+# compares it with a 5-point embedding of the ID photo so both sides are aligned alike
+REVERIFY_EMBEDDING = os.getenv("IDENTITY_REVERIFY_EMBEDDING", "full")
+# Consecutive failed checks before an identity_mismatch event is logged
+MISMATCH_CONSECUTIVE = int(os.getenv("IDENTITY_MISMATCH_CONSECUTIVE", 2))
+# Tests tracked per process; the least recently seen are forgotten first
+MAX_SESSIONS = 10000
+
+class _IdentityState:
+    __slots__ = ("last_check", "checks", "failed", "consecutive", "mismatches")
+
+    def __init__(self):
+        self.last_check = float("-inf")
+        self.checks = 0
+        self.failed = 0
+        self.consecutive = 0
+        self.mismatches = 0
+
+class IdentityMonitor:
+    """
+    Continuous identity re-verification. At most once per interval, a test's
+    snapshot with exactly one face has that face's box (from the monitoring face
+    detection, so no extra detection runs) embedded and compared with the
+    candidate's cached ID embedding. Only a run of failed checks is reported as
+    a mismatch, so one blurred or turned-away frame does not raise an event.
+    """
+
+    def __init__(self, enabled: bool = REVERIFY_ENABLED, interval: float = REVERIFY_INTERVAL_SECONDS,
+                 embedding: str = REVERIFY_EMBEDDING):
+        self.enabled = enabled
+        self.interval = interval
+        self.fast = embedding == "fast"
+        self.sessions: "OrderedDict[str, _IdentityState]" = OrderedDict()
+        # Fast mode: user_id -> (stored ID embedding it was derived from, 5-point ID embedding)
+        self.fast_id_faces: "OrderedDict[str, Tuple[FaceEmbedding, FaceEmbedding]]" = OrderedDict()
+
+    def _session(self, test_id: str) -> _IdentityState:
+        state = self.sessions.get(test_id)
+        if state is None:
+            state = self.sessions[test_id] = _IdentityState()
+            if len(self.sessions) > MAX_SESSIONS:
+                self.sessions.popitem(last=False)
+        else:
+            self.sessions.move_to_end(test_id)
+        return state
+
+    def is_due(self, test_id: str) -> bool:
+        if not self.enabled:
+            return False
+        state = self.sessions.get(test_id)
+        return state is None or time.monotonic() - state.last_check >= self.interval
+
+    def check(self, test_id: str, user_id: str, image_rgb: np.ndarray, box: FaceLocation) -> Optional[Dict[str, Any]]:
+        """
+        Compare the face in box with the user's ID embedding. Returns the result
+        fields to merge into the frame analysis, or None if the user has no
+        usable ID photo. identity_mismatch is True once MISMATCH_CONSECUTIVE
+        checks in a row have failed.
+        """
+        state = self._session(test_id)
+        state.last_check = time.monotonic()
+        id_face = id_embeddings.get(user_id)
+        if id_face is not None and id_face.found and self.fast:
+            id_face = self._fast_id_face(user_id, id_face)
+        if id_face is None or not id_face.found:
+            return None
+
+        embedding = encode_face(image_rgb, box, "small" if self.fast else "large")
+        if embedding is None:
+            return None
+        match, match_score = face_service.compare_embeddings(id_face, FaceEmbedding(embedding, box, id_face.version))
+        state.checks += 1
+        if match:
+            state.consecutive = 0
+        else:
+            state.failed += 1
+            state.consecutive += 1
+
+        mismatch = state.consecutive >= MISMATCH_CONSECUTIVE
+        if mismatch:
+            # Reported once per run of failures; the next event needs a fresh run
+            state.consecutive = 0
+            state.mismatches += 1
+            logger.warning(f"Identity mismatch for user {user_id} in test {test_id} (score {match_score:.3f})")
+        return {"identity_match_score": round(match_score, 4), "identity_mismatch": mismatch}
+
+    def _fast_id_face(self, user_id: str, id_face: FaceEmbedding) -> Optional[FaceEmbedding]:
+        """
+        5-point embedding of the user's ID photo, encoded at the stored face box
+        (the photo is a normalized crop, so no detection runs). Computed once per
+        stored embedding; None if the photo is gone or the face can't be encoded.
+        """
+        cached = self.fast_id_faces.get(user_id)
+        if cached is not None and cached[0] is id_face:
+            self.fast_id_faces.move_to_end(user_id)
+            return cached[1]
+        try:
+            with open(id_photo_path(user_id), "rb") as f:
+                image = decode_image(f.read())
+        except FileNotFoundError:
+            return None
+        if image is None:
+            return None
+        embedding = encode_face(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), id_face.box, "small")
+        if embedding is None:
+            return None
+        fast_face = FaceEmbedding(embedding, id_face.box, id_face.version)
+        self.fast_id_faces[user_id] = (id_face, fast_face)
+        self.fast_id_faces.move_to_end(user_id)
+        if len(self.fast_id_faces) > MAX_SESSIONS:
+            self.fast_id_faces.popitem(last=False)
+        return fast_face
+
+    def get_stats(self, test_id: str) -> Dict[str, Any]:
+        state = self.sessions.get(test_id)
+        if state is None:
+            return {"enabled": self.enabled, "checks": 0, "failed_checks": 0, "mismatches": 0}
+        return {
+            "enabled": self.enabled,
+            "checks": state.checks,
+            "failed_checks": state.failed,
+            "mismatches": state.mismatches
+        }
+
+# Create singleton instance
+identity_monitor = IdentityMonitor()
@@ -1,6 +1,6 @@
 import cv2
 import numpy as np
-from typing import Dict
+from typing import Dict, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,8 +19,25 @@ class LightingService:
             if img is None:
                 raise ValueError("Failed to decode image")
 
-            # Convert to grayscale
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            return self.analyze_frame(img)
+            
+        except Exception as e:
+            logger.error(f"Error analyzing lighting: {str(e)}", exc_info=True)
+            return {
+                "is_adequate": False,
+                "brightness": 0,
+                "contrast": 0,
+                "message": f"Error analyzing lighting: {str(e)}"
+            }
+
+    def analyze_frame(self, img: np.ndarray, gray: Optional[np.ndarray] = None) -> Dict:
+        """
+        Analyze the lighting conditions of an already decoded BGR frame
+        """
+        try:
+            # Convert to grayscale unless the caller already has it
+            if gray is None:
+                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
             
             # Calculate average brightness
             brightness = np.mean(gray)
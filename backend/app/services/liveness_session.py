@@ -0,0 +1,131 @@
+import os
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from ..utils.landmarks import MP_LEFT_EYE, MP_RIGHT_EYE, MP_NOSE_TIP, eye_aspect_ratio, head_pose
+
+# Frames of landmarks kept per session
+WINDOW_FRAMES = int(os.getenv("LIVENESS_WINDOW_FRAMES", 64))
+# Sessions idle for longer than this are dropped
+SESSION_TTL_SECONDS = float(os.getenv("LIVENESS_SESSION_TTL_SECONDS", 60))
+# Frames with a face needed before a verdict is given
+MIN_FACE_FRAMES = int(os.getenv("LIVENESS_MIN_FRAMES", 10))
+# Sessions kept per process; the least recently used are dropped first
+MAX_SESSIONS = 1000
+
+# Eye Aspect Ratio hysteresis: closed below the first value, open again above the second
+EAR_CLOSED = 0.2
+EAR_OPEN = 0.25
+# Range of the yaw/pitch proxies (in inter-ocular distances) that counts as head movement
+HEAD_MOVEMENT_RANGE = 0.15
+
+# MediaPipe FaceMesh indices kept per frame: six points per eye, then the nose tip
+LANDMARK_INDICES = np.concatenate([MP_LEFT_EYE, MP_RIGHT_EYE, [MP_NOSE_TIP]])
+# The same points as positions in the compact per-frame array
+EYES = np.array([np.arange(0, 6), np.arange(6, 12)])
+OUTER_LEFT_CORNER, OUTER_RIGHT_CORNER, NOSE = 0, 9, 12
+
+class LivenessSession:
+    """
+    Rolling landmark history for one liveness check. Only the few landmark
+    coordinates needed are kept, in fixed-size ring buffers; blink count and
+    head-pose range are updated incrementally as each frame arrives.
+    """
+
+    def __init__(self, window: int = WINDOW_FRAMES):
+        self.window = window
+        self.landmarks = np.zeros((window, len(LANDMARK_INDICES), 3), np.float32)
+        self.ear = np.zeros(window, np.float32)
+        self.pose = np.zeros((window, 2), np.float32)
+        self.face_frames = 0
+        self.frames = 0
+        self.blinks = 0
+        self.eyes_closed = False
+        self.pose_min = np.full(2, np.inf, np.float32)
+        self.pose_max = np.full(2, -np.inf, np.float32)
+        self.last_seen = time.monotonic()
+
+    def add(self, points: Optional[np.ndarray]) -> None:
+        """Add one frame's (N, 3) landmark points in pixels, or None if no face was found"""
+        self.frames += 1
+        self.last_seen = time.monotonic()
+        if points is None:
+            return
+
+        slot = self.face_frames % self.window
+        self.face_frames += 1
+        self.landmarks[slot] = points
+
+        ear = float(eye_aspect_ratio(points, EYES).mean())
+        self.ear[slot] = ear
+        if not self.eyes_closed and ear < EAR_CLOSED:
+            self.eyes_closed = True
+        elif self.eyes_closed and ear > EAR_OPEN:
+            # Closed then reopened: one blink
+            self.eyes_closed = False
+            self.blinks += 1
+
+        pose = head_pose(points, OUTER_LEFT_CORNER, OUTER_RIGHT_CORNER, NOSE)
+        self.pose[slot] = pose
+        np.minimum(self.pose_min, pose, out=self.pose_min)
+        np.maximum(self.pose_max, pose, out=self.pose_max)
+
+    def verdict(self) -> Dict[str, Any]:
+        filled = min(self.face_frames, self.window)
+        pose_range = (self.pose_max - self.pose_min) if filled else np.zeros(2, np.float32)
+        head_movement = bool(np.any(pose_range > HEAD_MOVEMENT_RANGE))
+        blink_detected = self.blinks > 0
+
+        if self.face_frames < MIN_FACE_FRAMES:
+            status = "collecting"
+        else:
+            status = "live" if blink_detected or head_movement else "not_live"
+        return {
+            "status": status,
+            "is_live": status == "live",
+            "frames": self.frames,
+            "face_frames": self.face_frames,
+            "blinks": self.blinks,
+            "blink_detected": blink_detected,
+            "head_movement": head_movement,
+            "yaw_range": round(float(pose_range[0]), 4),
+            "pitch_range": round(float(pose_range[1]), 4),
+            "ear_mean": round(float(self.ear[:filled].mean()), 4) if filled else None
+        }
+
+class LivenessSessionStore:
+    """Liveness sessions of this process, evicted when idle for SESSION_TTL_SECONDS"""
+
+    def __init__(self, ttl: float = SESSION_TTL_SECONDS):
+        self.ttl = ttl
+        self.sessions: "OrderedDict[str, LivenessSession]" = OrderedDict()
+
+    def _evict_idle(self) -> None:
+        now = time.monotonic()
+        # Sessions are kept in least-recently-used order, so the idle ones are at the front
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if now - session.last_seen <= self.ttl:
+                break
+            del self.sessions[session_id]
+
+    def start(self, session_id: str) -> None:
+        self._evict_idle()
+        self.sessions[session_id] = LivenessSession()
+        self.sessions.move_to_end(session_id)
+        if len(self.sessions) > MAX_SESSIONS:
+            self.sessions.popitem(last=False)
+
+    def get(self, session_id: str) -> Optional[LivenessSession]:
+        self._evict_idle()
+        session = self.sessions.get(session_id)
+        if session is not None:
+            self.sessions.move_to_end(session_id)
+        return session
+
+    def end(self, session_id: str) -> Optional[LivenessSession]:
+        return self.sessions.pop(session_id, None)
+
+# Create singleton instance
+liveness_sessions = LivenessSessionStore()
@@ -1,10 +1,16 @@
 import os
 import cv2
 import numpy as np
-import face_recognition
 from datetime import datetime
 import json
 import logging
+from ..utils.image_utils import decode_image, decode_data_url
+from ..utils.frame_change import FrameChangeDetector
+from ..utils.multiscale_detection import FACE_DETECTION_SCALE, reduced_decode_flag, locate_faces
+from ..utils.face_tracker import FaceTracker
+from ..utils.face_detectors import detector_for
+from ..utils.face_cascade import face_count_cascade
+from .identity_monitor import identity_monitor
 
 logger = logging.getLogger(__name__)
 
@@ -12,19 +18,76 @@ class MonitoringService:
     def __init__(self):
         self.logs_dir = "monitoring_logs"
         os.makedirs(self.logs_dir, exist_ok=True)
+        # Lets near-identical consecutive frames reuse the previous face count
+        self.change_detector = FrameChangeDetector()
+        # Frames are decoded at 1/detection_scale for face detection
+        self.detection_scale = FACE_DETECTION_SCALE
+        # Searches around the last known face boxes between full detections
+        self.face_tracker = FaceTracker()
 
     def process_image(self, image_data, test_id, user_id):
         try:
-            # Convert base64 image to numpy array
-            nparr = np.frombuffer(image_data.encode(), np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            # JSON clients send base64 text, the binary ingest path sends raw bytes
+            if isinstance(image_data, str):
+                image_data = decode_data_url(image_data)
             
-            # Convert BGR to RGB (face_recognition uses RGB)
-            rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+            # Decode straight to the detection resolution; analyze_frame only decodes
+            # the full image again if the reduced result is ambiguous
+            img = decode_image(image_data, reduced_decode_flag(self.detection_scale))
+            if img is None:
+                raise ValueError("Failed to decode image")
             
-            # Detect faces
-            face_locations = face_recognition.face_locations(rgb_img)
-            face_count = len(face_locations)
+            return self.analyze_frame(img, test_id, user_id, scale=self.detection_scale, image_data=image_data)
+            
+        except Exception as e:
+            logger.error(f"Error processing image: {str(e)}")
+            raise
+
+    def count_faces(self, img, rgb_img=None):
+        """Count faces in a decoded BGR frame"""
+        locations, _ = locate_faces(img, rgb_img=rgb_img, detector=detector_for("monitoring"))
+        return len(locations)
+
+    def analyze_frame(self, img, test_id, user_id, rgb_img=None, scale=1, image_data=None):
+        """
+        Run the suspicious-frame check on an already decoded BGR frame.
+        img may be a 1/scale decode of image_data; see locate_faces.
+        """
+        try:
+            # Skip face detection if the candidate's frame has not changed meaningfully
+            thumbnail, previous = self.change_detector.check(test_id, img)
+            if previous is not None:
+                return {**previous, "timestamp": datetime.now().isoformat(), "reused_analysis": True}
+            
+            # A single confident face from the fast cascade stage settles the count
+            if face_count_cascade.enabled and rgb_img is None:
+                rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+            fast_count, accepted = face_count_cascade.fast_count(rgb_img)
+            # An identity check needs the face box, which only the full detection gives
+            identity_due = identity_monitor.is_due(test_id)
+            if identity_due:
+                accepted = False
+            full_img = None
+            face_locations = []
+            if accepted:
+                face_count = fast_count
+            else:
+                # Detect faces; a change from the last count is confirmed at full resolution
+                previous_result = self.change_detector.last_result(test_id)
+                expected_count = previous_result["face_count"] if previous_result else None
+                detector = detector_for("monitoring")
+                # Any change outside the tracked faces forces a full detection, so a second person is counted at once
+                changed = self.change_detector.changed_mask(test_id, thumbnail)
+                face_locations, full_img = locate_faces(
+                    img, scale, image_data, expected_count, rgb_img,
+                    detect=lambda rgb: self.face_tracker.locate(test_id, rgb, detector.detect, changed)[0],
+                    detector=detector
+                )
+                face_count = len(face_locations)
+                face_count_cascade.record_full(fast_count, face_count)
+                if full_img is not None:
+                    # The reduced-resolution boxes were overruled; start tracking afresh
+                    self.face_tracker.reset(test_id)
             
             # Determine if suspicious (multiple faces)
             is_suspicious = face_count > 1
@@ -38,19 +101,55 @@ class MonitoringService:
                 filename = f"suspicious_{timestamp}.jpg"
                 filepath = os.path.join(suspicious_folder, filename)
                 
-                cv2.imwrite(filepath, img)
+                if image_data is not None:
+                    # The upload is already encoded; keep it as-is at full resolution
+                    with open(filepath, "wb") as f:
+                        f.write(image_data)
+                else:
+                    cv2.imwrite(filepath, img)
                 logger.warning(f"Multiple faces detected ({face_count}). Saved to {filepath}")
             
-            return {
+            result = {
                 "is_suspicious": is_suspicious,
                 "face_count": face_count,
                 "timestamp": datetime.now().isoformat()
             }
+            if face_count_cascade.enabled:
+                result["detection_stage"] = "fast" if accepted else "full"
+            if scale > 1 and not accepted:
+                result["detection_resolution"] = "full" if full_img is not None else f"1/{scale}"
+            self.change_detector.record(test_id, thumbnail, result)
+            
+            # Identity fields are left out of the recorded result, so reused frames don't repeat them
+            if identity_due and face_count == 1:
+                identity = self._check_identity(test_id, user_id, img, scale, image_data, full_img, face_locations[0])
+                if identity is not None:
+                    result = {**result, **identity}
+            
+            return result
             
         except Exception as e:
-            logger.error(f"Error processing image: {str(e)}")
+            logger.error(f"Error analyzing frame: {str(e)}")
             raise
 
+    def _check_identity(self, test_id, user_id, img, scale, image_data, full_img, box):
+        """Embed the detected face box and compare it with the candidate's ID photo"""
+        if full_img is None and scale > 1 and image_data is not None and not identity_monitor.fast:
+            full_img = decode_image(image_data)
+        if full_img is not None:
+            image = full_img
+        else:
+            # The box is in original coordinates; map it onto the reduced decode
+            image = img
+            box = tuple(value // scale for value in box)
+        identity = identity_monitor.check(test_id, user_id, cv2.cvtColor(image, cv2.COLOR_BGR2RGB), box)
+        if identity is not None and identity["identity_mismatch"]:
+            self.log_event(test_id, "identity_mismatch", {
+                "user_id": user_id,
+                "match_score": identity["identity_match_score"]
+            })
+        return identity
+
     def log_event(self, test_id, event_type, details):
         try:
             log_file = os.path.join(self.logs_dir, f"{test_id}_events.json")
@@ -5,6 +5,7 @@ from datetime import datetime
 import threading
 import logging
 import sys
+from ..utils.model_registry import model_registry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -129,5 +130,5 @@ class ScreenshotService:
                     
                 time.sleep(self.interval)  # Still wait before retrying
 
-# Create a singleton instance
-screenshot_service = ScreenshotService()
+# Created on first use; the constructor takes a test screenshot
+model_registry.register("screenshot", ScreenshotService)
@@ -0,0 +1,152 @@
+import asyncio
+import os
+import time
+import zlib
+import threading
+import logging
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# Number of vision worker processes; 0 runs tasks in the local threadpool instead
+VISION_WORKERS = int(os.getenv("VISION_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+# Latency samples kept per task type for the stats endpoint
+LATENCY_WINDOW = 500
+
+def _timed_call(fn: Callable, args: tuple):
+    """Run fn inside the worker and report how long the call itself took"""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 2)
+
+class VisionExecutor:
+    """
+    Runs CPU-bound vision work (face detection, landmarks, gaze) off the event loop.
+
+    Each worker is its own single-process pool with the models loaded by the
+    initializer. Work submitted with a key (the test id) always lands on the same
+    worker, so per-session state held by the services stays in one place; keyless
+    work goes to the least busy worker.
+    """
+
+    def __init__(self, workers: int = VISION_WORKERS):
+        self.workers = workers
+        self.shards: List[ProcessPoolExecutor] = []
+        self.shards_lock = threading.Lock()
+        self.pending = [0] * max(workers, 1)
+        self.completed = 0
+        self.failed = 0
+        self.latencies: Dict[str, deque] = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def _create_shard(self) -> ProcessPoolExecutor:
+        from .vision_tasks import warm_worker
+        return ProcessPoolExecutor(max_workers=1, initializer=warm_worker)
+
+    def start(self) -> None:
+        """Spawn the worker processes (idempotent)"""
+        if self.shards or self.workers <= 0:
+            return
+        self.shards = [self._create_shard() for _ in range(self.workers)]
+        logger.info(f"Started vision executor with {self.workers} worker processes")
+
+    def shutdown(self) -> None:
+        for shard in self.shards:
+            shard.shutdown(wait=False, cancel_futures=True)
+        self.shards = []
+
+    def _replace_shard(self, shard: int, broken: ProcessPoolExecutor) -> None:
+        """
+        Replace a shard whose worker died (e.g. a native crash) so later tasks still
+        run. Every task pending on it fails at once; only the first replaces it.
+        """
+        with self.shards_lock:
+            if self.shards[shard] is not broken:
+                return
+            self.shards[shard] = self._create_shard()
+        logger.info(f"Restarted vision worker {shard}")
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _pick_shard(self, key: Optional[str]) -> int:
+        if key is not None:
+            return zlib.crc32(key.encode()) % self.workers
+        return min(range(self.workers), key=self.pending.__getitem__)
+
+    async def run(self, fn: Callable, *args: Any, key: Optional[str] = None) -> Any:
+        """Run fn(*args) on a worker and await its result"""
+        submitted = time.perf_counter()
+        shard, executor = 0, None
+        if self.workers > 0:
+            self.start()
+            shard = self._pick_shard(key)
+            executor = self.shards[shard]
+        # Counted only once the task really is queued, so the finally below always pairs with it
+        self.pending[shard] += 1
+        try:
+            if executor is None:
+                result, exec_ms = await run_in_threadpool(_timed_call, fn, args)
+            else:
+                loop = asyncio.get_running_loop()
+                result, exec_ms = await loop.run_in_executor(executor, _timed_call, fn, args)
+        except BrokenProcessPool:
+            self.failed += 1
+            logger.error(f"Vision worker {shard} crashed while running {fn.__name__}")
+            self._replace_shard(shard, executor)
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending[shard] -= 1
+
+        self.completed += 1
+        self.latencies[fn.__name__].append((exec_ms, (time.perf_counter() - submitted) * 1000))
+        return result
+
+    async def map(self, fn: Callable, items: Iterable[Any], *args: Any) -> List[Any]:
+        """Run fn(item, *args) for every item across the workers, results in input order"""
+        return await asyncio.gather(*(self.run(fn, item, *args) for item in items))
+
+    async def broadcast(self, fn: Callable, *args: Any) -> List[Any]:
+        """Run fn(*args) once on every worker, e.g. to collect per-process counters"""
+        if self.workers <= 0:
+            return [await run_in_threadpool(fn, *args)]
+        self.start()
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(*(loop.run_in_executor(shard, fn, *args) for shard in self.shards))
+
+    def queue_depth(self) -> int:
+        return sum(self.pending)
+
+    def get_stats(self) -> Dict[str, Any]:
+        tasks = {}
+        for name, samples in self.latencies.items():
+            exec_times = sorted(sample[0] for sample in samples)
+            total_times = sorted(sample[1] for sample in samples)
+            tasks[name] = {
+                "samples": len(samples),
+                "exec_ms_p50": percentile(exec_times, 0.5),
+                "exec_ms_p95": percentile(exec_times, 0.95),
+                "total_ms_p50": percentile(total_times, 0.5),
+                "total_ms_p95": percentile(total_times, 0.95)
+            }
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth(),
+            "queue_depth_per_worker": list(self.pending),
+            "completed": self.completed,
+            "failed": self.failed,
+            "tasks": tasks
+        }
+
+# Create singleton instance
+vision_executor = VisionExecutor()
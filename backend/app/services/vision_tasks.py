@@ -0,0 +1,223 @@
+"""
+Vision work executed inside VisionExecutor worker processes.
+Every task is a module-level function that takes and returns picklable values.
+"""
+import cv2
+import logging
+import numpy as np
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from .monitoring_service import monitoring_service
+from .identity_monitor import identity_monitor
+from .frame_pipeline import frame_pipeline, get_face_verification_service
+from ..utils.gaze_tracking import get_gaze_tracker
+from ..utils.gaze_engines import get_gaze_engine, configured_engine_name
+from ..utils.model_registry import model_registry
+from ..utils.face_detectors import detector_for, get_detector
+from ..utils.face_cascade import face_count_cascade, count_faces_in_bytes
+from ..utils.image_utils import decode_data_url, decode_image
+from .liveness_session import liveness_sessions, LANDMARK_INDICES
+from .face_service import face_service, MATCH_THRESHOLD
+from .id_embeddings import id_embeddings, get_id_embedding_index
+from .face_auth_service import face_auth_service
+from ..utils.id_photo import normalize_id_image
+
+logger = logging.getLogger(__name__)
+
+def warm_worker() -> None:
+    """Process-pool initializer; models load on first use or through warm_models"""
+    logger.info("Vision worker started")
+
+def warm_models(names: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Load the named models in this worker, plus the detectors the call sites are configured to use"""
+    model_registry.warm_up(names)
+    try:
+        for call_site in ("monitoring", "snapshot"):
+            detector_for(call_site)
+        if face_count_cascade.enabled:
+            get_detector(face_count_cascade.backend)
+    except Exception as e:
+        logger.error(f"Warm-up of configured face detectors failed: {str(e)}")
+    return model_registry.get_status()
+
+def get_model_status() -> Dict[str, Dict[str, Any]]:
+    """Which models this worker has loaded"""
+    return model_registry.get_status()
+
+def process_frame(image_bytes: bytes, test_id: str, user_id: str) -> Dict[str, Any]:
+    """Suspicious-frame check for a single capture"""
+    return monitoring_service.process_image(image_bytes, test_id, user_id)
+
+def process_batch_frame(image_bytes: bytes, test_id: str, user_id: str) -> Dict[str, Any]:
+    """Suspicious-frame check for one frame of a batch; failures become an error entry"""
+    try:
+        return monitoring_service.process_image(image_bytes, test_id, user_id)
+    except Exception as e:
+        return {
+            "error": str(e),
+            "is_suspicious": False,
+            "face_count": 0,
+            "timestamp": datetime.now().isoformat()
+        }
+
+def count_faces(image_bytes: bytes) -> int:
+    return count_faces_in_bytes(image_bytes, detector=detector_for("snapshot"))
+
+def analyze_pipeline(image_bytes: bytes, test_id: str, user_id: str,
+                     analyzers: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Decode once and run the selected analyzers on the shared arrays"""
+    return frame_pipeline.run(image_bytes, test_id, user_id, analyzers)
+
+def analyze_stream_frame(image_bytes: bytes, test_id: str, user_id: str) -> Dict[str, Any]:
+    """Face, lighting and gaze analysis for one streamed frame, flattened for the client"""
+    try:
+        analysis = frame_pipeline.run(image_bytes, test_id, user_id, ["face_count", "lighting", "gaze"])
+    except ValueError as e:
+        return {"error": str(e), "timestamp": datetime.now().isoformat()}
+
+    result = dict(analysis["face_count"])
+    lighting = analysis["lighting"]
+    gaze = analysis["gaze"]
+
+    result["lighting"] = {
+        "is_adequate": lighting.get("is_adequate"),
+        "brightness": lighting.get("brightness"),
+        "contrast": lighting.get("contrast"),
+        "message": lighting.get("message")
+    }
+    result["gaze_direction"] = gaze.get("gaze_direction")
+    result["gaze_confidence"] = gaze.get("confidence")
+    result["timings_ms"] = analysis["timings_ms"]
+    return result
+
+def get_frame_skip_stats(test_id: str) -> Dict[str, Any]:
+    """Change-detection counters for a session (run on the session's worker)"""
+    return monitoring_service.change_detector.get_stats(test_id)
+
+def get_face_cascade_stats() -> Dict[str, Any]:
+    """This worker's face-count cascade counters"""
+    return face_count_cascade.get_stats()
+
+def get_face_tracking_stats(test_id: str) -> Dict[str, Any]:
+    """ROI tracking counters for a session (run on the session's worker)"""
+    return {
+        "monitoring": monitoring_service.face_tracker.get_stats(test_id),
+        # Only the pupil engine tracks faces; other engines leave the tracker unloaded
+        "gaze": get_gaze_tracker().face_tracker.get_stats(test_id) if model_registry.is_loaded("gaze_tracker") else {}
+    }
+
+def get_identity_stats(test_id: str) -> Dict[str, Any]:
+    return identity_monitor.get_stats(test_id)
+
+def set_debug_sample_rate(test_id: str, rate: Optional[float]) -> None:
+    """Sample a test's gaze debug images at its own rate; None restores GAZE_DEBUG_SAMPLE_RATE"""
+    archive = get_gaze_engine().debug_archive
+    if archive is not None:
+        archive.set_session_rate(test_id, rate)
+
+def get_debug_image_stats() -> Dict[str, Any]:
+    """Debug image writer counters of this worker; empty until the gaze engine is loaded"""
+    name = f"gaze_engine.{configured_engine_name()}"
+    if not model_registry.is_loaded(name):
+        return {}
+    archive = model_registry.get(name).debug_archive
+    return {"gaze": archive.get_stats()} if archive is not None else {}
+
+def analyze_gaze_bytes(image_bytes: bytes, test_id: Optional[str] = None) -> Dict[str, Any]:
+    """Gaze of an uploaded frame from the GAZE_ENGINE engine, decoded in memory; test_id keys per-session state"""
+    return get_gaze_engine().analyze_image(image_bytes, session_id=test_id)
+
+def compare_faces(first_image: str, second_image: str) -> Dict[str, Any]:
+    return get_face_verification_service().compare_faces(first_image, second_image)
+
+def detect_liveness(image: str) -> Dict[str, Any]:
+    return get_face_verification_service().detect_liveness(image)
+
+def start_liveness_session(session_id: str) -> None:
+    liveness_sessions.start(session_id)
+
+def add_liveness_frame(session_id: str, image: str) -> Optional[Dict[str, Any]]:
+    """Add one base64 frame to a liveness session; None if the session is unknown or expired"""
+    session = liveness_sessions.get(session_id)
+    if session is None:
+        return None
+    img = decode_image(decode_data_url(image))
+    if img is None:
+        raise ValueError("Failed to decode image")
+    points = get_face_verification_service().extract_landmarks(cv2.cvtColor(img, cv2.COLOR_BGR2RGB), LANDMARK_INDICES)
+    session.add(points)
+    return {**session.verdict(), "face_found": points is not None}
+
+def get_liveness_verdict(session_id: str, end: bool = False) -> Optional[Dict[str, Any]]:
+    """Current verdict of a liveness session, optionally closing it; None if unknown or expired"""
+    session = liveness_sessions.end(session_id) if end else liveness_sessions.get(session_id)
+    return session.verdict() if session is not None else None
+
+def store_id_photo(user_id: str, photo: bytes) -> Dict[str, Any]:
+    """
+    Normalize an uploaded ID photo to a small face crop, store it and encode
+    the face once, so verifications only encode the live photo. An upload with
+    no detectable face is stored as is; one that can't be decoded is rejected
+    before the user's stored photo, embedding or index entry are touched.
+    """
+    image = decode_image(photo)
+    if image is None:
+        raise ValueError("Failed to decode image")
+    normalized = normalize_id_image(image, detector_for("id_photo"))
+    stored = normalized.image if normalized is not None else photo
+    if not face_auth_service.save_id_photo(user_id, stored, original=photo if normalized is not None else None):
+        raise RuntimeError("Failed to save ID photo")
+    face = id_embeddings.save(user_id, stored, normalized.box if normalized is not None else None)
+    if face is None:
+        raise ValueError("Failed to decode image")
+    return {
+        "face_found": face.found,
+        "box": list(face.box) if face.found else None,
+        "embedding": face.embedding if face.found else None,
+        "normalized": normalized is not None,
+        "original_bytes": len(photo),
+        "stored_bytes": len(stored)
+    }
+
+def compare_to_id_photo(user_id: str, live_photo: bytes) -> Optional[Dict[str, Any]]:
+    """Match a live photo against the user's cached ID embedding; None if the user has no ID photo"""
+    id_face = id_embeddings.get(user_id)
+    if id_face is None:
+        return None
+    match, match_score = face_service.compare_with_embedding(id_face, live_photo)
+    return {"match": match, "match_score": match_score, "id_face_found": id_face.found}
+
+def get_id_embedding_stats() -> Dict[str, Any]:
+    return id_embeddings.get_stats()
+
+def _similar_faces(matches: List) -> List[Dict[str, Any]]:
+    return [
+        {"user_id": user_id, "distance": round(distance, 4), "match_score": round(1 - distance, 4),
+         "match": 1 - distance >= MATCH_THRESHOLD}
+        for user_id, distance in matches
+    ]
+
+def index_id_embedding(user_id: str, embedding: Optional[np.ndarray], k: int) -> List[Dict[str, Any]]:
+    """
+    Enroll a user's ID embedding in the 1:N index (or drop the user when the
+    photo has no face) and return the k nearest other enrolled faces.
+    Runs on the worker keyed by INDEX_KEY, the only process writing the index.
+    """
+    index = get_id_embedding_index()
+    if embedding is None:
+        index.remove(user_id)
+        return []
+    index.add(user_id, embedding)
+    return _similar_faces(index.search(embedding, k, exclude=user_id))
+
+def find_similar_faces(photo: bytes, k: int) -> Optional[List[Dict[str, Any]]]:
+    """The k enrolled ID faces nearest to the largest face in photo; None if the photo has no face"""
+    face = face_service.encode(photo)
+    if face is None:
+        raise ValueError("Failed to decode image")
+    if not face.found:
+        return None
+    return _similar_faces(get_id_embedding_index().search(face.embedding, k))
+
+def get_id_index_stats() -> Dict[str, Any]:
+    return get_id_embedding_index().get_stats()
@@ -0,0 +1,134 @@
+import os
+import re
+import cv2
+import queue
+import random
+import threading
+import logging
+import numpy as np
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Images waiting to be written; further images are dropped while the disk catches up
+MAX_PENDING_WRITES = 64
+# Files kept per archive directory and process; the oldest are deleted beyond this
+MAX_FILES = int(os.getenv("DEBUG_IMAGE_MAX_FILES", 1000))
+# Sessions with their own sample rate, per process
+MAX_SESSION_RATES = 10000
+# Names of the files an archive writes: <YYYYmmdd_HHMMSS_ffffff>_<name>
+ARCHIVE_NAME = re.compile(r"\d{8}_\d{6}_\d{6}_")
+
+class DebugImageArchive:
+    """
+    Keeps a random sample of request or debug images. Sampled images are handed
+    to a background thread, so the request never waits on the disk; decoded
+    images are JPEG-encoded on that thread too. With a sample rate of 0 (the
+    default everywhere) nothing is queued, encoded or written, and callers check
+    sample() before drawing anything. At most max_files of its own files are
+    kept in the directory, deleting the oldest first; give each archive a
+    directory of its own.
+    """
+
+    def __init__(self, directory: str, sample_rate: float = 0.0, max_files: int = MAX_FILES):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        self.session_rates: Dict[str, float] = {}
+        self.pending: queue.Queue = queue.Queue(maxsize=MAX_PENDING_WRITES)
+        self.files: deque = deque()
+        self.writer = None
+        self.writer_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.deleted = 0
+
+    def set_session_rate(self, session_id: str, rate: Optional[float]) -> None:
+        """Sample one session at its own rate (e.g. 1.0 while investigating it); None restores the default"""
+        if rate is None:
+            self.session_rates.pop(session_id, None)
+        elif session_id in self.session_rates or len(self.session_rates) < MAX_SESSION_RATES:
+            self.session_rates[session_id] = rate
+
+    def sample(self, session_id: Optional[str] = None) -> bool:
+        """Decide whether this call keeps its images; all images of one call share the decision"""
+        rate = self.session_rates.get(session_id, self.sample_rate) if session_id else self.sample_rate
+        return rate > 0 and random.random() < rate
+
+    def maybe_save(self, name: str, image_bytes: bytes, session_id: Optional[str] = None) -> bool:
+        """Queue the already-encoded image for writing if this call is sampled"""
+        if not self.sample(session_id):
+            return False
+        return self.save(name, image_bytes) is not None
+
+    def save(self, name: str, image: Union[bytes, np.ndarray]) -> Optional[str]:
+        """
+        Queue an encoded image, or a decoded one to be JPEG-encoded by the writer,
+        for a call that was already sampled. Returns the path it will be written to.
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        path = os.path.join(self.directory, f"{timestamp}_{name}")
+        # Arrays are copied: the caller may keep drawing on or reusing its frame
+        payload = image.copy() if isinstance(image, np.ndarray) else bytes(image)
+        try:
+            self.pending.put_nowait((path, payload))
+        except queue.Full:
+            self.dropped += 1
+            return None
+        self._ensure_writer()
+        return path
+
+    def _ensure_writer(self) -> None:
+        with self.writer_lock:
+            if self.writer is None or not self.writer.is_alive():
+                os.makedirs(self.directory, exist_ok=True)
+                if not self.files:
+                    # Files an archive left in earlier runs count towards the cap; anything
+                    # else in the directory (without the archive's timestamp prefix) is never deleted
+                    existing = [
+                        entry for entry in os.scandir(self.directory)
+                        if entry.is_file() and ARCHIVE_NAME.match(entry.name)
+                    ]
+                    existing.sort(key=lambda entry: entry.stat().st_mtime)
+                    self.files.extend(entry.path for entry in existing)
+                self.writer = threading.Thread(target=self._write_loop, name=f"debug-archive-{self.directory}", daemon=True)
+                self.writer.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            path, payload = self.pending.get()
+            try:
+                if isinstance(payload, np.ndarray):
+                    ok, encoded = cv2.imencode(".jpg", payload)
+                    if not ok:
+                        raise OSError("JPEG encoding failed")
+                    payload = encoded.tobytes()
+                with open(path, "wb") as f:
+                    f.write(payload)
+                self.written += 1
+                self.files.append(path)
+                self._enforce_retention()
+            except OSError as e:
+                logger.error(f"Failed to write debug image {path}: {str(e)}")
+
+    def _enforce_retention(self) -> None:
+        while len(self.files) > self.max_files:
+            oldest = self.files.popleft()
+            try:
+                os.remove(oldest)
+                self.deleted += 1
+            except FileNotFoundError:
+                pass
+
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            "sample_rate": self.sample_rate,
+            "session_rates": len(self.session_rates),
+            "pending": self.pending.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "deleted": self.deleted,
+            "max_files": self.max_files
+        }
@@ -0,0 +1,208 @@
+import os
+import json
+import threading
+import logging
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rows allocated when an index is created; the file doubles whenever it fills up
+INITIAL_CAPACITY = 1024
+
+class EmbeddingIndex:
+    """
+    1:N nearest-neighbour index over face embeddings, stored in a directory as
+    embeddings.f32 (a memory-mapped float32 matrix, one row per enrolled face),
+    ids.log (an append-only journal of row assignments) and meta.json (the
+    embedding size and model version). A search is a single matrix-vector
+    product against the cached squared row norms, so even 100k faces need no
+    Python loop. Removed rows are zeroed and reused by later additions.
+    """
+
+    def __init__(self, directory: str, dim: int = 128):
+        self.directory = directory
+        self.dim = dim
+        self.lock = threading.Lock()
+        self.matrix: Optional[np.memmap] = None
+        self.version: Optional[str] = None
+        self.ids: List[Optional[str]] = []
+        self.rows: Dict[str, int] = {}
+        self.free: List[int] = []
+        self.sq_norms = np.zeros(0, np.float32)
+        self.journal = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.matrix is not None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def open(self, version: str) -> bool:
+        """Map the index files, starting an empty index if they are missing or from another version; True if empty-started"""
+        with self.lock:
+            if self.matrix is not None:
+                return False
+            os.makedirs(self.directory, exist_ok=True)
+            meta = self._read_meta()
+            fresh = meta != {"dim": self.dim, "version": version}
+            if fresh:
+                if meta is not None:
+                    logger.info(f"Embedding index at {self.directory} is for {meta.get('version')}, rebuilding for {version}")
+                for name in ("embeddings.f32", "ids.log"):
+                    if os.path.exists(self._path(name)):
+                        os.remove(self._path(name))
+                with open(self._path("meta.json"), "w") as f:
+                    json.dump({"dim": self.dim, "version": version}, f)
+            self.version = version
+            self._load()
+            return fresh
+
+    def add(self, key: str, embedding: np.ndarray) -> None:
+        """Insert or replace the embedding enrolled under key"""
+        vector = np.asarray(embedding, np.float32).reshape(self.dim)
+        with self.lock:
+            row = self.rows.get(key)
+            if row is None:
+                row = self.free.pop() if self.free else len(self.ids)
+                if row == len(self.ids):
+                    self.ids.append(None)
+                    if row >= len(self.matrix):
+                        self._grow()
+            self.matrix[row] = vector
+            self.sq_norms[row] = vector @ vector
+            self.ids[row] = key
+            self.rows[key] = row
+            self._log(row, key)
+
+    def remove(self, key: str) -> bool:
+        with self.lock:
+            row = self.rows.pop(key, None)
+            if row is None:
+                return False
+            self.matrix[row] = 0
+            self.ids[row] = None
+            self.free.append(row)
+            self._log(row, "")
+            return True
+
+    def sync(self, updates: Dict[str, Optional[np.ndarray]], keep: Optional[set] = None) -> Tuple[int, int]:
+        """
+        Bring the index in line with its source of truth: each key in updates is
+        added, replaced or (with None) removed, skipping rows already holding the
+        same vector; with keep given, enrolled keys outside it are removed too.
+        Returns (added or replaced, removed).
+        """
+        added = removed = 0
+        for key, embedding in updates.items():
+            if embedding is None:
+                removed += self.remove(key)
+                continue
+            row = self.rows.get(key)
+            if row is None or not np.array_equal(self.matrix[row], np.asarray(embedding, np.float32).reshape(self.dim)):
+                self.add(key, embedding)
+                added += 1
+        if keep is not None:
+            for key in [key for key in self.rows if key not in keep]:
+                removed += self.remove(key)
+        return added, removed
+
+    def search(self, embedding: np.ndarray, k: int = 5, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """The k enrolled faces nearest to embedding as (key, euclidean distance), nearest first"""
+        vector = np.asarray(embedding, np.float32).reshape(self.dim)
+        with self.lock:
+            count = len(self.ids)
+            if not self.rows or k <= 0:
+                return []
+            # |a - b|^2 = |a|^2 - 2 a.b + |b|^2, with |a|^2 cached per row
+            distances = self.sq_norms[:count] - 2 * (self.matrix[:count] @ vector) + vector @ vector
+            distances[self.free] = np.inf
+            if exclude in self.rows:
+                distances[self.rows[exclude]] = np.inf
+            k = min(k, count)
+            nearest = np.argpartition(distances, k - 1)[:k]
+            nearest = nearest[np.argsort(distances[nearest])]
+            return [
+                (self.ids[row], float(np.sqrt(max(distances[row], 0.0))))
+                for row in nearest if np.isfinite(distances[row])
+            ]
+
+    def close(self) -> None:
+        with self.lock:
+            if self.matrix is not None:
+                self.matrix.flush()
+                self.matrix = None
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "enrolled": len(self.rows),
+            "rows": len(self.ids),
+            "capacity": 0 if self.matrix is None else len(self.matrix),
+            "version": self.version
+        }
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _read_meta(self) -> Optional[Dict[str, object]]:
+        try:
+            with open(self._path("meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _load(self) -> None:
+        self.ids, self.rows, self.free = [], {}, []
+        if os.path.exists(self._path("ids.log")):
+            with open(self._path("ids.log")) as f:
+                for line in f:
+                    row_text, _, key = line.rstrip("\n").partition("\t")
+                    row = int(row_text)
+                    if row >= len(self.ids):
+                        self.ids.extend([None] * (row + 1 - len(self.ids)))
+                    previous = self.ids[row]
+                    if previous is not None and self.rows.get(previous) == row:
+                        del self.rows[previous]
+                    self.ids[row] = key or None
+                    if key:
+                        self.rows[key] = row
+        self.free = [row for row, key in enumerate(self.ids) if key is None]
+
+        capacity = max(INITIAL_CAPACITY, len(self.ids))
+        path = self._path("embeddings.f32")
+        if not os.path.exists(path) or os.path.getsize(path) < capacity * self.dim * 4:
+            with open(path, "ab") as f:
+                f.truncate(capacity * self.dim * 4)
+        self.matrix = np.memmap(path, np.float32, "r+", shape=(os.path.getsize(path) // (self.dim * 4), self.dim))
+        self.sq_norms = np.zeros(len(self.matrix), np.float32)
+        count = len(self.ids)
+        self.sq_norms[:count] = np.einsum("ij,ij->i", self.matrix[:count], self.matrix[:count])
+
+        # Start each run from a journal holding only the live assignments
+        self._compact()
+        self.journal = open(self._path("ids.log"), "a")
+
+    def _compact(self) -> None:
+        temp_path = self._path("ids.log.tmp")
+        with open(temp_path, "w") as f:
+            f.writelines(f"{row}\t{key}\n" for key, row in self.rows.items())
+        os.replace(temp_path, self._path("ids.log"))
+
+    def _grow(self) -> None:
+        path = self._path("embeddings.f32")
+        capacity = len(self.matrix) * 2
+        self.matrix.flush()
+        self.matrix = None
+        with open(path, "ab") as f:
+            f.truncate(capacity * self.dim * 4)
+        self.matrix = np.memmap(path, np.float32, "r+", shape=(capacity, self.dim))
+        self.sq_norms = np.concatenate([self.sq_norms, np.zeros(capacity - len(self.sq_norms), np.float32)])
+
+    def _log(self, row: int, key: str) -> None:
+        # Written after the row itself, so a crash never leaves a key pointing at an unwritten row
+        self.journal.write(f"{row}\t{key}\n")
+        self.journal.flush()
@@ -39,6 +39,16 @@ class ServerException(ProctoringException):
     def __init__(self, detail: str, error_code: str = "SERVER_ERROR"):
         super().__init__(status_code=500, detail=detail, error_code=error_code)
 
+class ServiceUnavailableException(ProctoringException):
+    def __init__(self, detail: str, retry_after: int, error_code: str = "DEFERRED"):
+        super().__init__(
+            status_code=503,
+            detail=detail,
+            error_code=error_code,
+            additional_info={"retry_after": retry_after}
+        )
+        self.headers = {"Retry-After": str(retry_after)}
+
 async def proctoring_exception_handler(request: Request, exc: ProctoringException) -> JSONResponse:
     """Global exception handler for ProctoringException"""
     logger.error(f"Error occurred: {exc.detail}", extra={
@@ -56,7 +66,8 @@ async def proctoring_exception_handler(request: Request, exc: ProctoringExceptio
                 "message": exc.detail,
                 "additional_info": exc.additional_info
             }
-        }
+        },
+        headers=exc.headers
     )
 
 async def validation_exception_handler(request: Request, exc: ValidationException) -> JSONResponse:
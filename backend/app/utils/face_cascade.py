@@ -0,0 +1,115 @@
+import os
+import cv2
+import numpy as np
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from .face_detectors import FaceDetector, get_detector
+from .image_utils import decode_image, BufferLike
+from .multiscale_detection import FACE_DETECTION_SCALE, reduced_decode_flag, locate_faces
+
+# Answer "exactly one face?" with a cheap detector first (off by default)
+CASCADE_ENABLED = os.getenv("FACE_COUNT_CASCADE", "0") == "1"
+# Backend for the cheap first stage
+FAST_BACKEND = os.getenv("FACE_COUNT_CASCADE_BACKEND", "mediapipe_short")
+# The first stage runs on a copy downscaled to at most this width
+FAST_MAX_WIDTH = int(os.getenv("FACE_COUNT_CASCADE_WIDTH", 320))
+# A single fast detection below this confidence is confirmed by the full detector
+FAST_MIN_CONFIDENCE = float(os.getenv("FACE_COUNT_CASCADE_MIN_CONFIDENCE", 0.8))
+
+class FaceCountCascade:
+    """
+    Two-stage face count. The fast backend runs on a small copy of the frame; a
+    single confident face is accepted as is. Zero faces, several faces or a
+    low-confidence face fall through to the expensive detector, and the stage
+    counters show how often each case happens and how often the full detector
+    agreed with the fast one.
+    """
+
+    def __init__(self, enabled: bool = CASCADE_ENABLED, backend: str = FAST_BACKEND):
+        self.enabled = enabled
+        self.backend = backend
+        self.frames = 0
+        self.fast_accepted = 0
+        self.escalated = Counter()
+        self.full_agreed = 0
+
+    @property
+    def detector(self) -> FaceDetector:
+        return get_detector(self.backend)
+
+    def fast_count(self, rgb_img: np.ndarray) -> Tuple[Optional[int], bool]:
+        """
+        Run the fast stage. Returns (fast face count, accepted); when accepted is
+        False the caller runs the full detector and reports it via record_full.
+        """
+        if not self.enabled:
+            return None, False
+        self.frames += 1
+
+        height, width = rgb_img.shape[:2]
+        if width > FAST_MAX_WIDTH:
+            factor = FAST_MAX_WIDTH / width
+            rgb_img = cv2.resize(rgb_img, (FAST_MAX_WIDTH, int(height * factor)), interpolation=cv2.INTER_AREA)
+        faces = self.detector.detect_scored(rgb_img)
+
+        if len(faces) == 1 and faces[0][1] >= FAST_MIN_CONFIDENCE:
+            self.fast_accepted += 1
+            return 1, True
+        if not faces:
+            self.escalated["zero"] += 1
+        elif len(faces) > 1:
+            self.escalated["multiple"] += 1
+        else:
+            self.escalated["low_confidence"] += 1
+        return len(faces), False
+
+    def record_full(self, fast_count: Optional[int], full_count: int) -> None:
+        if fast_count is not None:
+            self.full_agreed += fast_count == full_count
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend,
+            "frames": self.frames,
+            "fast_accepted": self.fast_accepted,
+            "escalated": dict(self.escalated),
+            "full_agreed": self.full_agreed
+        }
+
+def combine_stats(stats: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Add up the per-process counters and derive the per-stage hit rates"""
+    escalated = Counter()
+    for entry in stats:
+        escalated.update(entry["escalated"])
+    frames = sum(entry["frames"] for entry in stats)
+    fast_accepted = sum(entry["fast_accepted"] for entry in stats)
+    escalations = sum(escalated.values())
+    full_agreed = sum(entry["full_agreed"] for entry in stats)
+    return {
+        "enabled": any(entry["enabled"] for entry in stats),
+        "backend": stats[0]["backend"] if stats else FAST_BACKEND,
+        "frames": frames,
+        "fast_hit_rate": round(fast_accepted / frames, 4) if frames else 0.0,
+        "escalation_rates": {reason: round(count / frames, 4) for reason, count in escalated.items()},
+        # Escalations where the full detector gave the fast count anyway are wasted work
+        "full_agreement_rate": round(full_agreed / escalations, 4) if escalations else 0.0
+    }
+
+def count_faces_in_bytes(image_data: BufferLike, detector: Optional[FaceDetector] = None,
+                         scale: int = FACE_DETECTION_SCALE) -> int:
+    """Decode at the detection resolution and count faces, trying the fast stage first"""
+    img = decode_image(image_data, reduced_decode_flag(scale))
+    if img is None:
+        raise ValueError("Failed to decode image")
+    rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    fast_count, accepted = face_count_cascade.fast_count(rgb_img)
+    if accepted:
+        return fast_count
+
+    locations, _ = locate_faces(img, scale, image_data, rgb_img=rgb_img, detector=detector)
+    face_count_cascade.record_full(fast_count, len(locations))
+    return len(locations)
+
+# Create singleton instance
+face_count_cascade = FaceCountCascade()
@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import cv2
+import numpy as np
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .face_tracker import FaceLocation, box_iou
+from .model_registry import model_registry
+from .. import ssd_face_detector_model_location, ssd_face_detector_config_location
+
+logger = logging.getLogger(__name__)
+
+# Backend used by call sites without their own FACE_DETECTOR_<SITE> setting ("auto" picks from the benchmark report)
+DEFAULT_BACKEND = os.getenv("FACE_DETECTOR", "hog")
+# Benchmark report written by benchmarks/bench_face_detectors.py and read by "auto"
+BENCHMARK_REPORT = os.getenv("FACE_DETECTOR_REPORT", "face_detector_benchmark.json")
+# Minimum face-count agreement with the reference backend for "auto" to pick a backend
+MIN_AGREEMENT = float(os.getenv("FACE_DETECTOR_MIN_AGREEMENT", 0.95))
+# Detection confidence for the MediaPipe and SSD backends
+MIN_CONFIDENCE = float(os.getenv("FACE_DETECTOR_MIN_CONFIDENCE", 0.5))
+
+def _as_rgb(image: np.ndarray) -> np.ndarray:
+    return cv2.cvtColor(image, cv2.COLOR_GRAY2RGB) if image.ndim == 2 else image
+
+def _as_gray(image: np.ndarray) -> np.ndarray:
+    return image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+
+def _clip_box(top: int, right: int, bottom: int, left: int, height: int, width: int) -> FaceLocation:
+    return max(0, top), min(width, right), min(height, bottom), max(0, left)
+
+class FaceDetector(ABC):
+    """
+    Common interface for face detection backends. detect takes an RGB (or
+    grayscale) image and returns (top, right, bottom, left) boxes in pixels, the
+    same convention as face_recognition.face_locations.
+    """
+    name = ""
+
+    @abstractmethod
+    def detect(self, image: np.ndarray) -> List[FaceLocation]:
+        ...
+
+    def detect_scored(self, image: np.ndarray) -> List[Tuple[FaceLocation, float]]:
+        """Boxes with detection confidence; backends without a score report 1.0"""
+        return [(box, 1.0) for box in self.detect(image)]
+
+    def __call__(self, image: np.ndarray) -> List[FaceLocation]:
+        return self.detect(image)
+
+class HogDetector(FaceDetector):
+    """dlib HOG via face_recognition; the most accurate CPU option and the reference"""
+    name = "hog"
+
+    def __init__(self, upsample: int = 1):
+        import face_recognition
+        self.face_locations = face_recognition.face_locations
+        self.upsample = upsample
+
+    def detect(self, image: np.ndarray) -> List[FaceLocation]:
+        return self.face_locations(image, number_of_times_to_upsample=self.upsample)
+
+class MediaPipeDetector(FaceDetector):
+    """MediaPipe BlazeFace, full-range model"""
+    name = "mediapipe"
+    model_selection = 1
+
+    def __init__(self, min_confidence: float = MIN_CONFIDENCE):
+        import mediapipe as mp
+        self.face_detection = mp.solutions.face_detection.FaceDetection(
+            model_selection=self.model_selection,
+            min_detection_confidence=min_confidence
+        )
+
+    def detect(self, image: np.ndarray) -> List[FaceLocation]:
+        return [box for box, _ in self.detect_scored(image)]
+
+    def detect_scored(self, image: np.ndarray) -> List[Tuple[FaceLocation, float]]:
+        image = _as_rgb(image)
+        height, width = image.shape[:2]
+        results = self.face_detection.process(image)
+        faces = []
+        for detection in results.detections or []:
+            bbox = detection.location_data.relative_bounding_box
+            left, top = int(bbox.xmin * width), int(bbox.ymin * height)
+            right, bottom = left + int(bbox.width * width), top + int(bbox.height * height)
+            faces.append((_clip_box(top, right, bottom, left, height, width), float(detection.score[0])))
+        return faces
+
+class MediaPipeShortRangeDetector(MediaPipeDetector):
+    """MediaPipe BlazeFace short-range model (faces within ~2m, i.e. a webcam); faster"""
+    name = "mediapipe_short"
+    model_selection = 0
+
+class HaarDetector(FaceDetector):
+    """OpenCV Haar cascade; cheapest, but misses turned faces and has more false positives"""
+    name = "haar"
+
+    def __init__(self, scale_factor: float = 1.3, min_neighbors: int = 5):
+        self.cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+
+    def detect(self, image: np.ndarray) -> List[FaceLocation]:
+        faces = self.cascade.detectMultiScale(_as_gray(image), self.scale_factor, self.min_neighbors)
+        return [(int(y), int(x + w), int(y + h), int(x)) for x, y, w, h in faces]
+
+class SsdDetector(FaceDetector):
+    """OpenCV DNN res10 300x300 SSD (Caffe weights in app/models)"""
+    name = "ssd"
+
+    def __init__(self, min_confidence: float = MIN_CONFIDENCE):
+        model_path = ssd_face_detector_model_location()
+        config_path = ssd_face_detector_config_location()
+        if not (os.path.exists(model_path) and os.path.exists(config_path)):
+            raise FileNotFoundError(f"SSD face detector files not found ({config_path}, {model_path})")
+        self.net = cv2.dnn.readNetFromCaffe(config_path, model_path)
+        self.min_confidence = min_confidence
+
+    def detect(self, image: np.ndarray) -> List[FaceLocation]:
+        return [box for box, _ in self.detect_scored(image)]
+
+    def detect_scored(self, image: np.ndarray) -> List[Tuple[FaceLocation, float]]:
+        image = _as_rgb(image)
+        height, width = image.shape[:2]
+        # The model was trained on BGR input with these channel means
+        blob = cv2.dnn.blobFromImage(cv2.resize(image, (300, 300)), 1.0, (300, 300),
+                                     (104.0, 177.0, 123.0), swapRB=True)
+        self.net.setInput(blob)
+        detections = self.net.forward()[0, 0]
+        detections = detections[detections[:, 2] >= self.min_confidence]
+        faces = []
+        for score, (x1, y1, x2, y2) in zip(detections[:, 2], detections[:, 3:7] * np.array([width, height, width, height])):
+            faces.append((_clip_box(int(y1), int(x2), int(y2), int(x1), height, width), float(score)))
+        return faces
+
+DETECTOR_BACKENDS = {
+    HogDetector.name: HogDetector,
+    MediaPipeDetector.name: MediaPipeDetector,
+    MediaPipeShortRangeDetector.name: MediaPipeShortRangeDetector,
+    HaarDetector.name: HaarDetector,
+    SsdDetector.name: SsdDetector
+}
+
+# One instance per backend per process, loaded on first use (or by the warm-up) as face_detector.<name>
+for _name, _backend in DETECTOR_BACKENDS.items():
+    model_registry.register(f"face_detector.{_name}", _backend, vision=True)
+# Backend resolved for each call site, so "auto" reads the report only once
+_call_site_backends: Dict[str, str] = {}
+
+def get_detector(name: str) -> FaceDetector:
+    if name not in DETECTOR_BACKENDS:
+        raise ValueError(f"Unknown face detector backend: {name}")
+    return model_registry.get(f"face_detector.{name}")
+
+def detector_for(call_site: str) -> FaceDetector:
+    """
+    Backend configured for a call site: FACE_DETECTOR_<CALL_SITE> (e.g.
+    FACE_DETECTOR_MONITORING=mediapipe), else FACE_DETECTOR. "auto" uses the
+    fastest backend in the benchmark report that meets FACE_DETECTOR_MIN_AGREEMENT.
+    """
+    if call_site not in _call_site_backends:
+        name = os.getenv(f"FACE_DETECTOR_{call_site.upper()}", DEFAULT_BACKEND)
+        if name == "auto":
+            name = select_backend(load_benchmark_report())
+        logger.info(f"Face detector for {call_site}: {name}")
+        _call_site_backends[call_site] = name
+    return get_detector(_call_site_backends[call_site])
+
+def select_backend(report: Optional[Dict[str, Any]], min_agreement: float = MIN_AGREEMENT) -> str:
+    """Fastest backend whose face-count agreement meets min_agreement, falling back to HOG"""
+    if not report:
+        logger.warning("No face detector benchmark report found, using hog")
+        return HogDetector.name
+    eligible = [
+        (stats["ms_p50"], name) for name, stats in report["backends"].items()
+        if "error" not in stats and stats["count_agreement"] >= min_agreement
+    ]
+    if not eligible:
+        logger.warning(f"No face detector meets agreement {min_agreement}, using hog")
+        return HogDetector.name
+    return min(eligible)[1]
+
+def load_benchmark_report(path: str = BENCHMARK_REPORT) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def benchmark_detectors(images: Sequence[np.ndarray], backends: Optional[List[str]] = None,
+                        reference: str = HogDetector.name) -> Dict[str, Any]:
+    """
+    Run each backend over the RGB fixture images and compare it with the
+    reference backend. count_agreement is the share of images with the same face
+    count as the reference; box_recall is the share of reference faces overlapped
+    (IoU >= 0.3, the backends draw boxes of different tightness) by a detected box.
+    """
+    names = backends or list(DETECTOR_BACKENDS)
+    runs: Dict[str, Any] = {}
+    for name in dict.fromkeys([reference] + names):
+        try:
+            detector = get_detector(name)
+        except Exception as e:
+            runs[name] = {"error": str(e)}
+            continue
+        detector.detect(images[0])  # Warm-up, not timed
+        timings, found = [], []
+        for image in images:
+            start = time.perf_counter()
+            found.append(detector.detect(image))
+            timings.append((time.perf_counter() - start) * 1000)
+        runs[name] = {"timings": sorted(timings), "found": found}
+
+    if "error" in runs[reference]:
+        raise RuntimeError(f"Reference backend {reference} unavailable: {runs[reference]['error']}")
+    expected = runs[reference]["found"]
+    total_faces = sum(len(boxes) for boxes in expected)
+
+    report: Dict[str, Any] = {"reference": reference, "images": len(images), "faces": total_faces, "backends": {}}
+    for name in names:
+        run = runs[name]
+        if "error" in run:
+            report["backends"][name] = {"error": run["error"]}
+            continue
+        timings = run["timings"]
+        matched = sum(len(ref) == len(got) for ref, got in zip(expected, run["found"]))
+        recalled = sum(
+            1 for ref_boxes, boxes in zip(expected, run["found"])
+            for ref in ref_boxes if any(box_iou(ref, box) >= 0.3 for box in boxes)
+        )
+        report["backends"][name] = {
+            "ms_p50": round(timings[len(timings) // 2], 2),
+            "ms_p95": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+            "count_agreement": round(matched / len(images), 4),
+            "box_recall": round(recalled / total_faces, 4) if total_faces else 1.0
+        }
+    return report
@@ -0,0 +1,76 @@
+import os
+import struct
+import numpy as np
+from typing import NamedTuple, Optional
+from .face_tracker import FaceLocation
+from .face_detectors import FaceDetector
+from .model_registry import model_registry
+
+# Identifies the embedding network; bump it when the model file changes so stored embeddings are recomputed
+EMBEDDING_MODEL = os.getenv("FACE_EMBEDDING_MODEL", "dlib_face_recognition_resnet_model_v1")
+# Re-sampling passes face_recognition averages per encoding; more is slower but steadier
+NUM_JITTERS = int(os.getenv("FACE_EMBEDDING_JITTERS", 1))
+
+# File layout: magic, box (top, right, bottom, left), embedding length, version length,
+# then the version string and the float32 embedding
+MAGIC = b"FEMB"
+HEADER = struct.Struct("<4s4iHH")
+
+class FaceEmbedding(NamedTuple):
+    """Embedding and box of the largest face in an image; an empty embedding means no face was found"""
+    embedding: np.ndarray
+    box: FaceLocation
+    version: str
+
+    @property
+    def found(self) -> bool:
+        return self.embedding.size > 0
+
+def embedding_version(detector: FaceDetector) -> str:
+    """Stored embeddings from another model, detector or jitter setting are stale"""
+    return f"{EMBEDDING_MODEL}/{detector.name}/jitters={NUM_JITTERS}"
+
+def pack_embedding(face: FaceEmbedding) -> bytes:
+    version = face.version.encode("utf-8")
+    vector = np.asarray(face.embedding, np.float32)
+    return HEADER.pack(MAGIC, *face.box, vector.size, len(version)) + version + vector.tobytes()
+
+def unpack_embedding(data: bytes) -> FaceEmbedding:
+    if len(data) < HEADER.size:
+        raise ValueError("Truncated face embedding")
+    magic, top, right, bottom, left, size, version_length = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a face embedding file")
+    offset = HEADER.size + version_length
+    if len(data) != offset + size * 4:
+        raise ValueError("Truncated face embedding")
+    version = data[HEADER.size:offset].decode("utf-8")
+    return FaceEmbedding(np.frombuffer(data, np.float32, size, offset), (top, right, bottom, left), version)
+
+def _load_face_encoder():
+    import face_recognition
+    return face_recognition.face_encodings
+
+model_registry.register("face_encoder", _load_face_encoder, vision=True)
+
+def encode_face(image_rgb: np.ndarray, box: FaceLocation, landmarks: str = "large") -> Optional[np.ndarray]:
+    """
+    Embedding of the face inside one known box, skipping detection. landmarks
+    "small" aligns with the 5-point model, cheaper than the default 68 points.
+    """
+    face_encodings = model_registry.get("face_encoder")
+    encodings = face_encodings(image_rgb, known_face_locations=[box], num_jitters=NUM_JITTERS, model=landmarks)
+    return np.asarray(encodings[0], np.float32) if encodings else None
+
+def encode_largest_face(image_rgb: np.ndarray, detector: FaceDetector) -> FaceEmbedding:
+    """Detect with the given backend and encode only the largest face"""
+    version = embedding_version(detector)
+    boxes = detector.detect(image_rgb)
+    embedding = None
+    if boxes:
+        top, right, bottom, left = max(boxes, key=lambda b: (b[1] - b[3]) * (b[2] - b[0]))
+        box = (int(top), int(right), int(bottom), int(left))
+        embedding = encode_face(image_rgb, box)
+    if embedding is None:
+        return FaceEmbedding(np.zeros(0, np.float32), (0, 0, 0, 0), version)
+    return FaceEmbedding(embedding, box, version)
@@ -0,0 +1,151 @@
+import os
+import cv2
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+FaceLocation = Tuple[int, int, int, int]  # (top, right, bottom, left), as face_recognition returns
+Detector = Callable[[np.ndarray], List[FaceLocation]]
+
+# Run a full-frame detection at least this often, tracking or not
+FULL_REDETECT_EVERY = int(os.getenv("FACE_TRACK_REDETECT_EVERY", 10))
+# ROI = previous box grown by this fraction of its size on every side
+ROI_MARGIN = 0.5
+# A tracked box must overlap the previous one at least this much to be trusted
+MIN_TRACK_IOU = 0.3
+# Scale of the whole-frame pass that looks for faces entering the frame when the caller
+# has no change mask; coarse (HOG misses faces under ~160px here), so face counting passes a mask
+NEW_FACE_SCAN_SCALE = 0.25
+# Sessions tracked per process; the least recently seen are forgotten first
+MAX_SESSIONS = 10000
+
+def box_iou(a: FaceLocation, b: FaceLocation) -> float:
+    top, right, bottom, left = max(a[0], b[0]), min(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+def _roi(box: FaceLocation, height: int, width: int) -> FaceLocation:
+    top, right, bottom, left = box
+    margin_y = int((bottom - top) * ROI_MARGIN)
+    margin_x = int((right - left) * ROI_MARGIN)
+    return max(0, top - margin_y), min(width, right + margin_x), min(height, bottom + margin_y), max(0, left - margin_x)
+
+class _TrackState:
+    __slots__ = ("boxes", "frames_since_full", "tracked", "full", "forced")
+
+    def __init__(self):
+        self.boxes: List[FaceLocation] = []
+        self.frames_since_full = 0
+        self.tracked = 0
+        self.full = 0
+        self.forced = 0
+
+class FaceTracker:
+    """
+    Keeps the last face boxes of each session. While the faces stay put, later
+    frames are searched only inside an enlarged ROI around each box. A full-frame
+    detection runs every redetect_every frames, or as soon as a face is lost or
+    an extra face shows up in an ROI. New faces elsewhere are caught by the
+    caller's change mask (any change outside the ROIs forces a full detection),
+    or without one by a downscaled scan of the whole frame.
+    """
+
+    def __init__(self, redetect_every: int = FULL_REDETECT_EVERY):
+        self.redetect_every = redetect_every
+        self.sessions: "OrderedDict[str, _TrackState]" = OrderedDict()
+
+    def _session(self, session_id: str) -> _TrackState:
+        state = self.sessions.get(session_id)
+        if state is None:
+            state = self.sessions[session_id] = _TrackState()
+            if len(self.sessions) > MAX_SESSIONS:
+                self.sessions.popitem(last=False)
+        else:
+            self.sessions.move_to_end(session_id)
+        return state
+
+    def locate(self, session_id: str, image: np.ndarray, detect: Detector,
+               changed: Optional[np.ndarray] = None) -> Tuple[List[FaceLocation], str]:
+        """
+        Return face boxes for image and whether they came from "tracked" ROIs or a
+        "full" detection. changed is an optional boolean mask, at any resolution,
+        of what changed since the frame the stored boxes came from.
+        """
+        state = self._session(session_id)
+        if state.boxes and state.frames_since_full < self.redetect_every:
+            if changed is not None and self._changed_outside(changed, image, state.boxes):
+                state.forced += 1
+            else:
+                tracked = self._track(image, state.boxes, detect)
+                if tracked is not None and (changed is not None or not self._new_face_elsewhere(image, tracked, detect)):
+                    state.boxes = tracked
+                    state.frames_since_full += 1
+                    state.tracked += 1
+                    return tracked, "tracked"
+
+        boxes = detect(image)
+        state.boxes = list(boxes)
+        state.frames_since_full = 0
+        state.full += 1
+        return boxes, "full"
+
+    def reset(self, session_id: str) -> None:
+        """Forget a session's boxes so its next frame gets a full detection"""
+        state = self.sessions.get(session_id)
+        if state is not None:
+            state.boxes = []
+
+    def _track(self, image: np.ndarray, boxes: List[FaceLocation], detect: Detector) -> Optional[List[FaceLocation]]:
+        height, width = image.shape[:2]
+        tracked = []
+        for box in boxes:
+            roi_top, roi_right, roi_bottom, roi_left = _roi(box, height, width)
+
+            # dlib only accepts contiguous arrays, so the ROI slice is copied
+            roi = np.ascontiguousarray(image[roi_top:roi_bottom, roi_left:roi_right])
+            found = [(t + roi_top, r + roi_left, b + roi_top, l + roi_left) for t, r, b, l in detect(roi)]
+            best = max(found, key=lambda candidate: box_iou(candidate, box), default=None)
+            if best is None or box_iou(best, box) < MIN_TRACK_IOU:
+                # Tracking confidence lost for this face
+                return None
+            if any(candidate is not best and all(box_iou(candidate, known) < MIN_TRACK_IOU for known in boxes)
+                   for candidate in found):
+                # Another face has come close to this one
+                return None
+            tracked.append(best)
+        return tracked
+
+    def _changed_outside(self, changed: np.ndarray, image: np.ndarray, boxes: List[FaceLocation]) -> bool:
+        """Whether anything changed outside the tracked faces' ROIs, e.g. someone entering the frame"""
+        height, width = image.shape[:2]
+        mask_height, mask_width = changed.shape[:2]
+        outside = changed.copy()
+        for box in boxes:
+            top, right, bottom, left = _roi(box, height, width)
+            # Rounded outwards, so mask cells only partly inside an ROI count as inside
+            outside[top * mask_height // height:-(-bottom * mask_height // height),
+                    left * mask_width // width:-(-right * mask_width // width)] = False
+        return bool(outside.any())
+
+    def _new_face_elsewhere(self, image: np.ndarray, tracked: List[FaceLocation], detect: Detector) -> bool:
+        small = cv2.resize(image, None, fx=NEW_FACE_SCAN_SCALE, fy=NEW_FACE_SCAN_SCALE, interpolation=cv2.INTER_AREA)
+        factor = 1 / NEW_FACE_SCAN_SCALE
+        for t, r, b, l in detect(small):
+            candidate = (int(t * factor), int(r * factor), int(b * factor), int(l * factor))
+            if all(box_iou(candidate, box) < MIN_TRACK_IOU for box in tracked):
+                return True
+        return False
+
+    def get_stats(self, session_id: str) -> Dict[str, int]:
+        state = self.sessions.get(session_id)
+        if state is None:
+            return {"tracked_frames": 0, "full_detections": 0, "forced_by_change": 0, "tracked_faces": 0}
+        return {
+            "tracked_frames": state.tracked,
+            "full_detections": state.full,
+            "forced_by_change": state.forced,
+            "tracked_faces": len(state.boxes)
+        }
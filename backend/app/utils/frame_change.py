@@ -0,0 +1,103 @@
+import os
+import time
+import cv2
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Frames are compared as small grayscale thumbnails
+THUMBNAIL_SIZE = (32, 32)
+# A thumbnail pixel counts as changed when it moves by more than this many gray levels
+PIXEL_DELTA = 25
+# Fraction of changed thumbnail pixels above which the frame is analyzed again
+CHANGED_FRACTION = float(os.getenv("FRAME_CHANGE_FRACTION", 0.02))
+# A session is always re-analyzed after this long, even if nothing changed
+FORCED_REANALYSIS_SECONDS = float(os.getenv("FRAME_REANALYSIS_SECONDS", 10))
+# Sessions tracked per process; the least recently seen are forgotten first
+MAX_SESSIONS = 10000
+
+def frame_thumbnail(img: np.ndarray) -> np.ndarray:
+    """Downsample a BGR or grayscale frame to the thumbnail used for change detection"""
+    small = cv2.resize(img, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return small
+
+def changed_fraction(previous: np.ndarray, current: np.ndarray) -> float:
+    diff = cv2.absdiff(previous, current)
+    return float(np.count_nonzero(diff > PIXEL_DELTA)) / diff.size
+
+class _SessionState:
+    __slots__ = ("thumbnail", "result", "analyzed_at", "frames", "skipped")
+
+    def __init__(self):
+        self.thumbnail = None
+        self.result = None
+        self.analyzed_at = 0.0
+        self.frames = 0
+        self.skipped = 0
+
+class FrameChangeDetector:
+    """
+    Remembers the last analyzed frame of each session so that near-identical
+    follow-up frames can reuse its analysis instead of running face detection.
+    """
+
+    def __init__(self, threshold: float = CHANGED_FRACTION, max_age: float = FORCED_REANALYSIS_SECONDS):
+        self.threshold = threshold
+        self.max_age = max_age
+        self.sessions: "OrderedDict[str, _SessionState]" = OrderedDict()
+
+    def _session(self, session_id: str) -> _SessionState:
+        state = self.sessions.get(session_id)
+        if state is None:
+            state = self.sessions[session_id] = _SessionState()
+            if len(self.sessions) > MAX_SESSIONS:
+                self.sessions.popitem(last=False)
+        else:
+            self.sessions.move_to_end(session_id)
+        return state
+
+    def check(self, session_id: str, img: np.ndarray) -> Tuple[np.ndarray, Optional[Dict[str, Any]]]:
+        """
+        Return the frame's thumbnail and, if the frame has not changed meaningfully
+        since the last analysis, that analysis result to reuse.
+        """
+        state = self._session(session_id)
+        state.frames += 1
+        thumbnail = frame_thumbnail(img)
+
+        if (state.result is not None
+                and time.monotonic() - state.analyzed_at < self.max_age
+                and changed_fraction(state.thumbnail, thumbnail) <= self.threshold):
+            state.skipped += 1
+            return thumbnail, state.result
+        return thumbnail, None
+
+    def changed_mask(self, session_id: str, thumbnail: np.ndarray) -> Optional[np.ndarray]:
+        """Thumbnail pixels that changed since the last analyzed frame; None if there is none"""
+        state = self.sessions.get(session_id)
+        if state is None or state.thumbnail is None:
+            return None
+        return cv2.absdiff(state.thumbnail, thumbnail) > PIXEL_DELTA
+
+    def record(self, session_id: str, thumbnail: np.ndarray, result: Dict[str, Any]) -> None:
+        """Store a fresh analysis as the reference for later frames"""
+        state = self._session(session_id)
+        state.thumbnail = thumbnail
+        state.result = result
+        state.analyzed_at = time.monotonic()
+
+    def last_result(self, session_id: str) -> Optional[Dict[str, Any]]:
+        state = self.sessions.get(session_id)
+        return state.result if state is not None else None
+
+    def get_stats(self, session_id: str) -> Dict[str, Any]:
+        state = self.sessions.get(session_id)
+        if state is None:
+            return {"frames": 0, "skipped": 0, "skip_ratio": 0.0}
+        return {
+            "frames": state.frames,
+            "skipped": state.skipped,
+            "skip_ratio": round(state.skipped / state.frames, 3) if state.frames else 0.0
+        }
@@ -2,6 +2,12 @@ import cv2
 import numpy as np
 import dlib
 from typing import Tuple, Optional
+from .landmarks import from_dlib, eye_aspect_ratio, DLIB_LEFT_EYE, DLIB_RIGHT_EYE
+
+# Positions of the six EAR points in a single eye's array
+EYE_POINTS = np.arange(6)
+# Gaze ratios (left / right white pixels) classified as looking at the centre
+CENTER_RATIO_RANGE = (0.7, 1.3)
 
 class GazeDetector:
     def __init__(self):
@@ -22,14 +28,7 @@ class GazeDetector:
 
     def get_eye_aspect_ratio(self, eye_points: np.ndarray) -> float:
         """Calculate the eye aspect ratio to determine if eyes are open."""
-        # Compute the euclidean distances between the vertical eye landmarks
-        A = np.linalg.norm(eye_points[1] - eye_points[5])
-        B = np.linalg.norm(eye_points[2] - eye_points[4])
-        # Compute the euclidean distance between the horizontal eye landmarks
-        C = np.linalg.norm(eye_points[0] - eye_points[3])
-        # Calculate the eye aspect ratio
-        ear = (A + B) / (2.0 * C)
-        return ear
+        return float(eye_aspect_ratio(eye_points.astype(np.float32), EYE_POINTS))
 
     def get_gaze_ratio(self, frame: np.ndarray, eye_points: np.ndarray) -> float:
         """Calculate the gaze ratio to determine gaze direction."""
@@ -74,15 +73,14 @@ class GazeDetector:
         landmarks = self.predictor(gray, face)
         
         # Convert landmarks to numpy array
-        landmarks_points = np.array([[p.x, p.y] for p in landmarks.parts()])
+        landmarks_points = from_dlib(landmarks)
         
-        # Get eye regions
-        left_eye = landmarks_points[36:42]
-        right_eye = landmarks_points[42:48]
+        # Get eye regions (cv2.fillPoly needs integer points)
+        left_eye = landmarks_points[DLIB_LEFT_EYE].astype(np.int32)
+        right_eye = landmarks_points[DLIB_RIGHT_EYE].astype(np.int32)
         
-        # Calculate eye aspect ratios
-        left_ear = self.get_eye_aspect_ratio(left_eye)
-        right_ear = self.get_eye_aspect_ratio(right_eye)
+        # Calculate both eye aspect ratios in one call
+        left_ear, right_ear = eye_aspect_ratio(landmarks_points, [DLIB_LEFT_EYE, DLIB_RIGHT_EYE])
         
         # If eyes are closed, return "closed"
         if left_ear < 0.2 or right_ear < 0.2:
@@ -96,9 +94,9 @@ class GazeDetector:
         gaze_ratio = (left_gaze_ratio + right_gaze_ratio) / 2
         
         # Determine gaze direction
-        if gaze_ratio <= 0.7:
+        if gaze_ratio <= CENTER_RATIO_RANGE[0]:
             return "right", gaze_ratio
-        elif gaze_ratio >= 1.3:
+        elif gaze_ratio >= CENTER_RATIO_RANGE[1]:
             return "left", gaze_ratio
         else:
             return "center", gaze_ratio 
\ No newline at end of file
@@ -0,0 +1,242 @@
+import os
+import json
+import math
+import time
+import logging
+import numpy as np
+from abc import ABC, abstractmethod
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from .image_utils import decode_image
+from .model_registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+# Engine for gaze analysis ("auto" picks from the benchmark report)
+DEFAULT_ENGINE = os.getenv("GAZE_ENGINE", "pupil")
+# Benchmark report written by benchmarks/bench_gaze_engines.py and read by "auto"
+BENCHMARK_REPORT = os.getenv("GAZE_ENGINE_REPORT", "gaze_engine_benchmark.json")
+# Minimum accuracy on the labeled fixtures for "auto" to pick an engine
+MIN_ACCURACY = float(os.getenv("GAZE_ENGINE_MIN_ACCURACY", 0.8))
+
+# Every engine reports one of these
+DIRECTIONS = ("center", "left", "right", "up", "down", "closed", "no_face")
+
+class GazeEstimate(NamedTuple):
+    direction: str
+    # 0..1; 0 for no_face and closed, so downstream aggregation ignores them
+    confidence: float
+    engine: str
+
+def _margin_confidence(value: float, low: float, high: float) -> float:
+    """
+    Confidence of a classification by thresholding value at low and high: 0.5
+    at a threshold, rising to 1.0 half a band width away from it on either side.
+    """
+    half_band = (high - low) / 2
+    distance = min(abs(value - low), abs(value - high))
+    return round(0.5 + 0.5 * min(1.0, distance / half_band), 3)
+
+class GazeEngine(ABC):
+    """
+    Common interface for gaze implementations. estimate takes a decoded BGR
+    frame and returns a GazeEstimate; analyze_frame and analyze_image return
+    the API result dict (gaze_direction, confidence, engine, timestamp, or
+    error). debug_archive is the engine's DebugImageArchive, if it keeps one.
+    """
+    name = ""
+    debug_archive = None
+
+    @abstractmethod
+    def estimate(self, frame: np.ndarray, gray: Optional[np.ndarray] = None,
+                 session_id: Optional[str] = None) -> GazeEstimate:
+        ...
+
+    def analyze_frame(self, frame: np.ndarray, gray: Optional[np.ndarray] = None,
+                      session_id: Optional[str] = None) -> Dict[str, Any]:
+        try:
+            estimate = self.estimate(frame, gray, session_id)
+        except Exception as e:
+            return {"error": str(e), "engine": self.name, "timestamp": datetime.now().isoformat()}
+        return {
+            "gaze_direction": estimate.direction,
+            "confidence": estimate.confidence,
+            "engine": estimate.engine,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def analyze_image(self, image_data: bytes, session_id: Optional[str] = None) -> Dict[str, Any]:
+        frame = decode_image(image_data)
+        if frame is None:
+            return {"error": "Could not read image", "engine": self.name, "timestamp": datetime.now().isoformat()}
+        return self.analyze_frame(frame, session_id=session_id)
+
+class PupilEngine(GazeEngine):
+    """utils/gaze_tracking.GazeTracker: dlib landmarks (or Haar eyes) and pupil thresholding; per-session face tracking"""
+    name = "pupil"
+
+    def __init__(self):
+        # Shares the gaze_tracker model (and its warm-up) with direct users of GazeTracker
+        from .gaze_tracking import get_gaze_tracker
+        self.tracker = get_gaze_tracker()
+        self.debug_archive = self.tracker.debug_archive
+
+    def estimate(self, frame, gray=None, session_id=None):
+        result = self.tracker.analyze_frame(frame, gray=gray, session_id=session_id)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        return GazeEstimate(result["gaze_direction"], result["confidence"], self.name)
+
+    def analyze_frame(self, frame, gray=None, session_id=None):
+        # The tracker's own result already has the common fields, plus debug_image when sampled
+        result = self.tracker.analyze_frame(frame, gray=gray, session_id=session_id)
+        result["engine"] = self.name
+        return result
+
+class FaceMeshEngine(GazeEngine):
+    """services/gaze_tracking.GazeTracking: MediaPipe Face Mesh, eye centre against nose tip (horizontal only)"""
+    name = "face_mesh"
+
+    def __init__(self):
+        # Imported here so MediaPipe is only loaded by processes using this engine
+        from ..services.gaze_tracking import GazeTracking, HORIZONTAL_THRESHOLD
+        self.tracking = GazeTracking()
+        self.threshold = HORIZONTAL_THRESHOLD
+        self.debug_archive = self.tracking.debug_archive
+
+    def estimate(self, frame, gray=None, session_id=None):
+        result = self.tracking.analyze_frame(frame, session_id)
+        if result["status"] == "no_face":
+            return GazeEstimate("no_face", 0.0, self.name)
+        if result["status"] != "success":
+            raise RuntimeError(result["message"])
+        confidence = _margin_confidence(result["horizontal_offset"], -self.threshold, self.threshold)
+        return GazeEstimate(result["direction"], confidence, self.name)
+
+class GazeRatioEngine(GazeEngine):
+    """utils/gaze_detector.GazeDetector: dlib 68-point eye regions, white-pixel ratio between eye halves"""
+    name = "gaze_ratio"
+
+    def __init__(self):
+        # Imported here so dlib is only loaded by processes using this engine
+        from .gaze_detector import GazeDetector, CENTER_RATIO_RANGE
+        self.detector = GazeDetector()
+        # The ratio is multiplicative, so the margin is measured on its log
+        self.log_range = tuple(math.log(bound) for bound in CENTER_RATIO_RANGE)
+
+    def estimate(self, frame, gray=None, session_id=None):
+        direction, ratio = self.detector.detect_gaze(frame)
+        if direction in ("no_face", "closed"):
+            return GazeEstimate(direction, 0.0, self.name)
+        return GazeEstimate(direction, _margin_confidence(math.log(ratio), *self.log_range), self.name)
+
+GAZE_ENGINES = {
+    PupilEngine.name: PupilEngine,
+    FaceMeshEngine.name: FaceMeshEngine,
+    GazeRatioEngine.name: GazeRatioEngine
+}
+
+# One instance per engine per process, loaded on first use (or by the warm-up) as gaze_engine.<name>
+for _name, _engine in GAZE_ENGINES.items():
+    model_registry.register(f"gaze_engine.{_name}", _engine, vision=True)
+# Engine resolved once per process, so "auto" reads the report only once
+_configured_engine: Optional[str] = None
+
+def get_engine(name: str) -> GazeEngine:
+    if name not in GAZE_ENGINES:
+        raise ValueError(f"Unknown gaze engine: {name}")
+    return model_registry.get(f"gaze_engine.{name}")
+
+def configured_engine_name() -> str:
+    global _configured_engine
+    if _configured_engine is None:
+        name = DEFAULT_ENGINE
+        if name == "auto":
+            name = select_engine(load_benchmark_report())
+        logger.info(f"Gaze engine: {name}")
+        _configured_engine = name
+    return _configured_engine
+
+def get_gaze_engine() -> GazeEngine:
+    """Engine configured by GAZE_ENGINE; "auto" uses the fastest engine in the benchmark report meeting GAZE_ENGINE_MIN_ACCURACY"""
+    return get_engine(configured_engine_name())
+
+def select_engine(report: Optional[Dict[str, Any]], min_accuracy: float = MIN_ACCURACY) -> str:
+    """Fastest engine whose fixture accuracy meets min_accuracy, falling back to pupil"""
+    if not report:
+        logger.warning("No gaze engine benchmark report found, using pupil")
+        return PupilEngine.name
+    eligible = [
+        (stats["ms_p50"], name) for name, stats in report["engines"].items()
+        if "error" not in stats and stats["accuracy"] >= min_accuracy
+    ]
+    if not eligible:
+        logger.warning(f"No gaze engine meets accuracy {min_accuracy}, using pupil")
+        return PupilEngine.name
+    return min(eligible)[1]
+
+def load_benchmark_report(path: str = BENCHMARK_REPORT) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def _rss_mb() -> float:
+    """Resident set size of this process; model memory is native, so tracemalloc would not see it"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        import resource
+        # Peak rather than current RSS where /proc is unavailable (KB on Linux, bytes on macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def benchmark_engines(fixtures: Sequence[Tuple[np.ndarray, str]], engines: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Run each engine over labeled BGR fixtures, (frame, expected direction)
+    pairs. accuracy is the share of fixtures classified as labeled; confusion
+    maps each label to the counts of what the engine reported for it. rss_mb is
+    the process memory growth while loading the engine and running it, so with
+    several engines in one process it is only indicative (shared libraries are
+    counted by the first engine that loads them).
+    """
+    names = engines or list(GAZE_ENGINES)
+    counts = Counter(label for _, label in fixtures)
+    labels = [direction for direction in DIRECTIONS if direction in counts] + sorted(set(counts) - set(DIRECTIONS))
+    report: Dict[str, Any] = {"fixtures": len(fixtures), "labels": {label: counts[label] for label in labels}, "engines": {}}
+    for name in names:
+        rss_before = _rss_mb()
+        try:
+            start = time.perf_counter()
+            engine = get_engine(name)
+            load_ms = (time.perf_counter() - start) * 1000
+            engine.estimate(fixtures[0][0])  # Warm-up, not timed
+        except Exception as e:
+            report["engines"][name] = {"error": str(e)}
+            continue
+
+        timings = []
+        confusion: Dict[str, Dict[str, int]] = {label: {} for label in labels}
+        correct = errors = 0
+        for frame, label in fixtures:
+            start = time.perf_counter()
+            try:
+                direction = engine.estimate(frame).direction
+            except Exception:
+                direction = "error"
+                errors += 1
+            timings.append((time.perf_counter() - start) * 1000)
+            confusion[label][direction] = confusion[label].get(direction, 0) + 1
+            correct += direction == label
+        timings.sort()
+        report["engines"][name] = {
+            "ms_p50": round(timings[len(timings) // 2], 2),
+            "ms_p99": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 2),
+            "load_ms": round(load_ms, 1),
+            "rss_mb": round(_rss_mb() - rss_before, 1),
+            "accuracy": round(correct / len(fixtures), 4),
+            "errors": errors,
+            "confusion": confusion
+        }
+    return report
@@ -3,6 +3,12 @@ import numpy as np
 from datetime import datetime
 import os
 from .. import pose_predictor_model_location, face_recognition_model_location
+from .face_tracker import FaceTracker
+from .face_detectors import detector_for
+from .model_registry import model_registry
+from .image_utils import decode_image
+from .debug_archive import DebugImageArchive
+from .landmarks import from_dlib, bounding_boxes, relative_position, DLIB_LEFT_EYE, DLIB_RIGHT_EYE
 
 # Try to import dlib, fall back to our mock implementation if it fails
 try:
@@ -10,15 +16,22 @@ try:
     print("Using real dlib library")
 except ImportError:
     try:
-        from .mock_dlib import get_frontal_face_detector, shape_predictor
+        from .mock_dlib import get_frontal_face_detector, shape_predictor, Rectangle
         dlib = type('dlib', (), {
             'get_frontal_face_detector': get_frontal_face_detector,
-            'shape_predictor': shape_predictor
+            'shape_predictor': shape_predictor,
+            'rectangle': Rectangle
         })
         print("Using mock dlib implementation")
     except ImportError:
         print("ERROR: Neither dlib nor mock_dlib is available")
 
+# Positions of the six landmark points in a single eye's array
+EYE_POINTS = np.arange(6)
+
+# Share of gaze analyses whose debug images are kept under debug_images/ (off by default)
+GAZE_DEBUG_SAMPLE_RATE = float(os.getenv("GAZE_DEBUG_SAMPLE_RATE", 0))
+
 class GazeTracker:
     def __init__(self):
         # Initialize dlib's face detector and facial landmark predictor
@@ -37,34 +50,46 @@ class GazeTracker:
             self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
             self.eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
         
-        # Create snapshots directory if it doesn't exist
-        self.snapshots_dir = "snapshots"
-        os.makedirs(self.snapshots_dir, exist_ok=True)
+        # dlib's own detector finds the face for the landmarks unless FACE_DETECTOR_GAZE picks another backend
+        self.face_detector = detector_for("gaze") if os.getenv("FACE_DETECTOR_GAZE") else None
+        
+        # Per-session face ROI tracking for the landmark step
+        self.face_tracker = FaceTracker()
         
-        # Debug directory for saving processed images
-        self.debug_dir = "debug_images"
-        os.makedirs(self.debug_dir, exist_ok=True)
+        # Sampled debug images, drawn and queued only for sampled calls
+        self.debug_archive = DebugImageArchive("debug_images", GAZE_DEBUG_SAMPLE_RATE)
 
-    def detect_eyes_and_pupils(self, frame):
-        """Detect eyes in the frame and attempt to locate pupils"""
+    def detect_eyes_and_pupils(self, frame, gray=None, session_id=None, debug=False):
+        """Detect eyes in the frame and attempt to locate pupils; debug also queues annotated images"""
+        # Convert to grayscale once; every detection step below works on it
+        if gray is None:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        
         if self.using_dlib_models:
-            return self._detect_eyes_dlib(frame)
+            return self._detect_eyes_dlib(frame, gray, session_id, debug)
         else:
-            return self._detect_eyes_opencv(frame)
+            return self._detect_eyes_opencv(frame, gray, debug)
     
-    def _detect_eyes_dlib(self, frame):
+    def _detect_faces_dlib(self, gray):
+        """Run dlib's detector (or the configured backend) and return (top, right, bottom, left) boxes"""
+        if self.face_detector is not None:
+            return self.face_detector.detect(gray)
+        return [(face.top(), face.right(), face.bottom(), face.left()) for face in self.detector(gray)]
+
+    def _detect_eyes_dlib(self, frame, gray, session_id=None, debug=False):
         """Detect eyes using dlib's facial landmarks"""
-        # Convert to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Detect faces using dlib
-        faces = self.detector(gray)
+        # Detect faces using dlib, searching around the session's last face when we have one
+        if session_id is not None:
+            faces, _ = self.face_tracker.locate(session_id, gray, self._detect_faces_dlib)
+        else:
+            faces = self._detect_faces_dlib(gray)
         
         if len(faces) == 0:
             return None, None, None
         
         # Get the first face
-        face = faces[0]
+        top, right, bottom, left = faces[0]
+        face = dlib.rectangle(left, top, right, bottom)
         
         # Get facial landmarks
         landmarks = self.predictor(gray, face)
@@ -72,82 +97,53 @@ class GazeTracker:
         # Convert face rect to (x, y, w, h) format for compatibility
         face_rect = (face.left(), face.top(), face.width(), face.height())
         
-        # Extract eye regions based on landmarks
-        # Left eye landmarks (36-41)
-        left_eye_pts = []
-        for i in range(36, 42):
-            point = landmarks.part(i)
-            left_eye_pts.append((point.x, point.y))
-        left_eye_pts = np.array(left_eye_pts)
-        
-        # Right eye landmarks (42-47)
-        right_eye_pts = []
-        for i in range(42, 48):
-            point = landmarks.part(i)
-            right_eye_pts.append((point.x, point.y))
-        right_eye_pts = np.array(right_eye_pts)
-        
-        # Get eye bounding boxes
-        left_eye_x, left_eye_y = np.min(left_eye_pts, axis=0)
-        left_eye_w = np.max(left_eye_pts[:, 0]) - left_eye_x
-        left_eye_h = np.max(left_eye_pts[:, 1]) - left_eye_y
-        left_eye = (int(left_eye_x - face.left()), int(left_eye_y - face.top()), 
-                    int(left_eye_w), int(left_eye_h))
-        
-        right_eye_x, right_eye_y = np.min(right_eye_pts, axis=0)
-        right_eye_w = np.max(right_eye_pts[:, 0]) - right_eye_x
-        right_eye_h = np.max(right_eye_pts[:, 1]) - right_eye_y
-        right_eye = (int(right_eye_x - face.left()), int(right_eye_y - face.top()), 
-                     int(right_eye_w), int(right_eye_h))
+        # Extract eye regions based on landmarks (36-41 left, 42-47 right); cv2 drawing needs int points
+        points = from_dlib(landmarks)
+        left_eye_pts = points[DLIB_LEFT_EYE].astype(np.int32)
+        right_eye_pts = points[DLIB_RIGHT_EYE].astype(np.int32)
+        
+        # Get both eye bounding boxes at once, then make them relative to the face
+        eye_boxes = bounding_boxes(points, [DLIB_LEFT_EYE, DLIB_RIGHT_EYE])
+        relative_boxes = (eye_boxes - (face.left(), face.top(), 0, 0)).astype(int)
+        left_eye, right_eye = (tuple(int(v) for v in box) for box in relative_boxes)
         
         # Calculate pupil positions
-        left_pupil = self._calculate_pupil_position(frame, left_eye_pts, face_rect)
-        right_pupil = self._calculate_pupil_position(frame, right_eye_pts, face_rect)
+        left_pupil = self._calculate_pupil_position(gray, left_eye_pts, face_rect)
+        right_pupil = self._calculate_pupil_position(gray, right_eye_pts, face_rect)
         
-        # Debug images
+        if debug:
+            self._save_dlib_debug(frame, left_eye_pts, right_eye_pts, eye_boxes, [left_pupil, right_pupil])
+        
+        return [left_eye, right_eye], [left_pupil, right_pupil], face_rect
+    
+    def _save_dlib_debug(self, frame, left_eye_pts, right_eye_pts, eye_boxes, pupils):
+        """Queue the frame annotated with the eye landmarks and pupil positions"""
         debug_img = frame.copy()
         
         # Draw eye landmarks
-        for point in left_eye_pts:
-            cv2.circle(debug_img, point, 2, (0, 255, 0), -1)
-        for point in right_eye_pts:
-            cv2.circle(debug_img, point, 2, (0, 255, 0), -1)
+        for x, y in np.concatenate([left_eye_pts, right_eye_pts]):
+            cv2.circle(debug_img, (int(x), int(y)), 2, (0, 255, 0), -1)
         
         # Draw pupil positions
-        if left_pupil[0] is not None:
-            rel_x, rel_y = left_pupil
-            x = int(left_eye_x + rel_x * left_eye_w)
-            y = int(left_eye_y + rel_y * left_eye_h)
-            cv2.circle(debug_img, (x, y), 3, (0, 0, 255), -1)
-        
-        if right_pupil[0] is not None:
-            rel_x, rel_y = right_pupil
-            x = int(right_eye_x + rel_x * right_eye_w)
-            y = int(right_eye_y + rel_y * right_eye_h)
-            cv2.circle(debug_img, (x, y), 3, (0, 0, 255), -1)
-        
-        # Save debug image
-        timestamp = datetime.now().timestamp()
-        debug_path = os.path.join(self.debug_dir, f"dlib_eyes_{timestamp}.jpg")
-        cv2.imwrite(debug_path, debug_img)
+        for (eye_x, eye_y, eye_w, eye_h), (rel_x, rel_y) in zip(eye_boxes, pupils):
+            if rel_x is not None:
+                cv2.circle(debug_img, (int(eye_x + rel_x * eye_w), int(eye_y + rel_y * eye_h)), 3, (0, 0, 255), -1)
         
-        return [left_eye, right_eye], [left_pupil, right_pupil], face_rect
+        self.debug_archive.save("dlib_eyes.jpg", debug_img)
     
-    def _calculate_pupil_position(self, frame, eye_pts, face_rect):
+    def _calculate_pupil_position(self, gray, eye_pts, face_rect):
         """Calculate pupil position relative to eye"""
         face_x, face_y, face_w, face_h = face_rect
         
         # Get eye region
-        eye_x, eye_y = np.min(eye_pts, axis=0)
-        eye_w = np.max(eye_pts[:, 0]) - eye_x
-        eye_h = np.max(eye_pts[:, 1]) - eye_y
+        eye_box = bounding_boxes(eye_pts.astype(np.float32), EYE_POINTS)
         
         # Create a mask for the eye region
-        mask = np.zeros(frame.shape[:2], dtype=np.uint8)
+        mask = np.zeros(gray.shape[:2], dtype=np.uint8)
         cv2.fillPoly(mask, [eye_pts], 255)
         
         # Apply mask to get only the eye region
-        eye_region = cv2.bitwise_and(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), mask)
+        eye_region = cv2.bitwise_and(gray, mask)
         
         # Threshold to find the pupil (darkest part)
         _, thresh = cv2.threshold(eye_region, 55, 255, cv2.THRESH_BINARY_INV)
@@ -166,20 +162,14 @@ class GazeTracker:
         if M["m00"] == 0:
             return (0.5, 0.5)
             
-        pupil_x = int(M["m10"] / M["m00"])
-        pupil_y = int(M["m01"] / M["m00"])
+        pupil = np.array([int(M["m10"] / M["m00"]), int(M["m01"] / M["m00"])], np.float32)
         
         # Calculate relative position
-        rel_x = (pupil_x - eye_x) / eye_w if eye_w > 0 else 0.5
-        rel_y = (pupil_y - eye_y) / eye_h if eye_h > 0 else 0.5
-        
-        return (rel_x, rel_y)
+        rel_x, rel_y = relative_position(pupil, eye_box)
+        return (float(rel_x), float(rel_y))
     
-    def _detect_eyes_opencv(self, frame):
+    def _detect_eyes_opencv(self, frame, gray, debug=False):
         """Fallback method using OpenCV's Haar cascades"""
-        # Convert to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
         # Detect faces
         faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
         
@@ -212,9 +202,6 @@ class GazeTracker:
             # Apply histogram equalization to enhance contrast
             eye_roi = cv2.equalizeHist(eye_roi)
             
-            # Create debug image
-            debug_roi = cv2.cvtColor(eye_roi, cv2.COLOR_GRAY2BGR)
-            
             # Find the pupil using a simple thresholding approach
             _, thresh = cv2.threshold(eye_roi, 50, 255, cv2.THRESH_BINARY_INV)
             
@@ -237,9 +224,6 @@ class GazeTracker:
                 if M["m00"] > 0:  # Avoid division by zero
                     pupil_x = int(M["m10"] / M["m00"])
                     pupil_y = int(M["m01"] / M["m00"])
-                    
-                    # Draw the pupil on debug image
-                    cv2.circle(debug_roi, (pupil_x, pupil_y), 3, (0, 255, 0), -1)
             
             # If pupil was found, calculate relative position
             if pupil_x is not None and pupil_y is not None:
@@ -251,31 +235,70 @@ class GazeTracker:
                 # If pupil not found, use center of eye as fallback
                 pupils.append((0.5, 0.5))
             
-            # Save debug image
-            timestamp = datetime.now().timestamp()
-            debug_path = os.path.join(self.debug_dir, f"eye_{i}_{timestamp}.jpg")
-            cv2.imwrite(debug_path, debug_roi)
+            if debug:
+                # Equalized eye with the pupil marked
+                debug_roi = cv2.cvtColor(eye_roi, cv2.COLOR_GRAY2BGR)
+                if pupil_x is not None:
+                    cv2.circle(debug_roi, (pupil_x, pupil_y), 3, (0, 255, 0), -1)
+                self.debug_archive.save(f"eye_{i}.jpg", debug_roi)
             
             # Add to processed eyes
             processed_eyes.append((eye_x, eye_y, eye_w, eye_h))
         
         return processed_eyes, pupils, face
 
+    def _save_result_debug(self, frame, face, eyes, direction):
+        """Queue the frame annotated with the face, eyes and detected direction; returns its path"""
+        debug_img = frame.copy()
+        face_x, face_y, face_w, face_h = face
+        cv2.rectangle(debug_img, (face_x, face_y), (face_x+face_w, face_y+face_h), (255, 0, 0), 2)
+        
+        if not self.using_dlib_models:
+            # Draw eyes from OpenCV detection
+            for eye_x, eye_y, eye_w, eye_h in eyes:
+                cv2.rectangle(debug_img, 
+                             (face_x+eye_x, face_y+eye_y), 
+                             (face_x+eye_x+eye_w, face_y+eye_y+eye_h), 
+                             (0, 255, 0), 2)
+        
+        # Add text with detected direction
+        cv2.putText(debug_img, f"Direction: {direction}", (10, 30), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        return self.debug_archive.save("result.jpg", debug_img)
+
+    def analyze_image(self, image_data, session_id=None):
+        """Analyze gaze direction from encoded image bytes, decoded in memory"""
+        frame = decode_image(image_data)
+        if frame is None:
+            return {"error": "Could not read image"}
+        return self.analyze_frame(frame, session_id=session_id)
+
     def analyze_gaze(self, image_path):
-        """Analyze gaze direction from an image"""
+        """Analyze gaze direction from an image file"""
         try:
             # Read the image
             frame = cv2.imread(image_path)
             if frame is None:
                 return {"error": "Could not read image"}
 
-            # Save a debug copy of the original image
-            timestamp = datetime.now().timestamp()
-            debug_orig_path = os.path.join(self.debug_dir, f"original_{timestamp}.jpg")
-            cv2.imwrite(debug_orig_path, frame)
+            return self.analyze_frame(frame)
+
+        except Exception as e:
+            return {
+                "error": str(e),
+                "timestamp": datetime.now().isoformat()
+            }
+
+    def analyze_frame(self, frame, gray=None, session_id=None):
+        """Analyze gaze direction from an already decoded BGR frame"""
+        try:
+            # One sampling decision covers every debug image of this call; unsampled calls draw nothing
+            debug = self.debug_archive.sample(session_id)
+            if debug:
+                self.debug_archive.save("original.jpg", frame)
 
             # Detect eyes and pupils
-            eyes, pupils, face = self.detect_eyes_and_pupils(frame)
+            eyes, pupils, face = self.detect_eyes_and_pupils(frame, gray, session_id, debug)
             
             if eyes is None or len(eyes) < 2:
                 return {
@@ -308,41 +331,28 @@ class GazeTracker:
                 direction = "up"     # Pupil on bottom means looking up
                 confidence = 0.8
             
-            # Debug image with gaze direction
-            debug_img = frame.copy()
-            
-            if self.using_dlib_models:
-                # Draw face rectangle
-                face_x, face_y, face_w, face_h = face
-                cv2.rectangle(debug_img, (face_x, face_y), (face_x+face_w, face_y+face_h), (255, 0, 0), 2)
-            else:
-                # Draw face and eyes from OpenCV detection
-                face_x, face_y, face_w, face_h = face
-                cv2.rectangle(debug_img, (face_x, face_y), (face_x+face_w, face_y+face_h), (255, 0, 0), 2)
-                
-                for eye_x, eye_y, eye_w, eye_h in eyes:
-                    cv2.rectangle(debug_img, 
-                                 (face_x+eye_x, face_y+eye_y), 
-                                 (face_x+eye_x+eye_w, face_y+eye_y+eye_h), 
-                                 (0, 255, 0), 2)
-            
-            # Add text with detected direction
-            cv2.putText(debug_img, f"Direction: {direction}", (10, 30), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-            
-            # Save debug image
-            debug_result_path = os.path.join(self.debug_dir, f"result_{timestamp}.jpg")
-            cv2.imwrite(debug_result_path, debug_img)
-            
-            return {
+            result = {
                 "gaze_direction": direction,
                 "confidence": confidence,
-                "timestamp": datetime.now().isoformat(),
-                "debug_image": debug_result_path
+                "timestamp": datetime.now().isoformat()
             }
+            if debug:
+                result["debug_image"] = self._save_result_debug(frame, face, eyes, direction)
+            return result
             
         except Exception as e:
             return {
                 "error": str(e),
                 "timestamp": datetime.now().isoformat()
-            } 
\ No newline at end of file
+            }
+
+# Built on first use (or by the warm-up); loading the landmark model is slow
+model_registry.register("gaze_tracker", GazeTracker, vision=True)
+
+def get_gaze_tracker() -> GazeTracker:
+    return model_registry.get("gaze_tracker")
+
+# Share of gaze uploads kept under snapshots/gaze/, written off the request path (off by default)
+GAZE_SNAPSHOT_SAMPLE_RATE = float(os.getenv("GAZE_SNAPSHOT_SAMPLE_RATE", 0))
+# A directory of its own: the archive's retention deletes the oldest files it finds there
+gaze_snapshot_archive = DebugImageArchive(os.path.join("snapshots", "gaze"), GAZE_SNAPSHOT_SAMPLE_RATE)
@@ -0,0 +1,64 @@
+import os
+import cv2
+import numpy as np
+from typing import NamedTuple, Optional
+from .face_detectors import FaceDetector
+from .face_tracker import FaceLocation
+from .image_utils import decode_image, BufferLike
+
+# Side of the square face crop stored for every ID photo
+ID_PHOTO_SIZE = int(os.getenv("ID_PHOTO_SIZE", 320))
+# Space kept around the face on every side, as a fraction of the face size
+ID_PHOTO_FACE_MARGIN = float(os.getenv("ID_PHOTO_FACE_MARGIN", 0.5))
+# JPEG quality of the stored crop
+ID_PHOTO_JPEG_QUALITY = int(os.getenv("ID_PHOTO_JPEG_QUALITY", 92))
+# Detection runs on a copy downscaled to at most this width; phone photos are several megapixels
+DETECTION_MAX_WIDTH = 800
+
+class NormalizedPhoto(NamedTuple):
+    """Canonical ID photo: a square JPEG crop around the face, and the face box inside it"""
+    image: bytes
+    box: FaceLocation
+
+def normalize_id_photo(image_data: BufferLike, detector: FaceDetector) -> Optional[NormalizedPhoto]:
+    """
+    Crop the largest face with a margin and resize it to ID_PHOTO_SIZE square.
+    Returns None if the upload can't be decoded or contains no face.
+    """
+    image = decode_image(image_data)
+    if image is None:
+        return None
+    return normalize_id_image(image, detector)
+
+def normalize_id_image(image: np.ndarray, detector: FaceDetector) -> Optional[NormalizedPhoto]:
+    """normalize_id_photo for an already decoded BGR upload; None if it contains no face"""
+    height, width = image.shape[:2]
+
+    factor = min(1.0, DETECTION_MAX_WIDTH / width)
+    small = cv2.resize(image, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA) if factor < 1 else image
+    boxes = detector.detect(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+    if not boxes:
+        return None
+    top, right, bottom, left = (value / factor for value in max(boxes, key=lambda b: (b[1] - b[3]) * (b[2] - b[0])))
+
+    # Square crop centred on the face; parts falling outside the photo are padded
+    face_size = max(bottom - top, right - left)
+    side = int(round(face_size * (1 + 2 * ID_PHOTO_FACE_MARGIN)))
+    crop_top = int(round((top + bottom) / 2 - side / 2))
+    crop_left = int(round((left + right) / 2 - side / 2))
+    pad_top, pad_left = max(0, -crop_top), max(0, -crop_left)
+    pad_bottom, pad_right = max(0, crop_top + side - height), max(0, crop_left + side - width)
+    crop = image[max(0, crop_top):crop_top + side, max(0, crop_left):crop_left + side]
+    if pad_top or pad_left or pad_bottom or pad_right:
+        crop = cv2.copyMakeBorder(crop, pad_top, pad_bottom, pad_left, pad_right, cv2.BORDER_REPLICATE)
+    crop = cv2.resize(crop, (ID_PHOTO_SIZE, ID_PHOTO_SIZE), interpolation=cv2.INTER_AREA)
+
+    scale = ID_PHOTO_SIZE / side
+    box = (
+        int((top - crop_top) * scale), int((right - crop_left) * scale),
+        int((bottom - crop_top) * scale), int((left - crop_left) * scale)
+    )
+    ok, encoded = cv2.imencode(".jpg", crop, [cv2.IMWRITE_JPEG_QUALITY, ID_PHOTO_JPEG_QUALITY])
+    if not ok:
+        return None
+    return NormalizedPhoto(encoded.tobytes(), box)
@@ -0,0 +1,47 @@
+import base64
+import binascii
+import struct
+import cv2
+import numpy as np
+from typing import List, Optional, Union
+
+BufferLike = Union[bytes, bytearray, memoryview]
+
+def decode_image(image_data: BufferLike, flags: int = cv2.IMREAD_COLOR) -> Optional[np.ndarray]:
+    """
+    Decode an encoded image (JPEG/PNG) straight from a byte buffer.
+    np.frombuffer only wraps the buffer, so the upload is never copied before imdecode.
+    Returns None if the buffer is not a valid image.
+    """
+    if not image_data:
+        return None
+    nparr = np.frombuffer(image_data, np.uint8)
+    return cv2.imdecode(nparr, flags)
+
+def decode_data_url(image_data: str) -> bytes:
+    """Convert a base64 string (optionally a data: URL) into raw image bytes."""
+    if image_data.startswith("data:") and "," in image_data:
+        image_data = image_data.split(",", 1)[1]
+    try:
+        return base64.b64decode(image_data)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Invalid base64 image data: {str(e)}")
+
+def split_length_prefixed(body: BufferLike) -> List[memoryview]:
+    """
+    Split a length-prefixed frame batch (4-byte big-endian length, then the
+    encoded image, repeated) into zero-copy views of the individual frames.
+    """
+    view = memoryview(body)
+    frames = []
+    offset = 0
+    while offset < len(view):
+        if offset + 4 > len(view):
+            raise ValueError("Truncated frame length prefix")
+        (length,) = struct.unpack_from(">I", view, offset)
+        offset += 4
+        if offset + length > len(view):
+            raise ValueError("Truncated frame data")
+        frames.append(view[offset:offset + length])
+        offset += length
+    return frames
@@ -0,0 +1,67 @@
+"""
+Facial landmark math on plain NumPy arrays.
+
+A MediaPipe or dlib result is converted once into an (N, 2|3) float32 array;
+everything else is fancy indexing on that array. Every function also accepts a
+stack of frames shaped (..., N, D) and returns one value per frame, so a ring
+buffer of landmarks can be evaluated in a single call.
+"""
+import numpy as np
+from typing import Sequence
+
+# dlib 68-point model
+DLIB_LANDMARK_COUNT = 68
+DLIB_LEFT_EYE = np.arange(36, 42)
+DLIB_RIGHT_EYE = np.arange(42, 48)
+DLIB_NOSE_TIP = 30
+
+# MediaPipe FaceMesh, six points per eye in the p1..p6 order of the EAR formula
+MP_LEFT_EYE = np.array([33, 160, 158, 133, 153, 144])
+MP_RIGHT_EYE = np.array([362, 385, 387, 263, 373, 380])
+MP_NOSE_TIP = 1
+MP_LEFT_EYE_OUTER, MP_LEFT_EYE_INNER, MP_LEFT_EYE_TOP, MP_LEFT_EYE_BOTTOM = 33, 133, 159, 145
+MP_RIGHT_EYE_OUTER = 263
+MP_FOREHEAD = 10
+
+def from_mediapipe(face_landmarks, width: float = 1.0, height: float = 1.0) -> np.ndarray:
+    """(N, 3) float32 array of a FaceMesh face; x/y scaled by width/height (1 keeps normalized coordinates)"""
+    points = np.array([(lm.x, lm.y, lm.z) for lm in face_landmarks.landmark], np.float32)
+    points *= np.array([width, height, width], np.float32)
+    return points
+
+def from_dlib(shape, count: int = DLIB_LANDMARK_COUNT) -> np.ndarray:
+    """(N, 2) float32 array of a dlib full_object_detection (or the mock shape predictor's result)"""
+    return np.array([(shape.part(i).x, shape.part(i).y) for i in range(count)], np.float32)
+
+def eye_aspect_ratio(points: np.ndarray, eye: Sequence[int]) -> np.ndarray:
+    """
+    EAR = (|p2 - p6| + |p3 - p5|) / (2 |p1 - p4|) for the six eye indices.
+    points is (..., N, D); eye may also be (E, 6) to get every eye at once.
+    """
+    p = points[..., np.asarray(eye), :2]
+    vertical = np.linalg.norm(p[..., 1, :] - p[..., 5, :], axis=-1) + np.linalg.norm(p[..., 2, :] - p[..., 4, :], axis=-1)
+    horizontal = np.linalg.norm(p[..., 0, :] - p[..., 3, :], axis=-1)
+    return np.divide(vertical, 2 * horizontal, out=np.zeros_like(vertical), where=horizontal > 0)
+
+def bounding_boxes(points: np.ndarray, indices: Sequence[int]) -> np.ndarray:
+    """(..., 4) boxes as (x, y, w, h) around the selected points"""
+    selected = points[..., np.asarray(indices), :2]
+    low = selected.min(axis=-2)
+    high = selected.max(axis=-2)
+    return np.concatenate([low, high - low], axis=-1)
+
+def relative_position(xy: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """Position of xy inside (x, y, w, h) boxes, 0..1 on each axis; 0.5 where a box is empty"""
+    size = boxes[..., 2:]
+    offset = xy - boxes[..., :2]
+    return np.divide(offset, size, out=np.full_like(offset, 0.5, dtype=np.float32), where=size > 0)
+
+def head_pose(points: np.ndarray, left_corner: int, right_corner: int, nose_tip: int) -> np.ndarray:
+    """
+    (..., 2) yaw/pitch proxies: the nose tip's offset from the midpoint of the
+    outer eye corners, in inter-ocular distances (0 when facing the camera).
+    """
+    left, right, nose = points[..., left_corner, :2], points[..., right_corner, :2], points[..., nose_tip, :2]
+    interocular = np.linalg.norm(right - left, axis=-1, keepdims=True)
+    offset = nose - (left + right) / 2
+    return np.divide(offset, interocular, out=np.zeros_like(offset), where=interocular > 0)
@@ -0,0 +1,60 @@
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+# Graphs built per pool; concurrent requests beyond this wait for a free one
+POOL_SIZE = int(os.getenv("MEDIAPIPE_POOL_SIZE", 2))
+# Longest a request waits for a free graph before failing
+CHECKOUT_TIMEOUT_SECONDS = float(os.getenv("MEDIAPIPE_CHECKOUT_TIMEOUT_SECONDS", 10))
+
+class GraphPool:
+    """
+    A fixed set of pre-built MediaPipe graphs (FaceDetection, FaceMesh, ...).
+    A graph is not safe to call from two threads at once, so each request checks
+    one out for the duration of its process() calls and returns it afterwards;
+    graph setup is paid once at construction instead of on every call.
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int = POOL_SIZE):
+        self.size = max(size, 1)
+        self.graphs: queue.Queue = queue.Queue()
+        for _ in range(self.size):
+            self.graphs.put(factory())
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+
+    @contextmanager
+    def checkout(self, timeout: float = CHECKOUT_TIMEOUT_SECONDS) -> Iterator[Any]:
+        try:
+            graph = self.graphs.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                self.waits += 1
+            try:
+                graph = self.graphs.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError(f"No MediaPipe graph free after {timeout}s")
+        with self.lock:
+            self.checkouts += 1
+        try:
+            yield graph
+        finally:
+            self.graphs.put(graph)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self.graphs.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "size": self.size,
+            "idle": self.graphs.qsize(),
+            "checkouts": self.checkouts,
+            "waits": self.waits
+        }
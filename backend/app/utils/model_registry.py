@@ -0,0 +1,86 @@
+import os
+import time
+import threading
+import logging
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Models loaded by the startup warm-up, and required by /ready; everything else loads on first use.
+# gemini needs GEMINI_API_KEY, so it is only warmed when listed here explicitly
+WARMUP_MODELS = [name.strip() for name in os.getenv(
+    "WARMUP_MODELS", "face_detector.hog,gaze_tracker"
+).split(",") if name.strip()]
+
+class _Entry:
+    __slots__ = ("loader", "vision", "instance", "lock", "load_ms", "error")
+
+    def __init__(self, loader: Callable[[], Any], vision: bool):
+        self.loader = loader
+        self.vision = vision
+        self.instance = None
+        self.lock = threading.Lock()
+        self.load_ms = None
+        self.error = None
+
+class ModelRegistry:
+    """
+    Heavy models and clients (MediaPipe graphs, dlib predictors, Gemini, ...)
+    registered by name and built on first use, once per process. Vision models
+    are used inside the vision workers, so they are warmed there rather than in
+    the API process.
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, _Entry] = {}
+
+    def register(self, name: str, loader: Callable[[], Any], vision: bool = False) -> None:
+        if name not in self.entries:
+            self.entries[name] = _Entry(loader, vision)
+
+    def get(self, name: str) -> Any:
+        entry = self.entries.get(name)
+        if entry is None:
+            raise KeyError(f"Unknown model: {name}")
+        if entry.instance is None:
+            with entry.lock:
+                if entry.instance is None:
+                    start = time.perf_counter()
+                    try:
+                        entry.instance = entry.loader()
+                        entry.error = None
+                    except Exception as e:
+                        # Not cached; the next call tries again (e.g. once the API key is set)
+                        entry.error = str(e)
+                        raise
+                    entry.load_ms = round((time.perf_counter() - start) * 1000, 1)
+                    logger.info(f"Loaded model {name} in {entry.load_ms}ms")
+        return entry.instance
+
+    def is_loaded(self, name: str) -> bool:
+        entry = self.entries.get(name)
+        return entry is not None and entry.instance is not None
+
+    def is_vision(self, name: str) -> bool:
+        entry = self.entries.get(name)
+        return entry is not None and entry.vision
+
+    def warm_up(self, names: List[str]) -> None:
+        """Load each named model, logging instead of raising so one failure doesn't stop the rest"""
+        for name in names:
+            if name not in self.entries:
+                logger.warning(f"Cannot warm up unknown model {name}")
+                continue
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.error(f"Warm-up of model {name} failed: {str(e)}")
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {"loaded": entry.instance is not None, "load_ms": entry.load_ms, "error": entry.error}
+            for name, entry in self.entries.items()
+        }
+
+# Create singleton instance
+model_registry = ModelRegistry()
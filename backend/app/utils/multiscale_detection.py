@@ -0,0 +1,74 @@
+import os
+import cv2
+import numpy as np
+from typing import Callable, List, Optional, Tuple
+from .image_utils import decode_image, BufferLike
+from .face_detectors import FaceDetector, get_detector, DEFAULT_BACKEND
+
+# Decode frames at 1/N resolution for face detection (1 disables, 2/4/8 use libjpeg's DCT scaling)
+FACE_DETECTION_SCALE = int(os.getenv("FACE_DETECTION_SCALE", 1))
+# Faces smaller than this (pixels, on the reduced image) trigger a full-resolution rerun
+MIN_REDUCED_FACE_SIZE = int(os.getenv("FACE_DETECTION_MIN_REDUCED_SIZE", 40))
+
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+FaceLocation = Tuple[int, int, int, int]
+
+def reduced_decode_flag(scale: int) -> int:
+    if scale not in REDUCED_DECODE_FLAGS:
+        raise ValueError(f"Unsupported face detection scale: {scale}")
+    return REDUCED_DECODE_FLAGS[scale]
+
+def scale_locations(locations: List[FaceLocation], scale: int) -> List[FaceLocation]:
+    """Map (top, right, bottom, left) boxes from a 1/scale image back to original coordinates"""
+    return [(top * scale, right * scale, bottom * scale, left * scale) for top, right, bottom, left in locations]
+
+def is_ambiguous(locations: List[FaceLocation], expected_count: Optional[int] = None) -> bool:
+    """A reduced-resolution result needs confirming if a face is tiny or the face count changed"""
+    if expected_count is not None and len(locations) != expected_count:
+        return True
+    return any(min(bottom - top, right - left) < MIN_REDUCED_FACE_SIZE for top, right, bottom, left in locations)
+
+def locate_faces(img: np.ndarray, scale: int = 1, image_data: Optional[BufferLike] = None,
+                 expected_count: Optional[int] = None,
+                 rgb_img: Optional[np.ndarray] = None,
+                 detect: Optional[Callable[[np.ndarray], List[FaceLocation]]] = None,
+                 detector: Optional[FaceDetector] = None) -> Tuple[List[FaceLocation], Optional[np.ndarray]]:
+    """
+    Run face detection on img, which was decoded at 1/scale of the original.
+    Boxes are returned in original-resolution coordinates. If the reduced result is
+    ambiguous and the encoded image_data is available, detection is rerun on a
+    full-resolution decode, which is returned as the second element (else None).
+    detector is the backend for both passes (default FACE_DETECTOR); detect
+    replaces it for the first pass (e.g. a session's FaceTracker).
+    """
+    if detector is None:
+        detector = get_detector(DEFAULT_BACKEND)
+    if rgb_img is None:
+        rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    locations = (detect or detector.detect)(rgb_img)
+    if scale == 1:
+        return locations, None
+
+    if image_data is None or not is_ambiguous(locations, expected_count):
+        return scale_locations(locations, scale), None
+
+    full_img = decode_image(image_data)
+    if full_img is None:
+        return scale_locations(locations, scale), None
+    return detector.detect(cv2.cvtColor(full_img, cv2.COLOR_BGR2RGB)), full_img
+
+def detect_faces_in_bytes(image_data: BufferLike, scale: int = FACE_DETECTION_SCALE,
+                          expected_count: Optional[int] = None,
+                          detector: Optional[FaceDetector] = None) -> List[FaceLocation]:
+    """Decode at reduced scale and locate faces, confirming at full resolution when needed"""
+    img = decode_image(image_data, reduced_decode_flag(scale))
+    if img is None:
+        raise ValueError("Failed to decode image")
+    locations, _ = locate_faces(img, scale, image_data, expected_count, detector=detector)
+    return locations
@@ -0,0 +1,39 @@
+"""
+Compare N single process_frame calls with one batched run over the vision workers.
+
+Run from the backend directory:
+    python -m benchmarks.bench_batch_capture [frames]
+"""
+import asyncio
+import sys
+import time
+
+from app.services import vision_tasks
+from app.services.vision_executor import vision_executor
+from benchmarks.bench_capture_ingest import make_frame
+
+async def run(count):
+    frames = [make_frame() for _ in range(count)]
+    vision_executor.start()
+    # Warm every worker so process start-up is not counted
+    await vision_executor.map(vision_tasks.process_batch_frame, frames[:vision_executor.workers], "bench", "bench")
+
+    start = time.perf_counter()
+    for frame in frames:
+        await vision_executor.run(vision_tasks.process_frame, frame, "bench", "bench", key="bench")
+    single_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    await vision_executor.map(vision_tasks.process_batch_frame, frames, "bench", "bench")
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{count} frames on {vision_executor.workers} workers: single={single_ms / count:.1f}ms/frame "
+          f"batch={batch_ms / count:.1f}ms/frame speedup={single_ms / batch_ms:.2f}x")
+    vision_executor.shutdown()
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    asyncio.run(run(count))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare the JSON/base64 capture path with the binary ingest path at 720p.
+
+Only the ingest work is measured (request parsing, base64 decode, imdecode),
+face detection is identical on both paths and would drown out the difference.
+
+Run from the backend directory:
+    python -m benchmarks.bench_capture_ingest
+"""
+import base64
+import json
+import statistics
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from app.utils.image_utils import decode_image, decode_data_url
+
+ITERATIONS = 200
+
+def make_frame(width=1280, height=720):
+    """Build a noisy synthetic 720p frame and return it JPEG-encoded"""
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    frame = cv2.GaussianBlur(frame, (15, 15), 0)
+    ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    return encoded.tobytes()
+
+def json_path(body):
+    payload = json.loads(body)
+    image_bytes = decode_data_url(payload["imageData"])
+    return decode_image(image_bytes)
+
+def binary_path(body):
+    return decode_image(body)
+
+def measure(fn, body):
+    latencies = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        fn(body)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    fn(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+        "peak_mb": peak / (1024 * 1024)
+    }
+
+def main():
+    jpeg = make_frame()
+    json_body = json.dumps({
+        "testId": "bench",
+        "userId": "bench",
+        "imageData": "data:image/jpeg;base64," + base64.b64encode(jpeg).decode(),
+        "timestamp": "now"
+    }).encode()
+
+    print(f"payload: binary={len(jpeg) / 1024:.1f} KiB json={len(json_body) / 1024:.1f} KiB")
+    for name, fn, body in (("json+base64", json_path, json_body), ("binary", binary_path, jpeg)):
+        stats = measure(fn, body)
+        print(f"{name:>12}: p50={stats['p50_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms peak={stats['peak_mb']:.2f}MiB")
+
+if __name__ == "__main__":
+    main()
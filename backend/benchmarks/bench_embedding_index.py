@@ -0,0 +1,77 @@
+"""
+1:N search over 100k enrolled faces: the memory-mapped EmbeddingIndex against
+an O(N) loop of per-candidate distance calls (what comparing a photo with every
+file in id_photos/ amounts to, minus decoding and encoding the ID photos).
+
+Embeddings are random unit-scaled 128-d vectors, so no model is needed; the
+query is a perturbed copy of one enrolled vector, which must come back first.
+
+Run from the backend directory:
+    python -m benchmarks.bench_embedding_index [enrolled]
+"""
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from app.utils.embedding_index import EmbeddingIndex
+
+DIM = 128
+QUERIES = 200
+LOOP_QUERIES = 5
+
+def main():
+    enrolled = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(0, 0.09, (enrolled, DIM)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = EmbeddingIndex(directory, DIM)
+        index.open("bench")
+        start = time.perf_counter()
+        for i, vector in enumerate(vectors):
+            index.add(f"user{i}", vector)
+        add_ms = (time.perf_counter() - start) * 1000 / enrolled
+
+        targets = rng.integers(0, enrolled, QUERIES)
+        queries = vectors[targets] + rng.normal(0, 0.01, (QUERIES, DIM)).astype(np.float32)
+        timings, correct = [], 0
+        for target, query in zip(targets, queries):
+            start = time.perf_counter()
+            matches = index.search(query, k=5)
+            timings.append((time.perf_counter() - start) * 1000)
+            correct += matches[0][0] == f"user{target}"
+        timings.sort()
+
+        loop_timings = []
+        for query in queries[:LOOP_QUERIES]:
+            start = time.perf_counter()
+            distances = [float(np.linalg.norm(vector - query)) for vector in vectors]
+            sorted(range(enrolled), key=distances.__getitem__)[:5]
+            loop_timings.append((time.perf_counter() - start) * 1000)
+
+        removed = min(1000, enrolled)
+        start = time.perf_counter()
+        for i in range(removed):
+            index.remove(f"user{i}")
+        remove_ms = (time.perf_counter() - start) * 1000 / removed
+
+        index.close()
+        start = time.perf_counter()
+        reopened = EmbeddingIndex(directory, DIM)
+        reopened.open("bench")
+        reopen_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{enrolled} enrolled faces, {DIM}-d float32 ({enrolled * DIM * 4 / 1e6:.1f}MB mapped)")
+        print(f"add: {add_ms:.3f}ms per face, remove: {remove_ms:.3f}ms per face")
+        print(f"index search top-5: p50={statistics.median(timings):.2f}ms "
+              f"p99={timings[int(len(timings) * 0.99)]:.2f}ms, top-1 correct {correct}/{QUERIES}")
+        print(f"O(N) loop: p50={statistics.median(loop_timings):.1f}ms "
+              f"({statistics.median(loop_timings) / statistics.median(timings):.0f}x slower)")
+        print(f"reopen (journal replay + norms): {reopen_ms:.1f}ms, {len(reopened)} enrolled")
+        reopened.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Latency and agreement of every face detector backend on a fixture set.
+
+Each JPEG in the fixture directory is run through every backend; results are
+compared with the reference backend (HOG unless given). The report is printed
+and written to FACE_DETECTOR_REPORT, where FACE_DETECTOR[_<SITE>]=auto reads it
+to pick the fastest backend with count_agreement >= FACE_DETECTOR_MIN_AGREEMENT.
+
+Run from the backend directory:
+    python -m benchmarks.bench_face_detectors <fixture_dir> [backends...] [--reference NAME]
+"""
+import json
+import os
+import sys
+
+import cv2
+
+from app.utils.image_utils import decode_image
+from app.utils.face_detectors import BENCHMARK_REPORT, MIN_AGREEMENT, benchmark_detectors, select_backend
+
+def main():
+    args = sys.argv[1:]
+    reference = "hog"
+    if "--reference" in args:
+        index = args.index("--reference")
+        reference = args[index + 1]
+        del args[index:index + 2]
+    if not args:
+        sys.exit(__doc__)
+    fixture_dir, backends = args[0], args[1:] or None
+
+    images = []
+    for name in sorted(os.listdir(fixture_dir)):
+        if name.lower().endswith((".jpg", ".jpeg")):
+            with open(os.path.join(fixture_dir, name), "rb") as f:
+                images.append(cv2.cvtColor(decode_image(f.read()), cv2.COLOR_BGR2RGB))
+    if not images:
+        sys.exit(f"No JPEG fixtures found in {fixture_dir}")
+
+    report = benchmark_detectors(images, backends, reference)
+    print(f"{report['images']} images, {report['faces']} reference faces ({reference})")
+    for name, stats in report["backends"].items():
+        if "error" in stats:
+            print(f"{name:>10}: unavailable ({stats['error']})")
+            continue
+        print(f"{name:>10}: p50={stats['ms_p50']:.1f}ms p95={stats['ms_p95']:.1f}ms "
+              f"count_agreement={stats['count_agreement']:.3f} box_recall={stats['box_recall']:.3f}")
+    print(f"auto would pick: {select_backend(report)} (agreement floor {MIN_AGREEMENT})")
+
+    with open(BENCHMARK_REPORT, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {BENCHMARK_REPORT}")
+
+if __name__ == "__main__":
+    main()
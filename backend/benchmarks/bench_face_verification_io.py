@@ -0,0 +1,69 @@
+"""
+Latency of FaceVerificationService.verify_face under 50 concurrent requests,
+decoding uploads in memory versus the old temp-file round trip.
+
+The temp-file variant reproduces the previous I/O exactly (write both uploads
+under temp_images/, cv2.imread them back, delete them) and then runs the same
+pooled detection, so the difference is the disk round trip alone.
+
+Run from the backend directory:
+    python -m benchmarks.bench_face_verification_io <id_photo.jpg> <live_photo.jpg> [concurrency]
+"""
+import os
+import statistics
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from app.services.face_verification import FaceVerificationService
+
+REQUESTS = 500
+
+def temp_file_decode(image_bytes, name):
+    """The removed code path: bytes -> temp file -> cv2.imread -> delete"""
+    os.makedirs("temp_images", exist_ok=True)
+    path = os.path.join("temp_images", f"{uuid.uuid4().hex}_{name}")
+    with open(path, "wb") as f:
+        f.write(image_bytes)
+    image = cv2.imread(path)
+    os.remove(path)
+    return None if image is None else cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+def run(service, id_photo, live_photo, concurrency):
+    def request(_):
+        start = time.perf_counter()
+        service.verify_face(id_photo, live_photo)
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        timings = sorted(executor.map(request, range(REQUESTS)))
+        elapsed = time.perf_counter() - start
+    return statistics.median(timings), timings[int(len(timings) * 0.95)], REQUESTS / elapsed
+
+def main():
+    if len(sys.argv) < 3:
+        sys.exit(__doc__)
+    with open(sys.argv[1], "rb") as f:
+        id_photo = f.read()
+    with open(sys.argv[2], "rb") as f:
+        live_photo = f.read()
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+
+    service = FaceVerificationService()
+    service.verify_face(id_photo, live_photo)  # Warm-up
+
+    in_memory = run(service, id_photo, live_photo, concurrency)
+    service.decode_upload = temp_file_decode
+    temp_files = run(service, id_photo, live_photo, concurrency)
+
+    print(f"{REQUESTS} verify_face calls, {concurrency} concurrent")
+    for label, (p50, p95, throughput) in (("temp files", temp_files), ("in memory", in_memory)):
+        print(f"{label:>10}: p50={p50:.1f}ms p95={p95:.1f}ms throughput={throughput:.1f} req/s")
+    print(f"p50 improvement: {temp_files[0] - in_memory[0]:.1f}ms ({temp_files[0] / in_memory[0]:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Event volume and log write cost of per-frame gaze_analysis logging against the
+aggregated gaze_away events, on a synthetic 1 frame/s session: mostly centre
+with classifier noise (isolated away frames, no_face dropouts) and a few planted
+sustained deviations. Also reports how many planted deviations were recovered.
+
+Run from the backend directory:
+    python -m benchmarks.bench_gaze_aggregation [minutes]
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+from app.services.gaze_aggregator import GazeAggregator
+from app.utils.event_logger import ProctoringEventLogger
+
+NOISE_RATE = 0.08
+DROPOUT_RATE = 0.03
+DEVIATION_EVERY_SECONDS = 300
+DEVIATION_SECONDS = (4, 20)
+
+def synthetic_stream(seconds, rng):
+    """(time, result) pairs and the number of planted deviations"""
+    frames = []
+    planted = 0
+    t = 0
+    while t < seconds:
+        if t and t % DEVIATION_EVERY_SECONDS == 0:
+            planted += 1
+            direction = rng.choice(["left", "right", "down"])
+            for _ in range(rng.randint(*DEVIATION_SECONDS)):
+                # Sustained deviations are noisy too
+                frames.append((t, {"gaze_direction": direction if rng.random() > 0.15 else "center", "confidence": 0.8}))
+                t += 1
+            continue
+        roll = rng.random()
+        if roll < DROPOUT_RATE:
+            result = {"gaze_direction": "no_face", "confidence": 0.0}
+        elif roll < DROPOUT_RATE + NOISE_RATE:
+            result = {"gaze_direction": rng.choice(["left", "right", "up", "down"]), "confidence": 0.8}
+        else:
+            result = {"gaze_direction": "center", "confidence": 0.7}
+        frames.append((t, result))
+        t += 1
+    return frames, planted
+
+def replay(frames, per_frame):
+    """Log the stream the old way or through the aggregator; returns (events, seconds spent logging)"""
+    log = ProctoringEventLogger("bench_per_frame" if per_frame else "bench_aggregated")
+    log.clear_events()
+    aggregator = GazeAggregator()
+    start = time.perf_counter()
+    for t, result in frames:
+        if per_frame:
+            log.log_event("gaze_analysis", result)
+        else:
+            for details in aggregator.observe("bench", result, now=t):
+                log.log_event("gaze_away", details)
+    if not per_frame:
+        for details in aggregator.flush("bench"):
+            log.log_event("gaze_away", details)
+    return log.events, time.perf_counter() - start
+
+def main():
+    minutes = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    frames, planted = synthetic_stream(minutes * 60, random.Random(0))
+
+    logging.disable(logging.INFO)  # The logger's own per-event info lines would dominate the timing
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            per_frame_events, per_frame_seconds = replay(frames, per_frame=True)
+            aggregated_events, aggregated_seconds = replay(frames, per_frame=False)
+        finally:
+            os.chdir(cwd)
+
+    print(f"{len(frames)} frames ({minutes} min at 1 frame/s), {planted} planted deviations")
+    print(f"per-frame gaze_analysis: {len(per_frame_events)} events, {per_frame_seconds:.2f}s of log writes")
+    print(f"aggregated gaze_away:    {len(aggregated_events)} events, {aggregated_seconds * 1000:.1f}ms of log writes")
+    for event in aggregated_events:
+        details = event["details"]
+        print(f"  {details['start']} -> {details['end']} {details['direction']:>5} "
+              f"dwell={details['dwell_seconds']:.0f}s away_frames={details['away_frames']}")
+
+if __name__ == "__main__":
+    main()
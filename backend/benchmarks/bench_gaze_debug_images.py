@@ -0,0 +1,52 @@
+"""
+Cost of gaze debug images: GazeTracker.analyze_frame with debug sampling off
+(the default: no drawing, no encoding, no writes) against every call sampled,
+which is what the old unconditional dumps did on the request path. With
+sampling on, encoding and writing happen on the archive's writer thread, so the
+difference left in the request is the drawing and frame copies.
+
+Run from the backend directory:
+    python -m benchmarks.bench_gaze_debug_images <frame.jpg>
+"""
+import statistics
+import sys
+import tempfile
+import time
+
+from app.utils.debug_archive import DebugImageArchive
+from app.utils.gaze_tracking import GazeTracker
+from app.utils.image_utils import decode_image
+
+ITERATIONS = 200
+
+def time_ms(tracker, frame):
+    timings = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        tracker.analyze_frame(frame)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99)]
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    with open(sys.argv[1], "rb") as f:
+        frame = decode_image(f.read())
+    tracker = GazeTracker()
+    tracker.analyze_frame(frame)  # Warm-up
+
+    with tempfile.TemporaryDirectory() as directory:
+        tracker.debug_archive = DebugImageArchive(directory, 0.0, max_files=50)
+        off = time_ms(tracker, frame)
+        tracker.debug_archive = DebugImageArchive(directory, 1.0, max_files=50)
+        on = time_ms(tracker, frame)
+        stats = tracker.debug_archive.get_stats()
+
+    print(f"{ITERATIONS} analyze_frame calls")
+    print(f"debug off: p50={off[0]:.2f}ms p99={off[1]:.2f}ms")
+    print(f"debug on:  p50={on[0]:.2f}ms p99={on[1]:.2f}ms "
+          f"(written={stats['written']} dropped={stats['dropped']} deleted={stats['deleted']})")
+
+if __name__ == "__main__":
+    main()
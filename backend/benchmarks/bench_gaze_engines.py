@@ -0,0 +1,72 @@
+"""
+Latency, memory and accuracy of every gaze engine on a labeled fixture set.
+
+The fixture directory has one subdirectory per expected direction (center/,
+left/, right/, up/, down/, closed/, no_face/) holding JPEGs. Every engine
+classifies every fixture; the report (p50/p99 latency, load time, memory growth,
+accuracy and a confusion matrix per engine) is printed and written to
+GAZE_ENGINE_REPORT, where GAZE_ENGINE=auto reads it to pick the fastest engine
+with accuracy >= GAZE_ENGINE_MIN_ACCURACY.
+
+Engines are loaded in the order given, in one process, so memory growth is
+attributed to the first engine that loads a shared library; run one engine per
+invocation for clean memory numbers.
+
+Run from the backend directory:
+    python -m benchmarks.bench_gaze_engines <fixture_dir> [engines...]
+"""
+import json
+import os
+import sys
+
+from app.utils.image_utils import decode_image
+from app.utils.gaze_engines import BENCHMARK_REPORT, MIN_ACCURACY, benchmark_engines, select_engine
+
+def load_fixtures(fixture_dir):
+    fixtures = []
+    for label in sorted(os.listdir(fixture_dir)):
+        label_dir = os.path.join(fixture_dir, label)
+        if not os.path.isdir(label_dir):
+            continue
+        for name in sorted(os.listdir(label_dir)):
+            if name.lower().endswith((".jpg", ".jpeg")):
+                with open(os.path.join(label_dir, name), "rb") as f:
+                    frame = decode_image(f.read())
+                if frame is not None:
+                    fixtures.append((frame, label))
+    return fixtures
+
+def print_confusion(labels, confusion):
+    predicted = sorted({direction for row in confusion.values() for direction in row})
+    print("    " + " " * 9 + "".join(f"{direction:>9}" for direction in predicted))
+    for label in labels:
+        row = confusion[label]
+        print("    " + f"{label:>9}" + "".join(f"{row.get(direction, 0):>9}" for direction in predicted))
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    fixture_dir, engines = sys.argv[1], sys.argv[2:] or None
+
+    fixtures = load_fixtures(fixture_dir)
+    if not fixtures:
+        sys.exit(f"No labeled JPEG fixtures found in {fixture_dir}")
+
+    report = benchmark_engines(fixtures, engines)
+    labels = list(report["labels"])
+    print(f"{report['fixtures']} fixtures: " + ", ".join(f"{label}={count}" for label, count in report["labels"].items()))
+    for name, stats in report["engines"].items():
+        if "error" in stats:
+            print(f"{name:>10}: unavailable ({stats['error']})")
+            continue
+        print(f"{name:>10}: p50={stats['ms_p50']:.1f}ms p99={stats['ms_p99']:.1f}ms load={stats['load_ms']:.0f}ms "
+              f"rss=+{stats['rss_mb']:.0f}MB accuracy={stats['accuracy']:.3f} errors={stats['errors']}")
+        print_confusion(labels, stats["confusion"])
+    print(f"auto would pick: {select_engine(report)} (accuracy floor {MIN_ACCURACY})")
+
+    with open(BENCHMARK_REPORT, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {BENCHMARK_REPORT}")
+
+if __name__ == "__main__":
+    main()
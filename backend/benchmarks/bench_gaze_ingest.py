@@ -0,0 +1,56 @@
+"""
+Gaze analysis latency with the old snapshot round trip (write the upload under
+snapshots/, cv2.imread it back) versus decoding the upload in memory, with
+many concurrent requests so disk contention shows up in the tail.
+
+Run from the backend directory:
+    python -m benchmarks.bench_gaze_ingest <frame.jpg> [concurrency]
+"""
+import os
+import statistics
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.gaze_tracking import GazeTracker
+
+REQUESTS = 300
+
+def run(analyze, concurrency):
+    def request(_):
+        start = time.perf_counter()
+        analyze()
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        timings = sorted(executor.map(request, range(REQUESTS)))
+    return statistics.median(timings), timings[int(len(timings) * 0.99)]
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    with open(sys.argv[1], "rb") as f:
+        frame = f.read()
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    tracker = GazeTracker()
+    tracker.analyze_image(frame)  # Warm-up
+
+    def snapshot_round_trip():
+        """The removed request path: write the upload, then read it back by path"""
+        os.makedirs("snapshots", exist_ok=True)
+        path = os.path.join("snapshots", f"gaze_{uuid.uuid4().hex}.jpg")
+        with open(path, "wb") as f:
+            f.write(frame)
+        tracker.analyze_gaze(path)
+
+    on_disk = run(snapshot_round_trip, concurrency)
+    in_memory = run(lambda: tracker.analyze_image(frame), concurrency)
+
+    print(f"{REQUESTS} gaze requests, {concurrency} concurrent")
+    for label, (p50, p99) in (("snapshot", on_disk), ("in memory", in_memory)):
+        print(f"{label:>10}: p50={p50:.1f}ms p99={p99:.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Verification latency with the ID photo encoded on every call (the old
+FaceService.compare_faces path) versus the cached ID embedding, where only the
+live photo is encoded. Also reports the size of the stored embedding file.
+
+Run from the backend directory:
+    python -m benchmarks.bench_id_embeddings <id_photo.jpg> <live_photo.jpg>
+"""
+import statistics
+import sys
+import time
+
+from app.services.face_service import face_service
+from app.services.id_embeddings import IdEmbeddingStore
+from app.services.face_auth_service import FaceAuthService, id_embedding_path
+from app.utils.face_embeddings import pack_embedding
+
+ITERATIONS = 50
+USER_ID = "bench_id_embeddings"
+
+def time_calls(fn):
+    timings = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main():
+    if len(sys.argv) < 3:
+        sys.exit(__doc__)
+    with open(sys.argv[1], "rb") as f:
+        id_photo = f.read()
+    with open(sys.argv[2], "rb") as f:
+        live_photo = f.read()
+
+    FaceAuthService().save_id_photo(USER_ID, id_photo)
+    store = IdEmbeddingStore()
+    id_face = store.save(USER_ID, id_photo)
+    if id_face is None or not id_face.found:
+        sys.exit("No face found in the ID photo")
+
+    both = time_calls(lambda: face_service.compare_faces(id_photo, live_photo))
+    cached = time_calls(lambda: face_service.compare_with_embedding(store.get(USER_ID), live_photo))
+    store.invalidate(USER_ID)
+    from_disk = time_calls(lambda: (store.invalidate(USER_ID), store.get(USER_ID)))
+
+    print(f"Embedding file: {len(pack_embedding(id_face))} bytes at {id_embedding_path(USER_ID)}")
+    print(f"encode both photos: p50={both:.1f}ms")
+    print(f"cached ID embedding: p50={cached:.1f}ms ({both / cached:.2f}x)")
+    print(f"ID embedding load from disk (cache miss): p50={from_disk:.3f}ms")
+    print(f"Cache: {store.get_stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Storage and per-verification cost of normalized ID photos. For each fixture,
+compares the uploaded file with the normalized face crop stored by
+/auth/upload-id-photo:
+
+- bytes on disk
+- decode time
+- decode + detect + encode time for the original (what recomputing an
+  embedding from the raw upload costs) against decode + encode at the known
+  box for the crop
+
+Run from the backend directory:
+    python -m benchmarks.bench_id_photo_normalization <fixture_dir>
+"""
+import os
+import statistics
+import sys
+import time
+
+from app.services.face_service import face_service
+from app.utils.face_detectors import detector_for
+from app.utils.id_photo import normalize_id_photo, ID_PHOTO_SIZE
+from app.utils.image_utils import decode_image
+
+ITERATIONS = 10
+
+def time_ms(fn):
+    timings = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    directory = sys.argv[1]
+    detector = detector_for("id_photo")
+    rows = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), "rb") as f:
+            original = f.read()
+        if decode_image(original) is None:
+            continue
+        normalized = normalize_id_photo(original, detector)
+        if normalized is None:
+            print(f"{name}: no face found, stored as uploaded")
+            continue
+        rows.append((
+            len(original), len(normalized.image),
+            time_ms(lambda: decode_image(original)), time_ms(lambda: decode_image(normalized.image)),
+            time_ms(lambda: face_service.encode(original)),
+            time_ms(lambda: face_service.encode_at(normalized.image, normalized.box))
+        ))
+    if not rows:
+        sys.exit("No fixtures with a detectable face")
+
+    columns = list(zip(*rows))
+    original_bytes, stored_bytes, original_decode, stored_decode, original_encode, stored_encode = (
+        statistics.median(column) for column in columns
+    )
+    print(f"{len(rows)} ID photos, normalized to {ID_PHOTO_SIZE}x{ID_PHOTO_SIZE} (medians)")
+    print(f"storage: {original_bytes / 1024:.0f}KB -> {stored_bytes / 1024:.0f}KB "
+          f"({sum(columns[1]) / sum(columns[0]):.1%} of the uploads in total)")
+    print(f"decode: {original_decode:.1f}ms -> {stored_decode:.2f}ms")
+    print(f"embedding from stored photo: {original_encode:.1f}ms (decode + detect + encode) -> "
+          f"{stored_encode:.1f}ms (decode + encode at known box)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Cold import time of the API module, and the slowest imports behind it.
+
+Each run starts a fresh interpreter with -X importtime and imports main, so
+nothing is cached between runs. Compare the output before and after a change
+to startup code (e.g. by running it on both commits).
+
+Run from the backend directory:
+    python -m benchmarks.bench_import_time [runs]
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+TOP_IMPORTS = 15
+
+def import_once():
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        sys.exit(f"import main failed:\n{completed.stderr[-2000:]}")
+    return elapsed, completed.stderr
+
+def parse_importtime(stderr):
+    """Return (cumulative_us, module) for every line of -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), module.rstrip()))
+    return rows
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    timings, stderr = [], ""
+    for _ in range(runs):
+        elapsed, stderr = import_once()
+        timings.append(elapsed * 1000)
+    print(f"import main: median {statistics.median(timings):.0f}ms over {runs} runs "
+          f"(min {min(timings):.0f}ms, max {max(timings):.0f}ms)")
+
+    print("slowest imports (cumulative, last run):")
+    for cumulative, module in sorted(parse_importtime(stderr), reverse=True)[:TOP_IMPORTS]:
+        print(f"{cumulative / 1000:>9.1f}ms {module}")
+
+if __name__ == "__main__":
+    main()
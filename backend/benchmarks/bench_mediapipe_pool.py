@@ -0,0 +1,85 @@
+"""
+Per-call MediaPipe graph setup versus the pooled graphs in FaceVerificationService,
+plus a concurrency check that pooled requests never see each other's results.
+
+1. Setup cost: building a FaceDetection graph inside a `with` block per call (the
+   old code path) against checking a pre-built graph out of the pool.
+2. Concurrency: every fixture is run once sequentially through
+   detect_faces_in_frame, then many times from a thread pool in shuffled order.
+   Any result differing from its sequential reference is counted as corruption.
+
+Run from the backend directory:
+    python -m benchmarks.bench_mediapipe_pool <fixture_dir> [threads]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import mediapipe as mp
+
+from app.services.face_verification import FaceVerificationService
+from app.utils.image_utils import decode_image
+
+ITERATIONS = 50
+ROUNDS = 20
+
+def time_calls(fn, iterations=ITERATIONS):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    fixture_dir = sys.argv[1]
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    images = []
+    for name in sorted(os.listdir(fixture_dir)):
+        if name.lower().endswith((".jpg", ".jpeg")):
+            with open(os.path.join(fixture_dir, name), "rb") as f:
+                images.append(f.read())
+    if not images:
+        sys.exit(f"No JPEG fixtures found in {fixture_dir}")
+
+    service = FaceVerificationService()
+    rgb = cv2.cvtColor(decode_image(images[0]), cv2.COLOR_BGR2RGB)
+
+    def per_call_graph():
+        with mp.solutions.face_detection.FaceDetection(model_selection=1, min_detection_confidence=0.5) as graph:
+            graph.process(rgb)
+
+    def pooled_graph():
+        with service.detection_pool.checkout() as graph:
+            graph.process(rgb)
+
+    per_call_ms = time_calls(per_call_graph)
+    pooled_ms = time_calls(pooled_graph)
+    print(f"graph per call: {per_call_ms:.1f}ms  pooled: {pooled_ms:.1f}ms  "
+          f"setup saved: {per_call_ms - pooled_ms:.1f}ms/call")
+
+    reference = [service.detect_faces_in_frame(data) for data in images]
+    jobs = [index for _ in range(ROUNDS) for index in range(len(images))]
+    random.Random(0).shuffle(jobs)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(lambda index: (index, service.detect_faces_in_frame(images[index])), jobs))
+    elapsed = time.perf_counter() - start
+
+    corrupted = sum(result != reference[index] for index, result in results)
+    print(f"{len(jobs)} concurrent calls on {threads} threads in {elapsed:.2f}s, "
+          f"{corrupted} differed from the sequential result")
+    print(f"pool stats: {service.get_pool_stats()['detection']}")
+    if corrupted:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Speedup and recall of reduced-resolution face detection against full resolution.
+
+Every JPEG in the fixture directory is run through full-resolution HOG once
+(the reference) and then through each reduced scale. A reference face counts as
+recalled if a reduced-scale box overlaps it with IoU >= 0.5.
+
+Run from the backend directory:
+    python -m benchmarks.bench_multiscale_detection <fixture_dir> [scales...]
+"""
+import os
+import sys
+import time
+
+from app.utils.image_utils import decode_image
+from app.utils.multiscale_detection import reduced_decode_flag, locate_faces
+
+def iou(a, b):
+    top, right, bottom, left = max(a[0], b[0]), min(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    area = lambda box: (box[1] - box[3]) * (box[2] - box[0])
+    union = area(a) + area(b) - inter
+    return inter / union if union else 0.0
+
+def run_scale(images, scale):
+    locations, elapsed, reruns = [], 0.0, 0
+    for data in images:
+        start = time.perf_counter()
+        img = decode_image(data, reduced_decode_flag(scale))
+        boxes, full_img = locate_faces(img, scale, data)
+        elapsed += time.perf_counter() - start
+        reruns += full_img is not None
+        locations.append(boxes)
+    return locations, elapsed * 1000 / len(images), reruns
+
+def main():
+    fixture_dir = sys.argv[1]
+    scales = [int(s) for s in sys.argv[2:]] or [2, 4]
+    images = []
+    for name in sorted(os.listdir(fixture_dir)):
+        if name.lower().endswith((".jpg", ".jpeg")):
+            with open(os.path.join(fixture_dir, name), "rb") as f:
+                images.append(f.read())
+    if not images:
+        sys.exit(f"No JPEG fixtures found in {fixture_dir}")
+
+    reference, full_ms, _ = run_scale(images, 1)
+    total_faces = sum(len(boxes) for boxes in reference)
+    print(f"{len(images)} images, {total_faces} reference faces, full resolution {full_ms:.1f}ms/image")
+
+    for scale in scales:
+        found, ms, reruns = run_scale(images, scale)
+        recalled = sum(
+            1 for ref_boxes, boxes in zip(reference, found)
+            for ref in ref_boxes if any(iou(ref, box) >= 0.5 for box in boxes)
+        )
+        recall = recalled / total_faces if total_faces else 1.0
+        print(f"scale 1/{scale}: {ms:.1f}ms/image speedup={full_ms / ms:.2f}x "
+              f"recall={recall:.3f} full-res reruns={reruns}/{len(images)}")
+
+if __name__ == "__main__":
+    main()
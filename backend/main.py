@@ -1,6 +1,12 @@
+import asyncio
+import logging
 from fastapi import FastAPI, Request
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import exam_route, test_route, auth_routes, audio_events, proctoring_events, monitoring
+from app.routes import exam_route, test_route, auth_routes, audio_events, proctoring_events, monitoring, face_verification
+from app.services.vision_executor import vision_executor
+from app.services import vision_tasks
+from app.utils.model_registry import model_registry, WARMUP_MODELS
 from app.utils.error_handlers import (
     ProctoringException,
     ValidationException,
@@ -9,6 +15,8 @@ from app.utils.error_handlers import (
     general_exception_handler
 )
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI()
 
 # Configure CORS
@@ -32,11 +40,55 @@ app.include_router(auth_routes.router, prefix="/auth", tags=["Authentication"])
 app.include_router(audio_events.router)
 app.include_router(proctoring_events.router)
 app.include_router(monitoring.router, prefix="/api")
+app.include_router(face_verification.liveness_router, prefix="/face-verification", tags=["Face Verification"])
+
+async def warm_up_models():
+    """Preload WARMUP_MODELS: vision models inside every vision worker, the rest in this process"""
+    local_models = [name for name in WARMUP_MODELS if not model_registry.is_vision(name)]
+    vision_models = [name for name in WARMUP_MODELS if model_registry.is_vision(name)]
+    try:
+        await run_in_threadpool(model_registry.warm_up, local_models)
+        await vision_executor.broadcast(vision_tasks.warm_models, vision_models)
+        logger.info("Model warm-up finished")
+    except Exception as e:
+        logger.error(f"Model warm-up failed: {str(e)}")
+
+@app.on_event("startup")
+async def start_vision_workers():
+    # Spawn the workers up front and warm the models in the background, so startup
+    # doesn't block on model loading and the first frames don't pay for it either
+    vision_executor.start()
+    app.state.warmup_task = asyncio.create_task(warm_up_models())
+
+@app.on_event("shutdown")
+async def stop_vision_workers():
+    vision_executor.shutdown()
 
 @app.get("/")
 async def root():
     return {"message": "Proctoring API is running"}
 
+@app.get("/ready")
+async def readiness():
+    """Which models are loaded in the API process and in each vision worker"""
+    api_status = model_registry.get_status()
+    try:
+        workers = await asyncio.wait_for(vision_executor.broadcast(vision_tasks.get_model_status), timeout=2)
+    except asyncio.TimeoutError:
+        # Workers are still busy (e.g. warming up); report them as not ready rather than hang the probe
+        workers = [{}] * max(vision_executor.workers, 1)
+    
+    def is_hot(name):
+        statuses = workers if model_registry.is_vision(name) else [api_status]
+        return all(status.get(name, {}).get("loaded") for status in statuses)
+    
+    return {
+        "ready": all(is_hot(name) for name in WARMUP_MODELS),
+        "warmup_models": WARMUP_MODELS,
+        "api": api_status,
+        "vision_workers": workers
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file